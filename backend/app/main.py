@@ -3,85 +3,130 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import asyncio
 import json
-from datetime import datetime
 
 from .database.database import engine, SessionLocal
 from .models import models
-from .routers import zones, trucks, vendors, routes, pickup_points, alerts, reports, drivers, gtc_checkpoints
+from .routers import zones, trucks, vendors, routes, pickup_points, alerts, reports, drivers, gtc_checkpoints, telemetry, wards, imports
 from .services.vehicle_simulator import vehicle_simulator
+from .services.connection_manager import manager
+from .services.live_state import live_state
+from .services.position_history import position_history
+from .services.background_worker import BackgroundWorker
+from .services.loop_monitor import loop_monitor
+from .services.ward_index import ward_index
+from .services.ward_boundaries import ward_boundaries
+from .services.geofence import geofence_engine
+from .services.route_deviation import route_deviation_detector
+from .services.trip_detector import trip_detector
+from .services.alert_rules import alert_rule_engine
+from .services.telemetry import telemetry_ingestor
+from .services.coverage import COVERAGE_INTERVAL_SECONDS, coverage_job
+from .services.leadership import leader_election
+from .services.pubsub import PUBSUB_BACKEND, PUBSUB_EMBEDDED_BROKER, POSITIONS_TOPIC, TELEMETRY_TOPIC, SocketBroker, pubsub
 
 # Create database tables
 models.Base.metadata.create_all(bind=engine)
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
+def flush_live_state():
+    """Write-behind: persist dirty live truck state and queued position history"""
+    db = SessionLocal()
+    try:
+        live_state.flush(db)
+        position_history.flush(db)
+    finally:
+        db.close()
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+def fleet_tick():
+    """Runs on the fleet worker thread every 5 seconds: simulate (leader only), persist, snapshot"""
+    try:
+        vehicle_simulator.step()
+    except Exception as e:
+        print(f"Error in simulation: {e}")
+    try:
+        flush_live_state()
+    except Exception as e:
+        print(f"Error persisting live state: {e}")
+    return live_state.positions()
 
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+# Simulation and SQLite writes block, so they run on their own thread
+fleet_worker = BackgroundWorker(fleet_tick, interval=5.0, name="fleet-worker")
 
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
+# Incremental pickup coverage batch job (leader only)
+coverage_worker = BackgroundWorker(coverage_job.run_once, interval=COVERAGE_INTERVAL_SECONDS, name="coverage-worker")
 
-manager = ConnectionManager()
+# With PUBSUB_BACKEND=socket the leader worker hosts the broker (uvicorn --workers N)
+pubsub_broker = SocketBroker() if PUBSUB_BACKEND == "socket" and PUBSUB_EMBEDDED_BROKER else None
 
-# Background task for broadcasting live positions
+# Background task publishing live positions (leader only)
 async def broadcast_truck_positions():
-    while True:
-        try:
-            db = SessionLocal()
-            trucks = db.query(models.Truck).filter(models.Truck.status == "active").all()
-            
-            truck_data = []
-            for truck in trucks:
-                if truck.latitude and truck.longitude:
-                    truck_data.append({
-                        "id": truck.id,
-                        "registration_number": truck.registration_number,
-                        "latitude": truck.latitude,
-                        "longitude": truck.longitude,
-                        "status": truck.current_status.value if truck.current_status else "idle",
-                        "speed": truck.speed or 0.0,
-                        "trips_completed": truck.trips_completed,
-                        "last_update": truck.last_update.isoformat() if truck.last_update else None
-                    })
-            
-            db.close()
-            
-            if truck_data:
-                await manager.broadcast({
-                    "type": "truck_positions",
-                    "data": truck_data,
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-            
-            await asyncio.sleep(5)  # Broadcast every 5 seconds
-        except Exception as e:
-            print(f"Error broadcasting: {e}")
-            await asyncio.sleep(5)
+    # The worker hands over each tick's positions; every process's WebSocket
+    # manager receives them through pub/sub
+    async for truck_data in fleet_worker.results():
+        pubsub.publish(POSITIONS_TOPIC, truck_data)
+
+async def mirror_positions(positions: list):
+    """Followers keep their live store (/trucks/live) in step with the leader"""
+    if not leader_election.is_leader:
+        live_state.apply_positions(positions)
+
+async def apply_follower_telemetry(message: dict):
+    """The leader records fixes ingested by followers; its next tick writes and broadcasts them"""
+    if leader_election.is_leader:
+        telemetry_ingestor.apply_forwarded(message["fixes"])
+
+async def run_as_follower():
+    if PUBSUB_BACKEND == "memory":
+        print("Another worker is the leader; set PUBSUB_BACKEND=socket so this worker receives live frames")
+
+async def run_as_leader():
+    # Exactly one process runs the producers
+    if pubsub_broker is not None:
+        await pubsub_broker.start()
+    vehicle_simulator.start_simulation()
+    coverage_worker.start()
+    await broadcast_truck_positions()
 
 # Lifespan context manager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    simulation_task = asyncio.create_task(vehicle_simulator.run_simulation())
-    broadcast_task = asyncio.create_task(broadcast_truck_positions())
+    db = SessionLocal()
+    try:
+        live_state.load(db)
+        ward_index.load(db=db)
+        ward_boundaries.build(ward_index)
+        geofence_engine.load(db)
+        route_deviation_detector.load(db)
+        trip_detector.load(db)
+    finally:
+        db.close()
+    position_history.add_processor(geofence_engine.process)
+    position_history.add_processor(route_deviation_detector.process)
+    position_history.add_processor(trip_detector.process)
+    # After the geofence and trip processors, which mark each fix in_geofence / at_dump_site
+    position_history.add_processor(alert_rule_engine.process)
+    pubsub.subscribe(POSITIONS_TOPIC, mirror_positions)
+    pubsub.subscribe(TELEMETRY_TOPIC, apply_follower_telemetry)
+    manager.subscribe_to(pubsub)
+    await pubsub.start()
+    # Every worker persists its own writes (master-data edits); only the leader simulates and records telemetry
+    fleet_worker.start()
+    election_task = asyncio.create_task(leader_election.run(run_as_follower, run_as_leader))
+    monitor_task = asyncio.create_task(loop_monitor.run())
     
     yield
     
     # Shutdown
     vehicle_simulator.stop_simulation()
-    simulation_task.cancel()
-    broadcast_task.cancel()
+    election_task.cancel()
+    monitor_task.cancel()
+    await pubsub.close()
+    if pubsub_broker is not None:
+        await pubsub_broker.close()
+    await asyncio.to_thread(fleet_worker.stop)
+    await asyncio.to_thread(coverage_worker.stop, 30)
+    flush_live_state()
+    leader_election.resign()
 
 # Create FastAPI app
 app = FastAPI(
@@ -113,6 +158,9 @@ app.include_router(pickup_points.router, prefix="/api")
 app.include_router(alerts.router, prefix="/api")
 app.include_router(reports.router, prefix="/api")
 app.include_router(gtc_checkpoints.router, prefix="/api")
+app.include_router(telemetry.router, prefix="/api")
+app.include_router(wards.router, prefix="/api")
+app.include_router(imports.router, prefix="/api")
 
 # Import new routers
 from .routers import auth, tickets, social_media, analytics
@@ -129,9 +177,13 @@ async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
-            # Keep connection alive
-            await websocket.receive_text()
-    except WebSocketDisconnect:
+            # Keepalive pings and subscribe/resync control messages
+            text = await websocket.receive_text()
+            await manager.handle_message(websocket, text)
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError: the socket was closed by the manager (evicted)
+        pass
+    finally:
         manager.disconnect(websocket)
 
 # Root endpoint
@@ -146,4 +198,13 @@ def read_root():
 # Health check
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "role": "leader" if leader_election.is_leader else "follower",
+        "event_loop_lag": loop_monitor.stats(),
+        "fleet_tick_ms": round(fleet_worker.last_tick_seconds * 1000, 2),
+        "geofence": geofence_engine.stats(),
+        "route_deviation": route_deviation_detector.stats(),
+        "trips": trip_detector.stats(),
+        "alert_rules": alert_rule_engine.stats(),
+    }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Date, Boolean, Enum as SQLEnum, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -123,6 +123,22 @@ class Truck(Base):
     ward = relationship("Ward", back_populates="trucks")
     route = relationship("Route", back_populates="trucks")
 
+class TruckPosition(Base):
+    """Append-only GPS history shared by the per-day partition tables.
+
+    Rows never live in a table of this name: services/position_history.py maps
+    one subclass per UTC day (truck_positions_YYYYMMDD). The composite primary
+    key (truck_id, ts) is the time-ordered index every range scan uses.
+    """
+    __abstract__ = True
+
+    truck_id = Column(String, primary_key=True)
+    ts = Column(DateTime, primary_key=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    speed = Column(Float, default=0.0)
+    status = Column(String)
+
 class Route(Base):
     __tablename__ = "routes"
     
@@ -283,3 +299,29 @@ class GtcCheckpointEntry(Base):
     remarks = Column(String, nullable=True)
 
     truck = relationship("Truck")
+
+# Pickup points covered by a truck's telemetry, per day, route and ward (see services/coverage.py)
+class PickupCoverage(Base):
+    __tablename__ = "pickup_coverage"
+    __table_args__ = (UniqueConstraint("day", "route_id", "truck_id", "ward_id"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False, index=True)
+    route_id = Column(String, ForeignKey("routes.id"), nullable=False)
+    truck_id = Column(String, ForeignKey("trucks.id"), nullable=False)
+    ward_id = Column(String, ForeignKey("wards.id"), nullable=True)
+    total_points = Column(Integer, nullable=False)
+    covered = Column(Integer, nullable=False)
+    missed = Column(Integer, nullable=False)
+    first_pickup_at = Column(DateTime, nullable=True)
+    last_pickup_at = Column(DateTime, nullable=True)
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+# Size of a day's position history when its coverage was last computed
+class CoverageWatermark(Base):
+    __tablename__ = "coverage_watermarks"
+
+    day = Column(Date, primary_key=True)
+    positions = Column(Integer, nullable=False)
+    max_ts = Column(DateTime, nullable=True)
+    computed_at = Column(DateTime, default=datetime.utcnow)
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from ..database.database import get_db
 from ..models import models
 from ..schemas import schemas
+from ..services.pubsub import ALERTS_TOPIC, pubsub
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
@@ -61,6 +62,7 @@ def create_alert(alert: schemas.AlertCreate, db: Session = Depends(get_db)):
     db.add(db_alert)
     db.commit()
     db.refresh(db_alert)
+    pubsub.publish(ALERTS_TOPIC, schemas.Alert.model_validate(db_alert).model_dump(mode="json"))
     return db_alert
 
 @router.get("/active", response_model=List[schemas.AlertWithNames])
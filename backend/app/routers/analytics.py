@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from ..database.database import get_db
 from ..models import models
 from ..schemas import schemas
+from ..services.live_state import live_state
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -49,8 +50,9 @@ def get_performance_overview(db: Session = Depends(get_db)):
     last_7_days = today - timedelta(days=7)
     last_30_days = today - timedelta(days=30)
     
-    # Collection efficiency
-    trucks = db.query(models.Truck).filter(models.Truck.status == "active").all()
+    # Collection efficiency, from the in-memory live fleet state
+    live_state.ensure_loaded(db)
+    trucks = live_state.trucks()
     total_trips_completed = sum(truck.trips_completed for truck in trucks)
     total_trips_allowed = sum(truck.trips_allowed for truck in trucks)
     efficiency = (total_trips_completed / total_trips_allowed * 100) if total_trips_allowed > 0 else 0
@@ -77,9 +79,14 @@ def get_zone_wise_performance(db: Session = Depends(get_db)):
     """Get performance metrics grouped by zone"""
     zones = db.query(models.Zone).all()
     
+    live_state.ensure_loaded(db)
+    trucks_by_zone = {}
+    for truck in live_state.trucks(active_only=False):
+        trucks_by_zone.setdefault(truck.zone_id, []).append(truck)
+    
     zone_performance = []
     for zone in zones:
-        trucks = db.query(models.Truck).filter(models.Truck.zone_id == zone.id).all()
+        trucks = trucks_by_zone.get(zone.id, [])
         active_trucks = len([t for t in trucks if t.current_status == models.TruckStatus.MOVING])
         
         total_trips = sum(truck.trips_completed for truck in trucks)
@@ -102,9 +109,14 @@ def get_vendor_wise_performance(db: Session = Depends(get_db)):
     """Get performance metrics grouped by vendor"""
     vendors = db.query(models.Vendor).all()
     
+    live_state.ensure_loaded(db)
+    trucks_by_vendor = {}
+    for truck in live_state.trucks(active_only=False):
+        trucks_by_vendor.setdefault(truck.vendor_id, []).append(truck)
+    
     vendor_performance = []
     for vendor in vendors:
-        trucks = db.query(models.Truck).filter(models.Truck.vendor_id == vendor.id).all()
+        trucks = trucks_by_vendor.get(vendor.id, [])
         active_trucks = len([t for t in trucks if t.current_status == models.TruckStatus.MOVING])
         
         total_trips = sum(truck.trips_completed for truck in trucks)
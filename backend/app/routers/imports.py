@@ -0,0 +1,78 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy.orm import Session
+
+from ..database.database import get_db
+from ..schemas import schemas
+from ..services.geo_import import GeoImportError, GeoImporter, detect_format
+from ..services.geofence import geofence_engine
+from ..services.pickup_index import pickup_point_index
+from ..services.route_deviation import route_deviation_detector
+from ..services.route_optimizer import route_optimizer
+from ..services.trip_detector import trip_detector
+
+router = APIRouter(prefix="/import", tags=["import"])
+
+
+@router.post("/geo", response_model=schemas.GeoImportResult)
+def import_geo(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    prefix: str = "IMP",
+    spacing: float = 150.0,
+    points_per_route: int = 15,
+    route_type: str = "primary",
+    ward_id: Optional[str] = None,
+    zone_id: Optional[str] = None,
+    optimize: bool = False,
+    db: Session = Depends(get_db),
+):
+    """Import routes and pickup points from an uploaded GeoJSON or KML file (see services/geo_import.py)"""
+    if format not in (None, "geojson", "kml"):
+        raise HTTPException(status_code=400, detail="format must be geojson or kml")
+    if not prefix or spacing <= 0 or points_per_route <= 0:
+        raise HTTPException(status_code=400, detail="prefix, spacing and points_per_route are required")
+
+    # The upload is spooled to disk past 1 MB and read twice, never loaded whole
+    stream = file.file
+    try:
+        importer = GeoImporter(
+            prefix=prefix,
+            spacing_m=spacing,
+            points_per_route=points_per_route,
+            route_type=route_type,
+            ward_id=ward_id,
+            zone_id=zone_id,
+        )
+        result = importer.run(db, stream, format or detect_format(stream, file.filename))
+    except GeoImportError as e:
+        db.rollback()
+        if not (e.routes or e.pickup_points):
+            raise HTTPException(status_code=400, detail=f"Invalid geo file: {e}")
+        _reload_indexes(db)
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid geo file: {e} ({e.routes} routes and {e.pickup_points} pickup points "
+                   f"from earlier batches were imported; importing the fixed file again skips them)",
+        )
+    except ValueError as e:
+        # Rejected before anything was written (e.g. an unknown route_type)
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Invalid geo file: {e}")
+
+    if optimize:
+        # New routes only; routes that already existed keep their order
+        for route_id in result["route_ids"]:
+            route_optimizer.optimize(db, route_id)
+
+    _reload_indexes(db)
+    return result
+
+
+def _reload_indexes(db: Session):
+    """Index imported points for geofencing, deviation checks, trip detection and map filters"""
+    geofence_engine.load(db)
+    route_deviation_detector.load(db)
+    trip_detector.load(db)
+    pickup_point_index.invalidate()
@@ -1,16 +1,36 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database.database import get_db
 from ..models import models
 from ..schemas import schemas
+from ..services.geofence import geofence_engine
+from ..services.route_deviation import route_deviation_detector
+from ..services.route_simulator import DUMP_TYPES
+from ..services.trip_detector import trip_detector
+from ..services.pickup_index import pickup_point_index
 
 router = APIRouter(prefix="/pickup-points", tags=["pickup-points"])
 
+# Ids per IN (...) clause when loading index hits
+ID_CHUNK = 500
+
+def _parse_floats(value: str, count: int, name: str) -> List[float]:
+    try:
+        numbers = [float(part) for part in value.split(",")]
+    except ValueError:
+        numbers = []
+    if len(numbers) != count:
+        raise HTTPException(status_code=400, detail=f"{name} must be {count} comma-separated numbers")
+    return numbers
+
 @router.get("/", response_model=List[schemas.PickupPoint])
 def get_pickup_points(
     ward_id: str = None,
     route_id: str = None,
+    bbox: Optional[str] = Query(default=None, description="min_lng,min_lat,max_lng,max_lat"),
+    near: Optional[str] = Query(default=None, description="lat,lng; results ordered by distance"),
+    radius: float = Query(default=500.0, gt=0, le=50000, description="Meters around near"),
     db: Session = Depends(get_db)
 ):
     query = db.query(models.PickupPoint)
@@ -20,7 +40,30 @@ def get_pickup_points(
     if route_id:
         query = query.filter(models.PickupPoint.route_id == route_id)
     
-    pickup_points = query.all()
+    if bbox is None and near is None:
+        pickup_points = query.all()
+        return pickup_points
+
+    # Spatial filters: the in-memory grid finds the ids, the database the rows
+    ids = None
+    if bbox is not None:
+        min_lng, min_lat, max_lng, max_lat = _parse_floats(bbox, 4, "bbox")
+        if not (-180 <= min_lng <= max_lng <= 180 and -90 <= min_lat <= max_lat <= 90):
+            raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat within -180..180 and -90..90")
+        ids = pickup_point_index.in_bbox(db, min_lng, min_lat, max_lng, max_lat)
+    distances = {}
+    if near is not None:
+        lat, lng = _parse_floats(near, 2, "near")
+        hits = pickup_point_index.near(db, lat, lng, radius)
+        in_bbox = set(ids) if ids is not None else None
+        ids = [point_id for _, point_id in hits if in_bbox is None or point_id in in_bbox]
+        distances = {point_id: distance for distance, point_id in hits}
+
+    pickup_points = []
+    for start in range(0, len(ids), ID_CHUNK):
+        pickup_points.extend(query.filter(models.PickupPoint.id.in_(ids[start:start + ID_CHUNK])).all())
+    if distances:
+        pickup_points.sort(key=lambda point: distances[point.id])
     return pickup_points
 
 @router.post("/", response_model=schemas.PickupPoint)
@@ -32,4 +75,10 @@ def create_pickup_point(
     db.add(db_pickup_point)
     db.commit()
     db.refresh(db_pickup_point)
+    geofence_engine.upsert_point(db_pickup_point)
+    if db_pickup_point.route_id:
+        route_deviation_detector.reload_route(db, db_pickup_point.route_id)
+    if db_pickup_point.type in DUMP_TYPES:
+        trip_detector.load(db)
+    pickup_point_index.invalidate()
     return db_pickup_point
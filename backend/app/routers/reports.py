@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 import json
 from ..database.database import get_db
 from ..models import models
+from ..services.live_state import live_state
+from ..services.coverage import coverage_report
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -103,7 +105,8 @@ def get_vendor_performance(db: Session = Depends(get_db)):
 @router.get("/collection-efficiency")
 def get_collection_efficiency(db: Session = Depends(get_db)):
     """Calculate overall collection efficiency"""
-    trucks = db.query(models.Truck).filter(models.Truck.status == "active").all()
+    live_state.ensure_loaded(db)
+    trucks = live_state.trucks()
     
     total_trips_completed = sum(truck.trips_completed for truck in trucks)
     total_trips_allowed = sum(truck.trips_allowed for truck in trucks)
@@ -135,4 +138,10 @@ def get_reports_data(
         except json.JSONDecodeError:
             payload[row.report_type] = []
 
+    # Computed from telemetry by the coverage job; replaces the seeded sample once available
+    if not report_type or "daily_pickup_coverage" in types:
+        coverage = coverage_report(db)
+        if coverage:
+            payload["daily_pickup_coverage"] = coverage
+
     return payload
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from ..database.database import get_db
 from ..models import models
 from ..schemas import schemas
+from ..services.route_deviation import route_deviation_detector
+from ..services.route_optimizer import route_optimizer
+from ..services.vehicle_simulator import vehicle_simulator
 
 router = APIRouter(prefix="/routes", tags=["routes"])
 
@@ -27,7 +30,7 @@ def get_routes(
     for route in routes:
         pickup_points = db.query(models.PickupPoint).filter(
             models.PickupPoint.route_id == route.id
-        ).all()
+        ).order_by(models.PickupPoint.expected_pickup_time, models.PickupPoint.point_code).all()
         
         route_dict = {
             "id": route.id,
@@ -77,5 +80,17 @@ def create_route(route: schemas.RouteCreate, db: Session = Depends(get_db)):
 def get_route_pickup_points(route_id: str, db: Session = Depends(get_db)):
     pickup_points = db.query(models.PickupPoint).filter(
         models.PickupPoint.route_id == route_id
-    ).all()
+    ).order_by(models.PickupPoint.expected_pickup_time, models.PickupPoint.point_code).all()
     return pickup_points
+
+@router.post("/{route_id}/optimize", response_model=schemas.RouteOptimization)
+def optimize_route(route_id: str, apply: bool = True, db: Session = Depends(get_db)):
+    """Solve the pickup visiting order; with apply=false only report it"""
+    plan = route_optimizer.optimize(db, route_id, apply=apply)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Route not found")
+    if apply:
+        route_deviation_detector.reload_route(db, route_id)
+        if vehicle_simulator.routes is not None:
+            vehicle_simulator.routes.invalidate()
+    return {**plan.to_dict(), "applied": apply}
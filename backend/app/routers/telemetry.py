@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from ..database.database import get_db
+from ..schemas import schemas
+from ..services.telemetry import telemetry_ingestor
+
+router = APIRouter(prefix="/telemetry", tags=["telemetry"])
+
+@router.post("/batch", response_model=schemas.TelemetryBatchResult)
+def ingest_telemetry_batch(batch: schemas.TelemetryBatch, db: Session = Depends(get_db)):
+    """Ingest a batch of GPS fixes pushed by vehicle tracking devices, keyed by IMEI"""
+    return telemetry_ingestor.ingest(db, batch.fixes)
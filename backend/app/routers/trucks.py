@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timezone
 from ..database.database import get_db
 from ..models import models
 from ..schemas import schemas
+from ..services.live_state import live_state
+from ..services.position_history import parse_ts, position_history
+from ..services.telemetry import telemetry_ingestor, to_utc_naive
+from ..services.track_simplifier import simplify_indexes
 
 router = APIRouter(prefix="/trucks", tags=["trucks"])
 
@@ -29,37 +34,8 @@ def get_trucks(
 @router.get("/live", response_model=List[schemas.TruckLive])
 def get_live_trucks(db: Session = Depends(get_db)):
     """Get all trucks with live tracking data"""
-    trucks = db.query(models.Truck).filter(
-        models.Truck.status == "active"
-    ).all()
-    
-    result = []
-    for truck in trucks:
-        driver = db.query(models.Driver).filter(models.Driver.id == truck.driver_id).first()
-        route = db.query(models.Route).filter(models.Route.id == truck.assigned_route_id).first()
-        
-        truck_live = schemas.TruckLive(
-            id=truck.id,
-            registration_number=truck.registration_number,
-            type=truck.type.value,
-            route_type=truck.route_type.value,
-            latitude=truck.latitude,
-            longitude=truck.longitude,
-            current_status=truck.current_status.value if truck.current_status else "idle",
-            speed=truck.speed or 0.0,
-            trips_completed=truck.trips_completed,
-            trips_allowed=truck.trips_allowed,
-            driver_name=driver.name if driver else None,
-            route_name=route.name if route else "Unassigned",
-            vendor_id=truck.vendor_id,
-            zone_id=truck.zone_id,
-            ward_id=truck.ward_id,
-            is_spare=truck.is_spare,
-            last_update=truck.last_update
-        )
-        result.append(truck_live)
-    
-    return result
+    live_state.ensure_loaded(db)
+    return live_state.live_records()
 
 @router.get("/spare", response_model=List[schemas.Truck])
 def get_spare_trucks(db: Session = Depends(get_db)):
@@ -69,6 +45,30 @@ def get_spare_trucks(db: Session = Depends(get_db)):
     ).all()
     return trucks
 
+@router.get("/nearest", response_model=List[schemas.TruckNearest])
+def get_nearest_trucks(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    k: int = Query(default=5, ge=1, le=100),
+    status: Optional[str] = Query(default=None, description="Comma-separated live statuses, e.g. idle,moving"),
+    spare: Optional[bool] = Query(default=None, description="Only spare (true) or only regular (false) trucks"),
+    max_distance: Optional[float] = Query(default=None, gt=0, description="Meters"),
+    db: Session = Depends(get_db)
+):
+    """Closest active trucks to a point, from the live position index"""
+    live_state.ensure_loaded(db)
+    statuses = {value.strip() for value in status.split(",") if value.strip()} if status else None
+
+    def accept(truck) -> bool:
+        if statuses is not None and (truck.current_status.value if truck.current_status else "idle") not in statuses:
+            return False
+        return spare is None or bool(truck.is_spare) == spare
+
+    return [
+        {**truck.live(), "distance_m": round(distance, 1)}
+        for distance, truck in live_state.nearest(lat, lng, k, accept=accept, max_distance=max_distance)
+    ]
+
 @router.get("/{truck_id}", response_model=schemas.Truck)
 def get_truck(truck_id: str, db: Session = Depends(get_db)):
     truck = db.query(models.Truck).filter(models.Truck.id == truck_id).first()
@@ -76,12 +76,55 @@ def get_truck(truck_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Truck not found")
     return truck
 
+@router.get("/{truck_id}/track", response_model=schemas.TruckTrack)
+def get_truck_track(
+    truck_id: str,
+    start: Optional[datetime] = Query(default=None, alias="from", description="Defaults to start of today (UTC)"),
+    end: Optional[datetime] = Query(default=None, alias="to", description="Defaults to now (UTC)"),
+    tolerance: float = Query(default=5.0, ge=0, le=500, description="Simplification tolerance in meters"),
+    max_points: int = Query(default=1000, ge=2, le=20000),
+    db: Session = Depends(get_db)
+):
+    """Recorded path of a truck, simplified for journey replay"""
+    truck = db.query(models.Truck.id).filter(models.Truck.id == truck_id).first()
+    if not truck:
+        raise HTTPException(status_code=404, detail="Truck not found")
+
+    end = to_utc_naive(end)
+    start = to_utc_naive(start) if start else end.replace(hour=0, minute=0, second=0, microsecond=0)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+    rows = list(position_history.iter_range(db, truck_id, start, end))
+    coords = [(lat, lng) for _, lat, lng, _, _ in rows]
+
+    points = []
+    for index in simplify_indexes(coords, tolerance, max_points):
+        ts, lat, lng, speed, _ = rows[index]
+        points.append([
+            int(parse_ts(ts).replace(tzinfo=timezone.utc).timestamp()),
+            round(lat, 5),
+            round(lng, 5),
+            round(speed or 0.0, 1),
+        ])
+
+    return {
+        "truck_id": truck_id,
+        "start": start,
+        "end": end,
+        "total_points": len(rows),
+        "tolerance": tolerance,
+        "points": points,
+    }
+
 @router.post("/", response_model=schemas.Truck)
 def create_truck(truck: schemas.TruckCreate, db: Session = Depends(get_db)):
     db_truck = models.Truck(**truck.dict())
     db.add(db_truck)
     db.commit()
     db.refresh(db_truck)
+    telemetry_ingestor.imei_index.invalidate()
+    live_state.refresh_truck(db, db_truck.id)
     return db_truck
 
 @router.put("/{truck_id}", response_model=schemas.Truck)
@@ -95,6 +138,8 @@ def update_truck(truck_id: str, truck: schemas.TruckBase, db: Session = Depends(
     
     db.commit()
     db.refresh(db_truck)
+    telemetry_ingestor.imei_index.invalidate()
+    live_state.refresh_truck(db, db_truck.id)
     return db_truck
 
 @router.put("/{truck_id}/assign-route", response_model=schemas.Truck)
@@ -115,4 +160,5 @@ def assign_route(truck_id: str, payload: schemas.TruckAssignRoute, db: Session =
 
     db.commit()
     db.refresh(db_truck)
+    live_state.refresh_truck(db, db_truck.id)
     return db_truck
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+from ..database.database import get_db
+from ..schemas import schemas
+from ..services.ward_boundaries import pick_encoding, ward_boundaries
+from ..services.ward_index import ward_index
+
+router = APIRouter(prefix="/wards", tags=["wards"])
+
+@router.get("/boundaries")
+def get_ward_boundaries(
+    request: Request,
+    zoom: int = Query(default=12, ge=0, le=22, description="Map zoom level the boundaries are drawn at"),
+    db: Session = Depends(get_db),
+):
+    """Ward boundaries as GeoJSON, simplified for the zoom level (precompressed, ETag-cached)"""
+    ward_index.ensure_loaded(db)
+    ward_boundaries.ensure_built(ward_index)
+    variant = ward_boundaries.variant(zoom)
+    headers = {
+        "ETag": variant.etag,
+        "Cache-Control": "public, max-age=3600",
+        "Vary": "Accept-Encoding",
+    }
+    if_none_match = request.headers.get("if-none-match", "")
+    if variant.etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    encoding = pick_encoding(request.headers.get("accept-encoding", ""), variant.bodies)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=variant.bodies[encoding], media_type="application/geo+json", headers=headers)
+
+@router.get("/locate", response_model=schemas.WardLocation)
+def locate_ward(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    db: Session = Depends(get_db),
+):
+    """Ward boundary containing a point"""
+    ward_index.ensure_loaded(db)
+    region = ward_index.locate(lat, lng)
+    if region is None:
+        raise HTTPException(status_code=404, detail="Point is not inside any ward")
+    return region.to_dict()
+
+@router.post("/locate", response_model=schemas.WardLocateBatchResult)
+def locate_wards(batch: schemas.WardLocateBatch, db: Session = Depends(get_db)):
+    """Ward lookup for many [lat, lng] points at once"""
+    ward_index.ensure_loaded(db)
+    wards = []
+    positions = {}
+    results = []
+    for region in ward_index.locate_many(batch.points):
+        if region is None:
+            results.append(None)
+            continue
+        index = positions.get(id(region))
+        if index is None:
+            index = positions[id(region)] = len(wards)
+            wards.append(region.to_dict())
+        results.append(index)
+    return {"wards": wards, "results": results}
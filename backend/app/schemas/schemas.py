@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
 
 # Zone Schemas
@@ -133,6 +133,18 @@ class TruckLive(BaseModel):
     class Config:
         from_attributes = True
 
+class TruckNearest(TruckLive):
+    distance_m: float
+
+class TruckTrack(BaseModel):
+    truck_id: str
+    start: datetime
+    end: datetime
+    total_points: int
+    tolerance: float
+    # Each point is [unix_ts, latitude, longitude, speed]
+    points: List[List[float]] = []
+
 class Truck(TruckBase):
     id: str
     latitude: Optional[float] = None
@@ -169,6 +181,16 @@ class Route(RouteBase):
     class Config:
         from_attributes = True
 
+class RouteOptimization(BaseModel):
+    route_id: str
+    # Pickup point ids in visiting order (dump stops last)
+    stops: List[str]
+    estimated_distance: float
+    estimated_time: int
+    previous_distance: float
+    elapsed_ms: float
+    applied: bool
+
 # Pickup Point Schemas
 class PickupPointBase(BaseModel):
     point_code: str
@@ -381,3 +403,55 @@ class GtcCheckpoint(GtcCheckpointBase):
 
 class GtcCheckpointWithTruck(GtcCheckpoint):
     truck_registration_number: Optional[str] = None
+
+# Telemetry Schemas
+class TelemetryFix(BaseModel):
+    imei: str
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    speed: float = 0.0
+    status: Optional[str] = None
+    timestamp: Optional[datetime] = None
+
+class TelemetryBatch(BaseModel):
+    fixes: List[TelemetryFix]
+
+class TelemetryBatchResult(BaseModel):
+    # received = accepted + unknown (IMEI not registered) + rejected (invalid status,
+    # timestamp in the future or older than the position history retention)
+    received: int
+    accepted: int
+    unknown: int = 0
+    rejected: int = 0
+    trucks_updated: int
+    unknown_imeis: List[str] = []
+
+# Ward Lookup Schemas
+class WardLocation(BaseModel):
+    ward_id: Optional[str] = None
+    ward_name: Optional[str] = None
+    prabhag: Optional[str] = None
+    prabhag_id: Optional[str] = None
+    kml_ward_id: Optional[str] = None
+    kml_zone_id: Optional[str] = None
+
+class WardLocateBatch(BaseModel):
+    # [lat, lng] pairs
+    points: List[Tuple[float, float]]
+
+class WardLocateBatchResult(BaseModel):
+    # Each distinct ward once; results[i] is the index into wards for points[i] (null = outside)
+    wards: List[WardLocation]
+    results: List[Optional[int]]
+
+# Geo Import Schemas
+class GeoImportResult(BaseModel):
+    features: int
+    routes: int
+    pickup_points: int
+    assigned_points: int
+    unassigned_points: int
+    skipped: int
+    # Routes created by this import (existing ids are skipped)
+    route_ids: List[str]
+    elapsed_ms: float
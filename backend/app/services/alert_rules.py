@@ -0,0 +1,235 @@
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from .alert_writer import make_alert, write_alerts
+from .live_state import LiveFleetState, LiveTruck, live_state
+from .ward_index import WardIndex, WardPolygon, ward_index
+
+# Speed violation: above the limit for this long
+SPEED_LIMIT_KMH = float(os.getenv("SPEED_LIMIT_KMH", "50"))
+SPEED_VIOLATION_SECONDS = float(os.getenv("SPEED_VIOLATION_SECONDS", "15"))
+# Unauthorized halt: at or below this speed, away from pickup points and dump sites, for this long
+HALT_SPEED_KMH = float(os.getenv("HALT_SPEED_KMH", "3"))
+HALT_MINUTES = float(os.getenv("HALT_MINUTES", "15"))
+# Geofence breach: outside the truck's assigned ward for this long
+WARD_BREACH_SECONDS = float(os.getenv("WARD_BREACH_SECONDS", "120"))
+
+
+class Fix:
+    """One truck fix as seen by rule conditions.
+
+    A single instance is reused for the whole batch. Stop membership comes
+    from the row, as marked by the geofence and trip processors for this
+    very fix; the ward lookup is a method, so a fix only pays for it when
+    a rule asks.
+    """
+
+    __slots__ = ("engine", "row", "truck_id", "ts", "latitude", "longitude", "speed", "status",
+                 "previous_status", "truck", "state")
+
+    def __init__(self, engine: "AlertRuleEngine"):
+        self.engine = engine
+
+    def at_stop(self) -> bool:
+        """Inside a pickup point geofence, GTP or dumping yard"""
+        row = self.row
+        return bool(row.get("in_geofence") or row.get("at_dump_site"))
+
+    def outside_ward(self) -> bool:
+        """Outside the truck's assigned ward (unknown when the truck has no ward or no boundaries are loaded)"""
+        truck = self.truck
+        wards = self.engine.wards
+        if truck is None or truck.ward_id is None or not wards.polygons:
+            return False
+        polygon = wards.locate_polygon(self.latitude, self.longitude, self.state.polygon)
+        self.state.polygon = polygon
+        return polygon is None or polygon.region.ward_id != truck.ward_id
+
+
+class Rule:
+    """A declarative alert rule.
+
+    ``condition`` is evaluated on every fix; once it has held continuously
+    for ``hold_seconds`` one alert is raised, and the rule stays quiet until
+    the condition clears (one alert per episode). ``message`` is formatted
+    with ``speed``, ``status``, ``minutes`` (how long it has held) and
+    ``ward_id``.
+    """
+
+    __slots__ = ("alert_type", "severity", "condition", "hold_seconds", "message")
+
+    def __init__(self, alert_type: str, severity: str, condition: Callable[[Fix], bool], message: str,
+                 hold_seconds: float = 0.0):
+        self.alert_type = alert_type
+        self.severity = severity
+        self.condition = condition
+        self.hold_seconds = hold_seconds
+        self.message = message
+
+
+# Conditions. Each is O(1) per fix: a comparison or one or two dict lookups;
+# the ward check tries the truck's last polygon before the STR-tree.
+
+def speed_above(limit_kmh: float) -> Callable[[Fix], bool]:
+    return lambda fix: fix.speed > limit_kmh
+
+
+def halted_away_from_stops(max_speed_kmh: float) -> Callable[[Fix], bool]:
+    # Breakdowns have their own rule; offline trucks are not halting on purpose
+    return lambda fix: (fix.speed <= max_speed_kmh and fix.status not in ("breakdown", "offline")
+                        and not fix.at_stop())
+
+
+def outside_assigned_ward() -> Callable[[Fix], bool]:
+    return lambda fix: fix.outside_ward()
+
+
+def status_changed_to(status: str) -> Callable[[Fix], bool]:
+    return lambda fix: fix.status == status and fix.previous_status not in (None, status)
+
+
+DEFAULT_RULES = (
+    Rule("speed_violation", "medium", speed_above(SPEED_LIMIT_KMH),
+         f"Speed {{speed:.0f}} km/h above the {SPEED_LIMIT_KMH:.0f} km/h limit",
+         hold_seconds=SPEED_VIOLATION_SECONDS),
+    Rule("unauthorized_halt", "medium", halted_away_from_stops(HALT_SPEED_KMH),
+         "Halted for {minutes:.0f} min away from pickup points and dump sites",
+         hold_seconds=HALT_MINUTES * 60),
+    Rule("geofence_breach", "high", outside_assigned_ward(),
+         "Outside assigned ward {ward_id} for {minutes:.0f} min",
+         hold_seconds=WARD_BREACH_SECONDS),
+    Rule("breakdown", "high", status_changed_to("breakdown"),
+         "Reported breakdown (was {status})"),
+)
+
+
+class TruckRuleState:
+    """Compact per-truck state: last status, cached ward polygon and one episode slot per rule"""
+
+    __slots__ = ("last_fix", "status", "polygon", "since", "reported")
+
+    def __init__(self, rule_count: int):
+        self.last_fix: Optional[datetime] = None
+        self.status: Optional[str] = None
+        self.polygon: Optional[WardPolygon] = None
+        # since[i] is when rule i's condition started holding (None = not holding)
+        self.since: List[Optional[datetime]] = [None] * rule_count
+        self.reported = [False] * rule_count
+
+
+class AlertRuleEngine:
+    """Evaluates alert rules over the telemetry stream.
+
+    Runs as a position history processor: every batch of fixes is walked
+    in (truck, time) order, each rule's condition is checked against the
+    truck's state, and the alerts raised by the whole batch are written in
+    one insert within the batch transaction.
+    """
+
+    def __init__(self, rules: Sequence[Rule] = DEFAULT_RULES, fleet: LiveFleetState = live_state,
+                 wards: WardIndex = ward_index):
+        self.rules = tuple(rules)
+        self.fleet = fleet
+        self.wards = wards
+        self._states: Dict[str, TruckRuleState] = {}
+        self._lock = threading.Lock()
+        self.fixes_processed = 0
+        self.alerts_raised: Dict[str, int] = {rule.alert_type: 0 for rule in self.rules}
+
+    def process(self, db: Session, rows: List[dict]) -> int:
+        """Evaluate the rules over a batch of fixes (position history rows); writes the alerts raised"""
+        with self._lock:
+            alerts = self._process(sorted(rows, key=lambda row: (row["truck_id"], row["ts"])))
+        write_alerts(db, alerts)
+        return len(alerts)
+
+    def _process(self, rows: List[dict]) -> list:
+        rules = self.rules
+        states = self._states
+        fleet = self.fleet
+        rule_count = len(rules)
+        fix = Fix(self)
+        alerts = []
+
+        for row in rows:
+            truck_id = row["truck_id"]
+            ts = row["ts"]
+            state = states.get(truck_id)
+            if state is None:
+                state = states[truck_id] = TruckRuleState(rule_count)
+            elif state.last_fix is not None and ts <= state.last_fix:
+                continue
+            state.last_fix = ts
+
+            fix.row = row
+            fix.truck_id = truck_id
+            fix.ts = ts
+            fix.latitude = row["latitude"]
+            fix.longitude = row["longitude"]
+            fix.speed = row["speed"] or 0.0
+            # Fixes without a status (plain telemetry) keep the last known one
+            fix.status = row["status"] or state.status
+            fix.previous_status = state.status
+            fix.truck = fleet.get(truck_id)
+            fix.state = state
+
+            since = state.since
+            reported = state.reported
+            for index in range(rule_count):
+                rule = rules[index]
+                if not rule.condition(fix):
+                    since[index] = None
+                    reported[index] = False
+                    continue
+                started = since[index]
+                if started is None:
+                    started = since[index] = ts
+                if reported[index] or (ts - started).total_seconds() < rule.hold_seconds:
+                    continue
+                reported[index] = True
+                alerts.append(self._alert(rule, fix, started))
+
+            state.status = fix.status
+
+        self.fixes_processed += len(rows)
+        for alert in alerts:
+            self.alerts_raised[alert.alert_type] += 1
+        return alerts
+
+    @staticmethod
+    def _alert(rule: Rule, fix: Fix, started: datetime):
+        truck: Optional[LiveTruck] = fix.truck
+        message = rule.message.format(
+            speed=fix.speed,
+            status=fix.previous_status,
+            minutes=(fix.ts - started).total_seconds() / 60,
+            ward_id=truck.ward_id if truck is not None else None,
+        )
+        return make_alert(
+            fix.truck_id,
+            rule.alert_type,
+            rule.severity,
+            message,
+            fix.ts,
+            fix.latitude,
+            fix.longitude,
+            route_id=truck.assigned_route_id if truck is not None else None,
+            zone_id=truck.zone_id if truck is not None else None,
+            ward_id=truck.ward_id if truck is not None else None,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "rules": [rule.alert_type for rule in self.rules],
+            "trucks": len(self._states),
+            "fixes_processed": self.fixes_processed,
+            "alerts_raised": dict(self.alerts_raised),
+        }
+
+
+# Global alert rule engine instance
+alert_rule_engine = AlertRuleEngine()
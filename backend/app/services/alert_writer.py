@@ -0,0 +1,63 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+from ..models.models import Alert
+from ..schemas import schemas
+from .pubsub import ALERTS_TOPIC, pubsub
+
+# Session.info key holding alert payloads that wait for their transaction to commit
+PENDING_ALERTS = "pending_alerts"
+
+
+def make_alert(truck_id: str, alert_type: str, severity: str, message: str, timestamp: datetime,
+               latitude: Optional[float] = None, longitude: Optional[float] = None,
+               route_id: Optional[str] = None, zone_id: Optional[str] = None,
+               ward_id: Optional[str] = None) -> Alert:
+    """Alert row in the same shape as the seeded and API-created ones"""
+    return Alert(
+        truck_id=truck_id,
+        route_id=route_id,
+        zone_id=zone_id,
+        ward_id=ward_id,
+        alert_type=alert_type,
+        severity=severity,
+        message=message,
+        location=f"{latitude:.6f}, {longitude:.6f}" if latitude is not None and longitude is not None else None,
+        timestamp=timestamp,
+        date=timestamp.strftime("%Y-%m-%d"),
+        status="active",
+    )
+
+
+def write_alerts(db: Session, alerts: List[Alert]) -> List[Alert]:
+    """Insert detector alerts in one batch; they reach live clients once committed.
+
+    Runs inside the caller's transaction (e.g. a position history flush):
+    the rows are flushed to get their ids but committed by the caller, and
+    only published after that commit succeeds. A rollback discards them.
+    """
+    if not alerts:
+        return alerts
+    db.add_all(alerts)
+    db.flush()
+    # Serialized now: after the commit the rows are expired and cannot be reloaded in the hook
+    db.info.setdefault(PENDING_ALERTS, []).extend(
+        schemas.Alert.model_validate(alert).model_dump(mode="json") for alert in alerts
+    )
+    return alerts
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_alerts(session: Session):
+    for payload in session.info.pop(PENDING_ALERTS, ()):
+        pubsub.publish(ALERTS_TOPIC, payload)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_uncommitted_alerts(session: Session, transaction: SessionTransaction):
+    # Rolled back, or closed without a commit; after a commit the list is already gone
+    if transaction.parent is None:
+        session.info.pop(PENDING_ALERTS, None)
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class BackgroundWorker:
+    """Runs a blocking tick function on a dedicated thread, off the event loop.
+
+    Every ``interval`` seconds the thread calls ``tick()`` (simulation,
+    database writes...) and hands its result to the event loop through an
+    asyncio queue via call_soon_threadsafe. The queue holds one result: if
+    the consumer falls behind, only the newest result is kept.
+    """
+
+    def __init__(self, tick: Callable[[], Any], interval: float = 5.0, name: str = "background-worker"):
+        self.tick = tick
+        self.interval = interval
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_tick_seconds = 0.0
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=1)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Ask the thread to exit and wait for the tick in progress to finish"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout if timeout is not None else self.interval * 2)
+            self._thread = None
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                result = self.tick()
+            except Exception as e:
+                print(f"Error in {self.name}: {e}")
+            else:
+                try:
+                    self._loop.call_soon_threadsafe(self._deliver, result)
+                except RuntimeError:
+                    # Event loop already closed (shutdown)
+                    break
+            self.last_tick_seconds = time.monotonic() - started
+
+            # Fixed-rate schedule; a slow tick is followed immediately by the next one
+            next_tick = max(next_tick + self.interval, time.monotonic())
+            self._stop.wait(next_tick - time.monotonic())
+
+    def _deliver(self, result: Any):
+        # Runs on the event loop thread
+        if self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(result)
+
+    async def results(self):
+        """Async iterator over tick results, newest first if the consumer lags"""
+        while True:
+            yield await self._queue.get()
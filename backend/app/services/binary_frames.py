@@ -0,0 +1,112 @@
+import struct
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+# Binary live position frames (opt-in with {"type": "subscribe", "encoding": "binary"}).
+#
+# Header, little endian:
+#   uint8  version (FRAME_VERSION)
+#   uint8  kind (FRAME_SNAPSHOT / FRAME_DELTA)
+#   uint32 seq
+#   uint32 frame time, unix seconds
+#   uint16 number of position records
+#   uint16 number of removed truck indexes
+# Then one 16-byte record per truck:
+#   uint16 truck index (see TruckIndex)
+#   int32  latitude * 1e7
+#   int32  longitude * 1e7
+#   uint16 speed * 10 (km/h)
+#   uint8  status code (STATUS_CODES)
+#   uint8  trips completed
+#   uint16 seconds since the truck's last update, relative to frame time (0xFFFF = unknown)
+# Then one uint16 truck index per removed truck.
+
+FRAME_VERSION = 1
+FRAME_SNAPSHOT = 1
+FRAME_DELTA = 2
+INDEX_TYPE = "truck_index"
+
+HEADER = struct.Struct("<BBIIHH")
+RECORD = struct.Struct("<HiiHBBH")
+REMOVED = struct.Struct("<H")
+
+COORD_SCALE = 1e7
+SPEED_SCALE = 10
+UNKNOWN_AGE = 0xFFFF
+
+STATUS_CODES = {"idle": 0, "moving": 1, "dumping": 2, "offline": 3, "breakdown": 4}
+
+
+class TruckIndex:
+    """Append-only truck id -> uint16 index table shared by all binary clients.
+
+    Clients receive the table as a JSON ``truck_index`` frame listing
+    ``[id, registration_number]`` pairs in index order, so records only carry
+    the two-byte index. ``version`` grows whenever trucks are added.
+    """
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._entries: List[list] = []
+        self.version = 0
+        self._message_text: Optional[str] = None
+
+    def add_all(self, positions: List[dict]):
+        index = self._index
+        for position in positions:
+            truck_id = position["id"]
+            if truck_id not in index:
+                index[truck_id] = len(self._entries)
+                self._entries.append([truck_id, position.get("registration_number")])
+                self.version += 1
+                self._message_text = None
+
+    def get(self, truck_id: str) -> int:
+        return self._index[truck_id]
+
+    def message(self) -> dict:
+        return {"type": INDEX_TYPE, "version": self.version, "trucks": self._entries}
+
+    def message_text(self, encode) -> str:
+        if self._message_text is None:
+            self._message_text = encode(self.message())
+        return self._message_text
+
+
+def _clamp(value: int, low: int, high: int) -> int:
+    return low if value < low else high if value > high else value
+
+
+def encode_positions(kind: int, seq: int, frame_time: datetime, positions: List[dict],
+                     removed: List[str], index: TruckIndex) -> bytes:
+    """Pack one snapshot or delta; every truck must already be in ``index``"""
+    # Naive datetimes in this app are UTC
+    now = frame_time.replace(tzinfo=timezone.utc).timestamp()
+    buffer = bytearray(HEADER.size + RECORD.size * len(positions) + REMOVED.size * len(removed))
+    HEADER.pack_into(buffer, 0, FRAME_VERSION, kind, seq & 0xFFFFFFFF, int(now), len(positions), len(removed))
+
+    offset = HEADER.size
+    pack_record = RECORD.pack_into
+    for position in positions:
+        last_update = position["last_update"]
+        if last_update:
+            age = (frame_time - datetime.fromisoformat(last_update)).total_seconds()
+            age = _clamp(int(age), 0, UNKNOWN_AGE - 1)
+        else:
+            age = UNKNOWN_AGE
+        pack_record(
+            buffer, offset,
+            index.get(position["id"]),
+            round(position["latitude"] * COORD_SCALE),
+            round(position["longitude"] * COORD_SCALE),
+            _clamp(round((position["speed"] or 0) * SPEED_SCALE), 0, 0xFFFF),
+            STATUS_CODES.get(position["status"], 0),
+            _clamp(position["trips_completed"] or 0, 0, 0xFF),
+            age,
+        )
+        offset += RECORD.size
+
+    for truck_id in removed:
+        REMOVED.pack_into(buffer, offset, index.get(truck_id))
+        offset += REMOVED.size
+    return bytes(buffer)
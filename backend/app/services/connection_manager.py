@@ -0,0 +1,273 @@
+import asyncio
+import json
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple, Union
+
+from fastapi import WebSocket
+
+from .binary_frames import INDEX_TYPE, TruckIndex
+from .live_feed import DELTA_TYPE, SNAPSHOT_TYPE, encode_frame
+from .live_state import LiveFleetState, live_state
+from .pubsub import ALERTS_TOPIC, GEOFENCE_TOPIC, POSITIONS_TOPIC, TRIPS_TOPIC, PubSub
+from .subscriptions import LiveView, SubscriptionFilter, SubscriptionIndex
+
+# Frames that report discrete events: queued in order, never superseded by a newer one
+EVENT_TYPES = ("alert", "geofence", "trips")
+
+
+class ClientConnection:
+    """One WebSocket viewer with its own bounded outbound queue and writer task."""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        # (frame type, encoded JSON text or binary frame)
+        self.pending: Deque[Tuple[Optional[str], Union[str, bytes]]] = deque()
+        self.wakeup = asyncio.Event()
+        self.writer_task: Optional[asyncio.Task] = None
+        # Frames replaced or discarded since the writer last drained the queue
+        self.backlog_drops = 0
+        # "full": a complete position snapshot every tick (default)
+        # "delta": one snapshot, then only changed trucks, sequenced
+        self.mode = "full"
+        self.needs_snapshot = False
+        # "json" or "binary" position frames (see binary_frames.py)
+        self.encoding = "json"
+        # TruckIndex version last queued to a binary client
+        self.index_version = 0
+        # Filtered view of the fleet this client is subscribed to
+        self.view: Optional[LiveView] = None
+
+
+class ConnectionManager:
+    """Fans frames out to WebSocket clients without letting one slow viewer stall the rest.
+
+    broadcast() serializes a frame once and only enqueues the encoded text;
+    each client has a writer task that sends its frames in order. Pending
+    frames of the same type are coalesced (latest wins), the queue is bounded,
+    and clients that keep falling behind or stop accepting data are evicted.
+
+    The manager is fed by pub/sub (subscribe_to) rather than by producers
+    directly, so any worker can serve WebSocket clients. Position frames are
+    produced per LiveView (clients sharing a subscription
+    filter), so each distinct filter is diffed and encoded once per tick and
+    encoding. Binary clients share one TruckIndex string table.
+    """
+
+    def __init__(self, fleet: LiveFleetState, max_pending: int = 8, send_timeout: float = 10.0,
+                 max_backlog_drops: int = 12):
+        self.fleet = fleet
+        self.subscriptions = SubscriptionIndex()
+        self.truck_index = TruckIndex()
+        self.max_pending = max_pending
+        self.send_timeout = send_timeout
+        self.max_backlog_drops = max_backlog_drops
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+
+    def subscribe_to(self, pubsub: PubSub):
+        pubsub.subscribe(POSITIONS_TOPIC, self.broadcast_positions)
+        pubsub.subscribe(ALERTS_TOPIC, self.broadcast_alert)
+        # Already {"type": "geofence" | "trips", "events": [...]}
+        pubsub.subscribe(GEOFENCE_TOPIC, self.broadcast)
+        pubsub.subscribe(TRIPS_TOPIC, self.broadcast)
+
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
+        await websocket.accept()
+        client = ClientConnection(websocket)
+        client.writer_task = asyncio.create_task(self._writer(client))
+        self.active_connections[websocket] = client
+        self._attach(client, self.subscriptions.default_view)
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.active_connections.pop(websocket, None)
+        if client is None:
+            return
+        self._detach(client)
+        if client.writer_task and client.writer_task is not asyncio.current_task():
+            client.writer_task.cancel()
+
+    def _attach(self, client: ClientConnection, view: LiveView) -> bool:
+        """Move a client onto a view and queue that view's snapshot"""
+        if client.view is not view:
+            self._detach(client)
+            if not view.clients:
+                # Views are not advanced while nobody watches them; catch up first
+                positions = self.fleet.positions()
+                self.truck_index.add_all(positions)
+                view.feed.advance(self.subscriptions.positions_for(view, positions, self.fleet.get))
+            view.clients.add(client)
+            client.view = view
+        if not view.feed.seq:
+            # Nothing published yet: the first tick goes out as a snapshot
+            client.needs_snapshot = True
+            return True
+        return self._enqueue_snapshot(client)
+
+    def _detach(self, client: ClientConnection):
+        view = client.view
+        if view is not None:
+            view.clients.discard(client)
+            self.subscriptions.release(view)
+            client.view = None
+
+    async def _evict(self, client: ClientConnection, reason: str):
+        print(f"Evicting WebSocket client: {reason}")
+        self.disconnect(client.websocket)
+        try:
+            await client.websocket.close(code=1013)
+        except Exception:
+            # Socket already gone
+            pass
+
+    async def _writer(self, client: ClientConnection):
+        try:
+            while True:
+                while not client.pending:
+                    client.wakeup.clear()
+                    client.backlog_drops = 0
+                    await client.wakeup.wait()
+                _, payload = client.pending.popleft()
+                if isinstance(payload, bytes):
+                    send = client.websocket.send_bytes(payload)
+                else:
+                    send = client.websocket.send_text(payload)
+                await asyncio.wait_for(send, timeout=self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            await self._evict(client, "send timed out")
+        except Exception as e:
+            await self._evict(client, f"send failed ({e.__class__.__name__})")
+
+    def _enqueue(self, client: ClientConnection, message_type: Optional[str], payload: Union[str, bytes]) -> bool:
+        """Queue an encoded frame for one client; returns False if the client had to be evicted"""
+        pending = client.pending
+        frame = (message_type, payload)
+
+        for index, (queued_type, _) in enumerate(pending):
+            if queued_type == message_type and message_type not in EVENT_TYPES:
+                # An unsent frame of this type is superseded by the newer one
+                pending[index] = frame
+                client.backlog_drops += 1
+                break
+        else:
+            if len(pending) >= self.max_pending:
+                pending.popleft()
+                client.backlog_drops += 1
+            pending.append(frame)
+
+        if client.backlog_drops > self.max_backlog_drops:
+            return False
+        client.wakeup.set()
+        return True
+
+    async def send(self, websocket: WebSocket, message: dict):
+        client = self.active_connections.get(websocket)
+        if client and not self._enqueue(client, message.get("type"), encode_frame(message)):
+            await self._evict(client, "too slow to keep up")
+
+    async def handle_message(self, websocket: WebSocket, text: str):
+        """Client control messages.
+
+        {"type": "subscribe", "mode": "delta"|"full", "encoding": "json"|"binary",
+        "zone_id", "ward_id", "route_id", "bbox": [west, south, east, north]}
+        (all filters optional) and {"type": "resync"}.
+        """
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        try:
+            message = json.loads(text)
+        except ValueError:
+            # Plain-text keepalive ("ping")
+            return
+        if not isinstance(message, dict):
+            return
+
+        message_type = message.get("type")
+        if message_type == "subscribe":
+            try:
+                subscription_filter = SubscriptionFilter.from_message(message)
+            except (TypeError, ValueError) as e:
+                await self.send(websocket, {"type": "error", "detail": str(e)})
+                return
+            client.mode = "delta" if message.get("mode") == "delta" else "full"
+            client.encoding = "binary" if message.get("encoding") == "binary" else "json"
+            client.index_version = 0
+            ok = self._attach(client, self.subscriptions.view_for(subscription_filter))
+        elif message_type == "resync":
+            client.index_version = 0
+            ok = self._attach(client, client.view)
+        else:
+            return
+
+        if not ok:
+            await self._evict(client, "too slow to keep up")
+
+    def _sync_index(self, client: ClientConnection) -> bool:
+        """Queue the truck string table ahead of binary frames that use new indexes"""
+        if client.encoding != "binary" or client.index_version == self.truck_index.version:
+            return True
+        client.index_version = self.truck_index.version
+        return self._enqueue(client, INDEX_TYPE, self.truck_index.message_text(encode_frame))
+
+    def _enqueue_snapshot(self, client: ClientConnection) -> bool:
+        # Position frames queued before a snapshot are obsolete once it is sent; dropping
+        # them (rather than replacing in place) keeps it behind any truck_index frame
+        client.pending = deque(frame for frame in client.pending if frame[0] not in (DELTA_TYPE, SNAPSHOT_TYPE))
+        client.needs_snapshot = False
+        feed = client.view.feed
+        if client.encoding == "binary":
+            return self._sync_index(client) and self._enqueue(client, SNAPSHOT_TYPE, feed.snapshot_binary(self.truck_index))
+        return self._enqueue(client, SNAPSHOT_TYPE, feed.snapshot_text())
+
+    def _enqueue_delta(self, client: ClientConnection) -> bool:
+        feed = client.view.feed
+        if client.encoding == "binary":
+            return self._sync_index(client) and self._enqueue(client, DELTA_TYPE, feed.delta_binary(self.truck_index))
+        return self._enqueue(client, DELTA_TYPE, feed.delta_text())
+
+    async def broadcast_positions(self, positions: list):
+        """Publish one tick: each view gets the trucks matching its filter.
+
+        Full-mode clients receive the view's snapshot, delta-mode clients only
+        the trucks that changed (or left the view) since the previous tick.
+        """
+        slow_clients = []
+        self.truck_index.add_all(positions)
+        buckets = self.subscriptions.route(positions, self.fleet.get)
+        for view, view_positions in buckets.items():
+            if not view.feed.advance(view_positions):
+                continue
+            for client in list(view.clients):
+                if client.mode != "delta":
+                    ok = self._enqueue_snapshot(client)
+                elif client.needs_snapshot or any(frame[0] == DELTA_TYPE for frame in client.pending):
+                    # A delta client that has not drained its last delta cannot have
+                    # frames merged; replace the backlog with one snapshot instead
+                    client.backlog_drops += 1
+                    ok = self._enqueue_snapshot(client)
+                else:
+                    ok = self._enqueue_delta(client)
+                if not ok:
+                    slow_clients.append(client)
+        for client in slow_clients:
+            await self._evict(client, "too slow to keep up")
+
+    async def broadcast_alert(self, alert: dict):
+        await self.broadcast({"type": "alert", "data": alert})
+
+    async def broadcast(self, message: dict):
+        # Encoded once per tick; every client queue shares the same string
+        message_type = message.get("type")
+        text = encode_frame(message)
+        slow_clients = [
+            client for client in list(self.active_connections.values())
+            if not self._enqueue(client, message_type, text)
+        ]
+        for client in slow_clients:
+            await self._evict(client, "too slow to keep up")
+
+
+# Global connection manager instance
+manager = ConnectionManager(live_state)
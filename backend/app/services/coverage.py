@@ -0,0 +1,230 @@
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from ..database.database import SessionLocal
+from ..models.models import CoverageWatermark, Driver, PickupCoverage, PickupPoint, Truck, Ward, Zone
+from .geo import LocalProjection
+from .geofence import DEFAULT_RADIUS_M
+from .position_history import PositionHistory, parse_ts, position_history
+from .route_simulator import DUMP_TYPES
+from .spatial_index import PointGrid
+
+# How often the leader worker refreshes coverage for days with new telemetry
+COVERAGE_INTERVAL_SECONDS = float(os.getenv("COVERAGE_INTERVAL_SECONDS", "600"))
+
+
+class RoutePoints:
+    """A route's pickup points (dump stops excluded) in a grid of projected meters"""
+
+    def __init__(self, points: List[PickupPoint]):
+        self.points = points
+        self.projection = LocalProjection(sum(point.latitude for point in points) / len(points))
+        self.radius = {point.id: float(point.geofence_radius or DEFAULT_RADIUS_M) for point in points}
+        self.reach = max(self.radius.values())
+        self.grid: PointGrid[PickupPoint] = PointGrid(self.reach)
+        self.by_ward: Dict[Optional[str], List[PickupPoint]] = {}
+        for point in points:
+            x, y = self.projection.to_xy(point.latitude, point.longitude)
+            self.grid.insert(point.id, x, y, point)
+            self.by_ward.setdefault(point.ward_id, []).append(point)
+
+    def covered_by(self, fixes: Iterable) -> Dict[str, datetime]:
+        """First fix time inside each point's geofence_radius, for (ts, latitude, longitude, ...) rows"""
+        first_seen: Dict[str, datetime] = {}
+        remaining = len(self.points)
+        last = None
+        for fix in fixes:
+            ts, latitude, longitude = fix[0], fix[1], fix[2]
+            if (latitude, longitude) == last:
+                # Parked: same answer as the previous fix
+                continue
+            last = (latitude, longitude)
+            x, y = self.projection.to_xy(latitude, longitude)
+            for point_id, px, py, _ in self.grid.candidates(x, y, self.reach):
+                if point_id in first_seen:
+                    continue
+                radius = self.radius[point_id]
+                if (px - x) ** 2 + (py - y) ** 2 <= radius * radius:
+                    first_seen[point_id] = parse_ts(ts)
+                    remaining -= 1
+            if not remaining:
+                break
+        return first_seen
+
+
+class CoverageJob:
+    """Daily pickup coverage computed from recorded truck positions.
+
+    For every day with position history, each routed truck's fixes are
+    matched against its route's pickup points (a point is covered when a
+    fix falls within its ``geofence_radius``), giving covered/missed counts
+    per day, route, truck and ward. A watermark (row count and latest fix
+    of the day's partition) is stored per day, so a run only recomputes the
+    days whose telemetry changed since the last one. A past day computed
+    after it ended is closed: it is only checked again when this process
+    has written to it since (position_history.take_written_days()), or
+    when asked for by name.
+    """
+
+    def __init__(self, history: PositionHistory = position_history):
+        self.history = history
+
+    def watermark(self, db: Session, day: date) -> Tuple[int, Optional[datetime]]:
+        """(row count, latest fix) of a day's position partition"""
+        table = self.history.partition_model(day).__table__
+        positions, max_ts = db.execute(select(func.count(), func.max(table.c.ts))).one()
+        return positions, parse_ts(max_ts) if max_ts is not None else None
+
+    def pending_days(self, db: Session, days: Optional[Iterable[date]] = None, force: bool = False,
+                     written: Iterable[date] = ()) -> List[Tuple[date, int, Optional[datetime]]]:
+        """(day, positions, max_ts) for days whose partition differs from its watermark.
+
+        Without ``days``, closed days are skipped unless they are in ``written``.
+        """
+        existing = self.history.existing_days(db)
+        candidates = sorted(existing if days is None else set(days) & existing)
+        watermarks = {
+            mark.day: mark
+            for mark in db.query(CoverageWatermark).filter(CoverageWatermark.day.in_(candidates))
+        }
+        written = set(written)
+        pending = []
+        for day in candidates:
+            mark = watermarks.get(day)
+            if (days is None and not force and mark is not None and day not in written
+                    and mark.computed_at >= datetime.combine(day + timedelta(days=1), time.min)):
+                # Closed and untouched: skip the count(*)/max(ts) scan
+                continue
+            current = self.watermark(db, day)
+            if force or mark is None or (mark.positions, mark.max_ts) != current:
+                pending.append((day, *current))
+        return pending
+
+    def run(self, db: Session, days: Optional[Iterable[date]] = None, force: bool = False) -> List[date]:
+        """Recompute coverage for days with new telemetry (every day in ``days`` with ``force``)"""
+        written = self.history.take_written_days()
+        try:
+            pending = self.pending_days(db, days, force, written)
+            if not pending:
+                return []
+
+            routes = self.load_routes(db)
+            trucks = db.query(Truck.id, Truck.assigned_route_id).filter(Truck.assigned_route_id.isnot(None)).all()
+            for day, positions, max_ts in pending:
+                rows = self.compute_day(db, day, routes, trucks)
+                db.execute(delete(PickupCoverage).where(PickupCoverage.day == day))
+                if rows:
+                    db.execute(PickupCoverage.__table__.insert(), rows)
+                db.merge(CoverageWatermark(day=day, positions=positions, max_ts=max_ts, computed_at=datetime.utcnow()))
+                db.commit()
+        except Exception:
+            # Check these days again on the next run
+            self.history.mark_written(written)
+            raise
+        return [day for day, _, _ in pending]
+
+    def load_routes(self, db: Session) -> Dict[str, RoutePoints]:
+        points = db.query(PickupPoint).filter(
+            PickupPoint.route_id.isnot(None),
+            PickupPoint.status == "active",
+            PickupPoint.type.notin_(DUMP_TYPES),
+        ).all()
+        by_route: Dict[str, List[PickupPoint]] = {}
+        for point in points:
+            by_route.setdefault(point.route_id, []).append(point)
+        return {route_id: RoutePoints(route_points) for route_id, route_points in by_route.items()}
+
+    def compute_day(self, db: Session, day: date, routes: Dict[str, RoutePoints], trucks: List) -> List[dict]:
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1) - timedelta(microseconds=1)
+        computed_at = datetime.utcnow()
+        rows = []
+        for truck_id, route_id in trucks:
+            route = routes.get(route_id)
+            if route is None:
+                continue
+            first_seen = route.covered_by(self.history.iter_range(db, truck_id, start, end))
+            for ward_id, ward_points in route.by_ward.items():
+                times = [first_seen[point.id] for point in ward_points if point.id in first_seen]
+                rows.append({
+                    "day": day,
+                    "route_id": route_id,
+                    "truck_id": truck_id,
+                    "ward_id": ward_id,
+                    "total_points": len(ward_points),
+                    "covered": len(times),
+                    "missed": len(ward_points) - len(times),
+                    "first_pickup_at": min(times) if times else None,
+                    "last_pickup_at": max(times) if times else None,
+                    "computed_at": computed_at,
+                })
+        return rows
+
+    def run_once(self) -> List[date]:
+        """Incremental run in its own session (background worker tick)"""
+        db = SessionLocal()
+        try:
+            days = self.run(db)
+            if days:
+                print(f"Pickup coverage recomputed for {', '.join(day.isoformat() for day in days)}")
+            return days
+        finally:
+            db.close()
+
+
+def coverage_status(covered: int, total: int) -> str:
+    if total and covered >= total:
+        return "completed"
+    if covered:
+        return "partial"
+    return "missed"
+
+
+def coverage_report(db: Session, days: int = 30) -> List[dict]:
+    """Rows of the daily_pickup_coverage report for the last ``days`` computed days"""
+    latest = db.query(func.max(PickupCoverage.day)).scalar()
+    if latest is None:
+        return []
+    rows = db.query(
+        PickupCoverage, Truck.registration_number, Driver.name, Ward.name, Zone.name
+    ).join(
+        Truck, PickupCoverage.truck_id == Truck.id
+    ).outerjoin(
+        Driver, Truck.driver_id == Driver.id
+    ).outerjoin(
+        Ward, PickupCoverage.ward_id == Ward.id
+    ).outerjoin(
+        Zone, Ward.zone_id == Zone.id
+    ).filter(
+        PickupCoverage.day > latest - timedelta(days=days)
+    ).order_by(
+        PickupCoverage.day.desc(), PickupCoverage.route_id, PickupCoverage.truck_id, PickupCoverage.ward_id
+    ).all()
+    return [
+        {
+            "id": coverage.id,
+            "date": coverage.day.isoformat(),
+            "route": coverage.route_id,
+            "ward": ward_name or coverage.ward_id,
+            "zone": zone_name,
+            "truck": registration_number,
+            "driver": driver_name,
+            "totalPoints": coverage.total_points,
+            "covered": coverage.covered,
+            "missed": coverage.missed,
+            # Not measured by telemetry; weighbridge data is not recorded yet
+            "weight": None,
+            "firstPickup": coverage.first_pickup_at.isoformat(timespec="seconds") if coverage.first_pickup_at else None,
+            "lastPickup": coverage.last_pickup_at.isoformat(timespec="seconds") if coverage.last_pickup_at else None,
+            "status": coverage_status(coverage.covered, coverage.total_points),
+        }
+        for coverage, registration_number, driver_name, ward_name, zone_name in rows
+    ]
+
+
+# Global coverage job instance
+coverage_job = CoverageJob()
@@ -0,0 +1,149 @@
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional, see requirements.txt; VehicleSimulator falls back to the scalar path
+    np = None
+
+from ..models.models import TruckStatus
+
+# Status codes used in the status array
+STATUSES = [TruckStatus.IDLE, TruckStatus.MOVING, TruckStatus.DUMPING, TruckStatus.OFFLINE, TruckStatus.BREAKDOWN]
+IDLE, MOVING, DUMPING, OFFLINE, BREAKDOWN = range(len(STATUSES))
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+
+# Same behaviour as VehicleSimulator.simulate_truck_movement
+MIN_SPEED_KMH = 15.0
+MAX_SPEED_KMH = 40.0
+P_START_DUMPING = 0.1
+P_START_MOVING = 0.3
+P_FINISH_DUMPING = 0.4
+P_BACK_ONLINE = 0.05
+METERS_PER_DEGREE = 111000.0
+
+
+class FleetSimulator:
+    """Vectorized fleet simulation: the whole fleet advances in one NumPy step.
+
+    Status, position, speed and trips live in parallel arrays (one slot per
+    truck) and every status transition is a boolean mask, so a tick costs a
+    handful of array operations instead of a Python loop over trucks. Results
+    reach the live store and position history through their bulk write paths.
+    Trips are only read: the trip detector counts them from the fixes.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        if np is None:
+            raise RuntimeError("FleetSimulator requires numpy")
+        self.rng = np.random.default_rng(seed)
+        self.ids: List[str] = []
+        self.fleet_version: Optional[int] = None
+        self._allocate(0)
+
+    def _allocate(self, n: int):
+        self.status = np.zeros(n, dtype=np.int8)
+        self.latitude = np.full(n, np.nan)
+        self.longitude = np.full(n, np.nan)
+        self.speed = np.zeros(n)
+        self.trips = np.zeros(n, dtype=np.int32)
+        self.trips_allowed = np.zeros(n, dtype=np.int32)
+        self.lat_min = np.zeros(n)
+        self.lat_max = np.zeros(n)
+        self.lng_min = np.zeros(n)
+        self.lng_max = np.zeros(n)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def load(self, trucks: Sequence, bounds_for: Callable[[Optional[str]], dict]):
+        """Copy trucks (LiveTruck or anything with the same attributes) into the arrays"""
+        self.ids = [truck.id for truck in trucks]
+        self._allocate(len(trucks))
+        for i, truck in enumerate(trucks):
+            self.trips_allowed[i] = truck.trips_allowed
+            bounds = bounds_for(truck.zone_id)
+            self.lat_min[i], self.lat_max[i] = bounds["lat_min"], bounds["lat_max"]
+            self.lng_min[i], self.lng_max[i] = bounds["lng_min"], bounds["lng_max"]
+        self.refresh(trucks)
+
+    def refresh(self, trucks: Sequence):
+        """Re-read the live fields of ``trucks`` (in ``ids`` order) before a step.
+
+        Telemetry and other writers change the live store between ticks; the
+        arrays start every step from its current state instead of from the
+        simulator's own last write.
+        """
+        self.status = np.array([STATUS_CODES.get(truck.current_status, IDLE) for truck in trucks], dtype=np.int8)
+        # None (or 0) coordinates become NaN: the truck has not been placed yet
+        self.latitude = np.array([truck.latitude or np.nan for truck in trucks], dtype=float)
+        self.longitude = np.array([truck.longitude or np.nan for truck in trucks], dtype=float)
+        self.speed = np.array([truck.speed or 0.0 for truck in trucks], dtype=float)
+        self.trips = np.array([truck.trips_completed or 0 for truck in trucks], dtype=np.int32)
+
+    def step(self, interval: float = 5.0):
+        """Advance every truck by one tick of ``interval`` seconds; returns the mask of updated trucks"""
+        n = len(self.ids)
+        rng = self.rng
+        status = self.status
+        roll = rng.random(n)
+
+        active = status != BREAKDOWN
+        unplaced = active & (np.isnan(self.latitude) | np.isnan(self.longitude))
+        placed = active & ~unplaced
+
+        moving = placed & (status == MOVING)
+        finished = moving & (self.trips >= self.trips_allowed)
+        driving = moving & ~finished
+        to_dumping = driving & (roll < P_START_DUMPING)
+        to_moving = placed & (status == IDLE) & (roll < P_START_MOVING)
+        done_dumping = placed & (status == DUMPING) & (roll < P_FINISH_DUMPING)
+        back_online = placed & (status == OFFLINE) & (roll < P_BACK_ONLINE)
+
+        # Movement: random speed and heading, clamped to the zone bounds
+        speed = rng.uniform(MIN_SPEED_KMH, MAX_SPEED_KMH, n)
+        heading = rng.uniform(0.0, 2 * np.pi, n)
+        step_deg = speed / METERS_PER_DEGREE / 3600 * interval
+        self.latitude = np.where(
+            driving, np.clip(self.latitude + step_deg * np.cos(heading), self.lat_min, self.lat_max), self.latitude
+        )
+        self.longitude = np.where(
+            driving, np.clip(self.longitude + step_deg * np.sin(heading), self.lng_min, self.lng_max), self.longitude
+        )
+        self.speed = np.where(active, np.where(driving & ~to_dumping, speed, 0.0), self.speed)
+
+        # Trucks without a position are dropped somewhere inside their zone
+        if unplaced.any():
+            self.latitude = np.where(unplaced, rng.uniform(self.lat_min, self.lat_max), self.latitude)
+            self.longitude = np.where(unplaced, rng.uniform(self.lng_min, self.lng_max), self.longitude)
+
+        status[finished | back_online | unplaced] = IDLE
+        status[to_dumping] = DUMPING
+        status[to_moving | done_dumping] = MOVING
+        return active
+
+    def write_back(self, updated, live_state, position_history, now: Optional[datetime] = None) -> int:
+        """Push updated trucks into the live store and history buffer in bulk"""
+        now = now or datetime.utcnow()
+        index = np.flatnonzero(updated)
+        if not len(index):
+            return 0
+        ids = [self.ids[i] for i in index.tolist()]
+        latitudes = self.latitude[index].tolist()
+        longitudes = self.longitude[index].tolist()
+        speeds = self.speed[index].tolist()
+        statuses = [STATUSES[code] for code in self.status[index].tolist()]
+
+        live_state.update_many(ids, latitudes, longitudes, speeds, statuses, now)
+        position_history.record_many(
+            {
+                "truck_id": truck_id,
+                "ts": now,
+                "latitude": latitude,
+                "longitude": longitude,
+                "speed": speed,
+                "status": status.value,
+            }
+            for truck_id, latitude, longitude, speed, status in zip(ids, latitudes, longitudes, speeds, statuses)
+        )
+        return len(ids)
@@ -0,0 +1,41 @@
+import math
+from typing import Tuple
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 110574.0
+METERS_PER_DEG_LNG_EQUATOR = 111320.0
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def meters_per_degree(lat: float) -> Tuple[float, float]:
+    """(meters per degree of longitude, meters per degree of latitude) around ``lat``"""
+    return METERS_PER_DEG_LNG_EQUATOR * math.cos(math.radians(lat)), METERS_PER_DEG_LAT
+
+
+class LocalProjection:
+    """Equirectangular projection to meters around a reference latitude.
+
+    Accurate to well under a percent across a city, and cheap enough to
+    run on every fix before distance comparisons.
+    """
+
+    __slots__ = ("lat0", "mx", "my")
+
+    def __init__(self, lat0: float):
+        self.lat0 = lat0
+        self.mx, self.my = meters_per_degree(lat0)
+
+    def to_xy(self, lat: float, lng: float) -> Tuple[float, float]:
+        return lng * self.mx, lat * self.my
+
+    def to_latlng(self, x: float, y: float) -> Tuple[float, float]:
+        return y / self.my, x / self.mx
@@ -0,0 +1,529 @@
+import codecs
+import json
+import math
+import os
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from collections import Counter
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, update
+from sqlalchemy.orm import Session
+
+from ..models.models import PickupPoint, Route, RouteType, Ward
+from .geo import LocalProjection, haversine_m
+from .ward_index import parse_coordinates, ward_index
+
+# Rows per INSERT/commit while importing
+GEO_IMPORT_BATCH_SIZE = int(os.getenv("GEO_IMPORT_BATCH_SIZE", "1000"))
+READ_CHUNK = 1 << 16
+JSON_WHITESPACE = " \t\r\n\x1e"  # \x1e: RFC 8142 GeoJSON text sequences
+
+
+class GeoImportError(ValueError):
+    """An import that stopped on invalid input; ``routes`` and ``pickup_points`` were already committed"""
+
+    def __init__(self, message: str, routes: int, pickup_points: int):
+        super().__init__(message)
+        self.routes = routes
+        self.pickup_points = pickup_points
+
+
+class _JsonStream:
+    """Incremental reader of consecutive JSON values from a byte or text stream.
+
+    Values are decoded with ``raw_decode`` from a buffer that only holds the
+    unread part of the input, refilled as needed; a value larger than the
+    buffer doubles the next read so huge features are not re-parsed many times.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.chunk = READ_CHUNK
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.stream.read(self.chunk)
+        if isinstance(data, bytes):
+            text = self.text_decoder.decode(data, final=not data)
+        else:
+            text = data
+        if not data:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        return bool(data)
+
+    def peek(self) -> str:
+        """Next significant character (not consumed), or "" at the end of the input"""
+        while True:
+            buffer = self.buffer
+            pos = self.pos
+            while pos < len(buffer) and buffer[pos] in JSON_WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._fill():
+                return ""
+
+    def advance(self):
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A number ending exactly at the buffer's end may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    self.chunk = READ_CHUNK
+                    return value
+            self.chunk *= 2
+            self._fill()
+
+
+def iter_geojson_features(stream) -> Iterator[dict]:
+    """Features of a FeatureCollection (or a sequence of Features), one at a time.
+
+    Only the feature being decoded is held in memory: the collection's
+    "features" array is walked element by element instead of loaded whole.
+    """
+    reader = _JsonStream(stream)
+    while True:
+        char = reader.peek()
+        if not char:
+            return
+        if char != "{":
+            raise ValueError("Expected a GeoJSON object")
+        reader.advance()
+        head = {}
+        while True:
+            char = reader.peek()
+            if char == "}":
+                reader.advance()
+                break
+            if char == ",":
+                reader.advance()
+                continue
+            if not char:
+                raise ValueError("Unexpected end of GeoJSON")
+            key = reader.value()
+            if reader.peek() != ":":
+                raise ValueError("Invalid GeoJSON object")
+            reader.advance()
+            if key == "features" and reader.peek() == "[":
+                reader.advance()
+                while True:
+                    char = reader.peek()
+                    if char == "]":
+                        reader.advance()
+                        break
+                    if char == ",":
+                        reader.advance()
+                        continue
+                    if not char:
+                        raise ValueError("Unexpected end of GeoJSON")
+                    yield reader.value()
+            else:
+                head[key] = reader.value()
+        if head.get("type") == "Feature":
+            yield head
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def iter_kml_features(stream) -> Iterator[dict]:
+    """GeoJSON-style Point and LineString features from KML Placemarks, streamed with iterparse"""
+    try:
+        yield from _iter_placemarks(stream)
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid KML: {e}") from e
+
+
+def _iter_placemarks(stream) -> Iterator[dict]:
+    for _, element in ET.iterparse(stream, events=("end",)):
+        if _local_name(element.tag) != "Placemark":
+            continue
+        properties = {}
+        for child in element.iter():
+            name = _local_name(child.tag)
+            if name == "SimpleData":
+                properties[child.get("name")] = (child.text or "").strip()
+            elif name == "Data":
+                namespace = child.tag[:-len(name)]
+                properties[child.get("name")] = (child.findtext(f"{namespace}value") or "").strip()
+        for child in element:
+            if _local_name(child.tag) == "name":
+                properties.setdefault("name", (child.text or "").strip())
+
+        for child in element.iter():
+            kind = _local_name(child.tag)
+            if kind not in ("Point", "LineString"):
+                continue
+            coordinates = next(
+                (parse_coordinates(node.text or "") for node in child if _local_name(node.tag) == "coordinates"),
+                [],
+            )
+            if not coordinates:
+                continue
+            geometry = (
+                {"type": "Point", "coordinates": list(coordinates[0])}
+                if kind == "Point"
+                else {"type": "LineString", "coordinates": [list(point) for point in coordinates]}
+            )
+            yield {"type": "Feature", "properties": properties, "geometry": geometry}
+        element.clear()
+
+
+def detect_format(stream: BinaryIO, filename: Optional[str] = None) -> str:
+    """"kml" or "geojson" from the file extension, else from the first byte"""
+    if filename:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == ".kml":
+            return "kml"
+        if extension in (".geojson", ".json", ".geojsons", ".geojsonl"):
+            return "geojson"
+    head = stream.read(512)
+    stream.seek(0)
+    if isinstance(head, bytes):
+        head = head.decode("utf-8", "ignore")
+    return "kml" if head.lstrip("\ufeff \t\r\n").startswith("<") else "geojson"
+
+
+def iter_features(stream, fmt: str) -> Iterator[dict]:
+    """Features of either format; anything that is not a feature object is rejected"""
+    features = iter_kml_features(stream) if fmt == "kml" else iter_geojson_features(stream)
+    for number, feature in enumerate(features, start=1):
+        if not isinstance(feature, dict):
+            raise ValueError(f"Feature {number} is not an object")
+        if not isinstance(feature.get("properties") or {}, dict):
+            raise ValueError(f"Feature {number} has invalid properties")
+        if not isinstance(feature.get("geometry") or {}, dict):
+            raise ValueError(f"Feature {number} has an invalid geometry")
+        yield feature
+
+
+def _position(point) -> Tuple[float, float]:
+    """(lat, lng) of a GeoJSON [lng, lat, ...] position"""
+    try:
+        return float(point[1]), float(point[0])
+    except (TypeError, ValueError, IndexError, KeyError):
+        raise ValueError(f"Invalid coordinates: {point!r}") from None
+
+
+def _positions(coordinates) -> list:
+    if not isinstance(coordinates, list):
+        raise ValueError(f"Invalid coordinates: {coordinates!r}")
+    return coordinates
+
+
+def _line_strings(geometry: Optional[dict]) -> Iterator[List[Tuple[float, float]]]:
+    """(lat, lng) vertex lists of a LineString or MultiLineString"""
+    if not geometry:
+        return
+    kind = geometry.get("type")
+    if kind == "LineString":
+        lines = [geometry.get("coordinates") or []]
+    elif kind == "MultiLineString":
+        lines = geometry.get("coordinates") or []
+    else:
+        return
+    for line in _positions(lines):
+        # Empty positions are skipped, malformed ones rejected
+        yield [_position(point) for point in _positions(line) if point]
+
+
+def _points(geometry: Optional[dict]) -> Iterator[Tuple[float, float]]:
+    if not geometry:
+        return
+    kind = geometry.get("type")
+    if kind == "Point":
+        points = [geometry.get("coordinates") or []]
+    elif kind == "MultiPoint":
+        points = geometry.get("coordinates") or []
+    else:
+        return
+    for point in _positions(points):
+        if point:
+            yield _position(point)
+
+
+class _StopIndex:
+    """Sampled route stops in a uniform grid, stored in flat arrays.
+
+    A city-sized import samples millions of stops; arrays keep that to a few
+    tens of bytes per stop where a PointGrid entry would cost hundreds.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.xs = array("d")
+        self.ys = array("d")
+        self.routes = array("l")
+        self.cells: Dict[Tuple[int, int], array] = {}
+
+    def insert(self, x: float, y: float, route: int):
+        cell = (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            bucket = self.cells[cell] = array("l")
+        bucket.append(len(self.xs))
+        self.xs.append(x)
+        self.ys.append(y)
+        self.routes.append(route)
+
+    def nearest_route(self, x: float, y: float) -> Optional[int]:
+        """Route of the closest stop within one cell size, if any"""
+        size = self.cell_size
+        ci = math.floor(x / size)
+        cj = math.floor(y / size)
+        best = size * size
+        route = None
+        for i in (ci - 1, ci, ci + 1):
+            for j in (cj - 1, cj, cj + 1):
+                for index in self.cells.get((i, j), ()):
+                    d2 = (self.xs[index] - x) ** 2 + (self.ys[index] - y) ** 2
+                    if d2 <= best:
+                        best = d2
+                        route = self.routes[index]
+        return route
+
+
+class GeoImporter:
+    """Creates routes and pickup points from a GeoJSON or KML file in two streaming passes.
+
+    Pass 1 samples a pickup point every ``spacing_m`` along the LineStrings
+    and groups consecutive samples into routes of ``points_per_route``.
+    Pass 2 turns Point features into pickup points on the route given by
+    their ``route_id`` property or the route of the nearest sampled stop
+    (within about ``assign_radius_m`` of the route; unassigned otherwise). Wards come from the ward
+    boundary index. Rows are written with multi-row INSERTs, committed every
+    ``batch_size`` rows; ids that already exist are skipped. Invalid input
+    raises GeoImportError with the number of rows already committed;
+    ids are deterministic, so importing the fixed file again completes it.
+    """
+
+    def __init__(self, prefix: str = "IMP", spacing_m: float = 150.0, points_per_route: int = 15,
+                 route_type: str = "primary", ward_id: Optional[str] = None, zone_id: Optional[str] = None,
+                 assign_radius_m: float = 200.0, start_time: str = "07:00", minutes_per_stop: int = 6,
+                 batch_size: int = GEO_IMPORT_BATCH_SIZE):
+        self.prefix = prefix
+        self.spacing_m = spacing_m
+        self.points_per_route = max(1, points_per_route)
+        self.route_type = RouteType(route_type)
+        self.ward_id = ward_id
+        self.zone_id = zone_id
+        self.assign_radius_m = assign_radius_m
+        hours, _, minutes = start_time.partition(":")
+        self.start_minute = int(hours) * 60 + int(minutes or 0)
+        self.minutes_per_stop = minutes_per_stop
+        self.batch_size = batch_size
+
+        self.route_ids: List[str] = []
+        # Routes actually created; ids that already existed are skipped by INSERT OR IGNORE
+        self.inserted_route_ids: List[str] = []
+        self.projection: Optional[LocalProjection] = None
+        self.stop_index: Optional[_StopIndex] = None
+        self._zones: Dict[str, Optional[str]] = {}
+        self._routes: List[dict] = []
+        self._points: List[dict] = []
+        self.counts = Counter()
+        self.points_per_route_id: Counter = Counter()
+
+    def _ward_for(self, latitude: float, longitude: float) -> Optional[str]:
+        region = ward_index.locate(latitude, longitude)
+        return region.ward_id if region is not None and region.ward_id else self.ward_id
+
+    def _flush(self, db: Session):
+        if self._routes:
+            route_ids = [row["id"] for row in self._routes]
+            existing = {route_id for (route_id,) in db.query(Route.id).filter(Route.id.in_(route_ids))}
+            result = db.execute(insert(Route.__table__).prefix_with("OR IGNORE", dialect="sqlite"), self._routes)
+            self.inserted_route_ids.extend(route_id for route_id in route_ids if route_id not in existing)
+            self.counts["routes"] += result.rowcount
+            self.counts["skipped"] += len(self._routes) - result.rowcount
+            self._routes = []
+        if self._points:
+            result = db.execute(insert(PickupPoint.__table__).prefix_with("OR IGNORE", dialect="sqlite"), self._points)
+            self.counts["pickup_points"] += result.rowcount
+            self.counts["skipped"] += len(self._points) - result.rowcount
+            self._points = []
+        db.commit()
+
+    def _add_point(self, db: Session, row: dict):
+        self._points.append(row)
+        if len(self._points) >= self.batch_size:
+            self._flush(db)
+
+    def _emit_route(self, db: Session, stops: List[Tuple[float, float]]):
+        number = len(self.route_ids) + 1
+        route_id = f"{self.prefix}-{number}"
+        self.route_ids.append(route_id)
+        wards = [self._ward_for(latitude, longitude) for latitude, longitude in stops]
+        ward_id = Counter(ward for ward in wards if ward).most_common(1)
+        ward_id = ward_id[0][0] if ward_id else self.ward_id
+        self._routes.append({
+            "id": route_id,
+            "name": f"{self.prefix} Route {number}",
+            "code": f"{self.prefix}-P{number}",
+            "type": self.route_type,
+            "ward_id": ward_id,
+            "zone_id": self._zones.get(ward_id) or self.zone_id,
+            "total_pickup_points": len(stops),
+            "estimated_distance": round(sum(
+                haversine_m(*a, *b) for a, b in zip(stops, stops[1:])
+            ) / 1000, 2),
+            "estimated_time": len(stops) * self.minutes_per_stop,
+            "status": "active",
+        })
+
+        if self.projection is None:
+            self.projection = LocalProjection(stops[0][0])
+        for latitude, longitude in stops:
+            self.stop_index.insert(*self.projection.to_xy(latitude, longitude), number - 1)
+
+        for index, ((latitude, longitude), stop_ward) in enumerate(zip(stops, wards), start=1):
+            minute = self.start_minute + (index - 1) * self.minutes_per_stop
+            self._add_point(db, {
+                "id": f"{self.prefix}-PP{number:02d}-{index:02d}",
+                "point_code": f"{self.prefix}-{number}-PP{index:02d}",
+                "name": f"{self.prefix} Pickup Point {number}-{index}",
+                "address": None,
+                "latitude": latitude,
+                "longitude": longitude,
+                "route_id": route_id,
+                "ward_id": stop_ward,
+                "waste_type": "mixed",
+                "type": "residential",
+                "expected_pickup_time": f"{minute // 60:02d}:{minute % 60:02d}",
+                "schedule": "daily",
+                "geofence_radius": 30,
+                "status": "active",
+                "last_collection": None,
+            })
+
+    def _sample_lines(self, db: Session, features: Iterator[dict]):
+        """Pass 1: pickup points every spacing_m along the lines, grouped into routes"""
+        stops: List[Tuple[float, float]] = []
+        last_stop: Optional[Tuple[float, float]] = None
+        for feature in features:
+            self.counts["features"] += 1
+            for line in _line_strings(feature.get("geometry")):
+                if not line:
+                    continue
+                # Connected ways share their end vertex; do not put two stops on one junction
+                if last_stop is None or haversine_m(*last_stop, *line[0]) >= self.spacing_m:
+                    stops.append(line[0])
+                travelled = 0.0
+                for previous, current in zip(line, line[1:]):
+                    leg = haversine_m(*previous, *current)
+                    # Interpolate every spacing mark crossed on this leg
+                    while leg > 0 and travelled + leg >= self.spacing_m:
+                        fraction = (self.spacing_m - travelled) / leg
+                        previous = (
+                            previous[0] + (current[0] - previous[0]) * fraction,
+                            previous[1] + (current[1] - previous[1]) * fraction,
+                        )
+                        stops.append(previous)
+                        leg -= self.spacing_m - travelled
+                        travelled = 0.0
+                    travelled += leg
+                last_stop = stops[-1] if stops else last_stop
+                while len(stops) >= self.points_per_route:
+                    self._emit_route(db, stops[:self.points_per_route])
+                    del stops[:self.points_per_route]
+        if stops:
+            self._emit_route(db, stops)
+
+    def _import_points(self, db: Session, features: Iterator[dict]):
+        """Pass 2: Point features become pickup points on the nearest imported route"""
+        number = 0
+        for feature in features:
+            properties = feature.get("properties") or {}
+            for latitude, longitude in _points(feature.get("geometry")):
+                number += 1
+                route_id = properties.get("route_id")
+                if not route_id and self.projection is not None:
+                    route = self.stop_index.nearest_route(*self.projection.to_xy(latitude, longitude))
+                    route_id = self.route_ids[route] if route is not None else None
+                self.counts["assigned_points" if route_id else "unassigned_points"] += 1
+                if route_id:
+                    self.points_per_route_id[route_id] += 1
+                self._add_point(db, {
+                    "id": properties.get("id") or f"{self.prefix}-PT{number:05d}",
+                    "point_code": properties.get("point_code") or f"{self.prefix}-PT{number:05d}",
+                    "name": properties.get("name") or f"{self.prefix} Pickup Point {number}",
+                    "address": properties.get("address") or properties.get("addr:street"),
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "route_id": route_id,
+                    "ward_id": self._ward_for(latitude, longitude),
+                    "waste_type": properties.get("waste_type") or "mixed",
+                    "type": properties.get("type") or "residential",
+                    "expected_pickup_time": properties.get("expected_pickup_time"),
+                    "schedule": properties.get("schedule") or "daily",
+                    "geofence_radius": int(properties.get("geofence_radius") or 30),
+                    "status": "active",
+                    "last_collection": None,
+                })
+
+    def _update_route_totals(self, db: Session):
+        """Recount the routes that received Point features (one grouped scan per 500 routes)"""
+        route_ids = list(self.points_per_route_id)
+        totals = []
+        for start in range(0, len(route_ids), 500):
+            totals.extend(
+                {"route": route_id, "total": total}
+                for route_id, total in db.query(PickupPoint.route_id, func.count(PickupPoint.id))
+                .filter(PickupPoint.route_id.in_(route_ids[start:start + 500]))
+                .group_by(PickupPoint.route_id)
+            )
+        table = Route.__table__
+        db.execute(update(table).where(table.c.id == bindparam("route")).values(total_pickup_points=bindparam("total")), totals)
+        db.commit()
+
+    def run(self, db: Session, stream: BinaryIO, fmt: str) -> dict:
+        """Import from a seekable stream (read twice)"""
+        started = time.perf_counter()
+        ward_index.ensure_loaded(db)
+        self._zones = dict(db.query(Ward.id, Ward.zone_id).all())
+        # Stops are spacing_m apart, so a point within assign_radius_m of a route is this close to a stop
+        self.stop_index = _StopIndex(math.hypot(self.assign_radius_m, self.spacing_m / 2))
+
+        try:
+            self._sample_lines(db, iter_features(stream, fmt))
+            self._flush(db)
+            stream.seek(0)
+            self._import_points(db, iter_features(stream, fmt))
+            self._flush(db)
+        except ValueError as e:
+            # Batches are committed as they fill; the caller rolls back the open one
+            raise GeoImportError(str(e), self.counts["routes"], self.counts["pickup_points"]) from e
+        if self.counts["assigned_points"]:
+            self._update_route_totals(db)
+
+        return {
+            "features": self.counts["features"],
+            "routes": self.counts["routes"],
+            "pickup_points": self.counts["pickup_points"],
+            "assigned_points": self.counts["assigned_points"],
+            "unassigned_points": self.counts["unassigned_points"],
+            "skipped": self.counts["skipped"],
+            "route_ids": self.inserted_route_ids,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
@@ -0,0 +1,206 @@
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..models.models import PickupPoint
+from .geo import LocalProjection
+from .pubsub import GEOFENCE_TOPIC, pubsub
+from .spatial_index import PointGrid
+
+# Radius for pickup points without a geofence_radius
+DEFAULT_RADIUS_M = 30
+# A truck that stays this long inside a pickup point's geofence has collected it
+GEOFENCE_DWELL_SECONDS = float(os.getenv("GEOFENCE_DWELL_SECONDS", "30"))
+
+
+class FencePoint:
+    __slots__ = ("id", "point_code", "route_id", "ward_id", "radius", "radius_sq")
+
+    def __init__(self, point: PickupPoint):
+        self.id = point.id
+        self.point_code = point.point_code
+        self.route_id = point.route_id
+        self.ward_id = point.ward_id
+        self.radius = float(point.geofence_radius or DEFAULT_RADIUS_M)
+        self.radius_sq = self.radius * self.radius
+
+
+class Visit:
+    """A truck currently inside a pickup point's geofence"""
+
+    __slots__ = ("point", "entered_at", "collected")
+
+    def __init__(self, point: FencePoint, entered_at: datetime):
+        self.point = point
+        self.entered_at = entered_at
+        self.collected = False
+
+
+class GeofenceEngine:
+    """Enter/exit/dwell detection of truck fixes against pickup point geofences.
+
+    Pickup points are bucketed in a uniform grid of projected meters, sized
+    to the largest geofence radius, so a fix is only compared with the
+    points in the 3x3 cells around it. Per truck the engine keeps the
+    geofences it is inside; a dwell marks the point collected and updates
+    its ``last_collection``.
+    """
+
+    def __init__(self, dwell_seconds: float = GEOFENCE_DWELL_SECONDS):
+        self.dwell_seconds = dwell_seconds
+        self.projection: Optional[LocalProjection] = None
+        self.grid: PointGrid[FencePoint] = PointGrid(DEFAULT_RADIUS_M)
+        self.max_radius = float(DEFAULT_RADIUS_M)
+        self._inside: Dict[str, Dict[str, Visit]] = {}
+        self._last_fix: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self.fixes_processed = 0
+        self.events_emitted = 0
+
+    def load(self, db: Session):
+        points = db.query(PickupPoint).filter(PickupPoint.status == "active").all()
+        fence_points = [FencePoint(point) for point in points]
+        lat0 = sum(point.latitude for point in points) / len(points) if points else 0.0
+        projection = LocalProjection(lat0)
+        max_radius = max((point.radius for point in fence_points), default=float(DEFAULT_RADIUS_M))
+        grid: PointGrid[FencePoint] = PointGrid(max_radius)
+        for point, fence_point in zip(points, fence_points):
+            x, y = projection.to_xy(point.latitude, point.longitude)
+            grid.insert(fence_point.id, x, y, fence_point)
+        with self._lock:
+            self.projection = projection
+            self.grid = grid
+            self.max_radius = max_radius
+            self._inside.clear()
+        print(f"Loaded {len(grid)} pickup point geofences")
+
+    def upsert_point(self, point: PickupPoint):
+        """Add or move one pickup point (after it is created or edited)"""
+        with self._lock:
+            if point.status != "active":
+                self.grid.remove(point.id)
+                return
+            if self.projection is None:
+                self.projection = LocalProjection(point.latitude)
+            fence_point = FencePoint(point)
+            # Queries scan max_radius around a fix; the cell size stays as loaded
+            self.max_radius = max(self.max_radius, fence_point.radius)
+            x, y = self.projection.to_xy(point.latitude, point.longitude)
+            self.grid.insert(point.id, x, y, fence_point)
+
+    def remove_point(self, point_id: str):
+        with self._lock:
+            self.grid.remove(point_id)
+
+    def process(self, db: Session, rows: List[dict]) -> List[dict]:
+        """Run a batch of fixes (position history rows) through the geofences.
+
+        Emits the events on the geofence topic and writes ``last_collection``
+        for dwelled points in one bulk UPDATE (committed with the batch).
+        Each processed row is marked ``in_geofence`` for later processors.
+        """
+        with self._lock:
+            if self.projection is None or not len(self.grid):
+                return []
+            events, collections = self._process(sorted(rows, key=lambda row: (row["truck_id"], row["ts"])))
+
+        if collections:
+            db.execute(update(PickupPoint), [
+                {"id": point_id, "last_collection": ts.isoformat(timespec="seconds")}
+                for point_id, ts in collections.items()
+            ])
+        if events:
+            self.events_emitted += len(events)
+            pubsub.publish(GEOFENCE_TOPIC, {"type": "geofence", "events": events})
+        return events
+
+    def _process(self, rows: List[dict]):
+        to_xy = self.projection.to_xy
+        cell_size = self.grid.cell_size
+        cells = self.grid.cells
+        reach = self.max_radius
+        dwell_seconds = self.dwell_seconds
+        inside_by_truck = self._inside
+        last_fix = self._last_fix
+        events: List[dict] = []
+        collections: Dict[str, datetime] = {}
+
+        for row in rows:
+            truck_id = row["truck_id"]
+            ts = row["ts"]
+            previous = last_fix.get(truck_id)
+            if previous is not None and ts <= previous:
+                # Late or duplicate fix; the truck's state has already moved past it
+                continue
+            last_fix[truck_id] = ts
+            x, y = to_xy(row["latitude"], row["longitude"])
+
+            hits = None
+            min_i = int((x - reach) // cell_size)
+            max_i = int((x + reach) // cell_size)
+            min_j = int((y - reach) // cell_size)
+            max_j = int((y + reach) // cell_size)
+            for i in range(min_i, max_i + 1):
+                for j in range(min_j, max_j + 1):
+                    bucket = cells.get((i, j))
+                    if not bucket:
+                        continue
+                    for point_id, (px, py, point) in bucket.items():
+                        if (px - x) ** 2 + (py - y) ** 2 <= point.radius_sq:
+                            if hits is None:
+                                hits = {}
+                            hits[point_id] = point
+
+            row["in_geofence"] = hits is not None
+            inside = inside_by_truck.get(truck_id)
+            if not inside and hits is None:
+                continue
+            if inside is None:
+                inside = inside_by_truck[truck_id] = {}
+
+            for point_id in [point_id for point_id in inside if hits is None or point_id not in hits]:
+                visit = inside.pop(point_id)
+                events.append(self._event("exit", truck_id, visit.point, ts, visit.entered_at))
+            if hits is None:
+                continue
+            for point_id, point in hits.items():
+                visit = inside.get(point_id)
+                if visit is None:
+                    inside[point_id] = visit = Visit(point, ts)
+                    events.append(self._event("enter", truck_id, point, ts, ts))
+                if not visit.collected and (ts - visit.entered_at).total_seconds() >= dwell_seconds:
+                    visit.collected = True
+                    collections[point_id] = ts
+                    events.append(self._event("dwell", truck_id, point, ts, visit.entered_at))
+
+        self.fixes_processed += len(rows)
+        return events, collections
+
+    @staticmethod
+    def _event(kind: str, truck_id: str, point: FencePoint, ts: datetime, entered_at: datetime) -> dict:
+        return {
+            "event": kind,
+            "truck_id": truck_id,
+            "pickup_point_id": point.id,
+            "point_code": point.point_code,
+            "route_id": point.route_id,
+            "ward_id": point.ward_id,
+            "timestamp": ts.isoformat(),
+            "seconds_inside": (ts - entered_at).total_seconds(),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "pickup_points": len(self.grid),
+            "trucks_inside": sum(1 for inside in self._inside.values() if inside),
+            "fixes_processed": self.fixes_processed,
+            "events_emitted": self.events_emitted,
+        }
+
+
+# Global geofence engine instance
+geofence_engine = GeofenceEngine()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import tempfile
+from typing import Awaitable, Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LEADER_LOCK_PATH = os.getenv(
+    "LEADER_LOCK_PATH", os.path.join(tempfile.gettempdir(), "garbage_tracking_leader.lock")
+)
+
+
+class LeaderLock:
+    """Exclusive, non-blocking OS file lock held for the life of the process.
+
+    The OS drops the lock when the holder exits or crashes, so a standby
+    process can take over without any lease bookkeeping.
+    """
+
+    def __init__(self, path: str = LEADER_LOCK_PATH):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def try_acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        lock_file = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(str(os.getpid()))
+        lock_file.flush()
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class LeaderElection:
+    """Decides which worker process runs the producers (simulator, broadcaster).
+
+    Every process starts as a follower; it polls the lock and the first to
+    get it is promoted and stays leader until it exits, at which point one
+    of the followers takes over on its next poll.
+    """
+
+    def __init__(self, lock: LeaderLock, retry_interval: float = 5.0):
+        self.lock = lock
+        self.retry_interval = retry_interval
+        self.is_leader = False
+
+    async def run(self, on_follower: Callable[[], Awaitable[None]],
+                  on_leader: Callable[[], Awaitable[None]]):
+        follower: Optional[asyncio.Task] = None
+        try:
+            while not self.lock.try_acquire():
+                if follower is None:
+                    print(f"Worker {os.getpid()} is a follower")
+                    follower = asyncio.create_task(on_follower())
+                await asyncio.sleep(self.retry_interval)
+        finally:
+            if follower is not None:
+                follower.cancel()
+
+        self.is_leader = True
+        print(f"Worker {os.getpid()} is the leader")
+        await on_leader()
+
+    def resign(self):
+        self.is_leader = False
+        self.lock.release()
+
+
+# Global leader election instance
+leader_election = LeaderElection(LeaderLock())
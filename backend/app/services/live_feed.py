@@ -0,0 +1,129 @@
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .binary_frames import FRAME_DELTA, FRAME_SNAPSHOT, TruckIndex, encode_positions
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, see requirements.txt
+    orjson = None
+
+SNAPSHOT_TYPE = "truck_positions"
+DELTA_TYPE = "truck_positions_delta"
+
+
+def encode_frame(message: dict) -> str:
+    """Serialize a frame to compact JSON text, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, separators=(",", ":"), default=str)
+
+
+def _change_key(position: dict) -> tuple:
+    # last_update moves on every tick even for parked trucks, so it is not compared
+    return (
+        position["latitude"],
+        position["longitude"],
+        position["status"],
+        position["speed"],
+        position["trips_completed"],
+    )
+
+
+class PositionFeed:
+    """Sequenced live position stream: full snapshots plus per-tick deltas.
+
+    advance() compares the latest positions with what was last published and
+    bumps ``seq`` only when something changed, so clients can detect a missed
+    delta (seq gap) and ask for a snapshot. Encoded frames (JSON text and
+    binary) are cached per seq.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.published_at: Optional[datetime] = None
+        self.timestamp: Optional[str] = None
+        self._current: Dict[str, dict] = {}
+        self._keys: Dict[str, tuple] = {}
+        self._changed: List[dict] = []
+        self._removed: List[str] = []
+        self._snapshot_text: Optional[str] = None
+        self._delta_text: Optional[str] = None
+        self._snapshot_binary: Optional[bytes] = None
+        self._delta_binary: Optional[bytes] = None
+
+    def advance(self, positions: List[dict]) -> bool:
+        """Publish a new tick; returns True if any truck changed"""
+        changed = []
+        keys = {}
+        current = {}
+        for position in positions:
+            truck_id = position["id"]
+            key = _change_key(position)
+            keys[truck_id] = key
+            if self._keys.get(truck_id) != key:
+                changed.append(position)
+                current[truck_id] = position
+            else:
+                # Unchanged: keep the record clients already have
+                current[truck_id] = self._current[truck_id]
+        removed = [truck_id for truck_id in self._keys if truck_id not in keys]
+
+        if not changed and not removed:
+            return False
+
+        self.seq += 1
+        self.published_at = datetime.utcnow()
+        self.timestamp = self.published_at.isoformat()
+        self._current = current
+        self._keys = keys
+        self._changed = changed
+        self._removed = removed
+        self._snapshot_text = None
+        self._delta_text = None
+        self._snapshot_binary = None
+        self._delta_binary = None
+        return True
+
+    def snapshot_message(self) -> dict:
+        return {
+            "type": SNAPSHOT_TYPE,
+            "seq": self.seq,
+            "data": list(self._current.values()),
+            "timestamp": self.timestamp or datetime.utcnow().isoformat(),
+        }
+
+    def delta_message(self) -> dict:
+        return {
+            "type": DELTA_TYPE,
+            "seq": self.seq,
+            "data": self._changed,
+            "removed": self._removed,
+            "timestamp": self.timestamp,
+        }
+
+    def snapshot_text(self) -> str:
+        if self._snapshot_text is None:
+            self._snapshot_text = encode_frame(self.snapshot_message())
+        return self._snapshot_text
+
+    def delta_text(self) -> str:
+        if self._delta_text is None:
+            self._delta_text = encode_frame(self.delta_message())
+        return self._delta_text
+
+    def snapshot_binary(self, index: TruckIndex) -> bytes:
+        if self._snapshot_binary is None:
+            self._snapshot_binary = encode_positions(
+                FRAME_SNAPSHOT, self.seq, self.published_at or datetime.utcnow(),
+                list(self._current.values()), [], index,
+            )
+        return self._snapshot_binary
+
+    def delta_binary(self, index: TruckIndex) -> bytes:
+        if self._delta_binary is None:
+            self._delta_binary = encode_positions(
+                FRAME_DELTA, self.seq, self.published_at, self._changed, self._removed, index,
+            )
+        return self._delta_binary
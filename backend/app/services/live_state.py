@@ -0,0 +1,352 @@
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from ..models.models import Driver, Route, Truck, TruckStatus
+from .geo import LocalProjection, haversine_m
+from .spatial_index import PointGrid
+
+# Columns owned by the live store; everything else on Truck is static master data
+LIVE_COLUMNS = ("latitude", "longitude", "current_status", "speed", "trips_completed", "last_update")
+
+# Cell size of the truck position grid used for nearest-truck queries
+TRUCK_GRID_CELL_M = 500.0
+
+
+class LiveTruck:
+    """In-memory live view of one truck.
+
+    Attribute names mirror models.Truck so the simulator can drive either one.
+    """
+
+    __slots__ = (
+        "id", "registration_number", "type", "route_type", "status", "vendor_id",
+        "zone_id", "ward_id", "assigned_route_id", "is_spare", "driver_name", "route_name",
+        "latitude", "longitude", "current_status", "speed", "trips_completed",
+        "trips_allowed", "last_update",
+    )
+
+    def __init__(self, truck: Truck, driver_name: Optional[str], route_name: Optional[str]):
+        self.set_static(truck, driver_name, route_name)
+        self.latitude = truck.latitude
+        self.longitude = truck.longitude
+        self.current_status = truck.current_status or TruckStatus.IDLE
+        self.speed = truck.speed or 0.0
+        self.trips_completed = truck.trips_completed or 0
+        self.last_update = truck.last_update
+
+    def set_static(self, truck: Truck, driver_name: Optional[str], route_name: Optional[str]):
+        self.id = truck.id
+        self.registration_number = truck.registration_number
+        self.type = truck.type.value if truck.type else None
+        self.route_type = truck.route_type.value if truck.route_type else None
+        self.status = truck.status
+        self.vendor_id = truck.vendor_id
+        self.zone_id = truck.zone_id
+        self.ward_id = truck.ward_id
+        self.assigned_route_id = truck.assigned_route_id
+        self.is_spare = truck.is_spare
+        self.trips_allowed = truck.trips_allowed if truck.trips_allowed is not None else 5
+        self.driver_name = driver_name
+        self.route_name = route_name
+
+    def position(self) -> dict:
+        """Payload used for live position broadcasts"""
+        return {
+            "id": self.id,
+            "registration_number": self.registration_number,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "status": self.current_status.value if self.current_status else "idle",
+            "speed": self.speed or 0.0,
+            "trips_completed": self.trips_completed,
+            "last_update": self.last_update.isoformat() if self.last_update else None,
+        }
+
+    def live(self) -> dict:
+        """Payload matching schemas.TruckLive"""
+        return {
+            "id": self.id,
+            "registration_number": self.registration_number,
+            "type": self.type,
+            "route_type": self.route_type,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "current_status": self.current_status.value if self.current_status else "idle",
+            "speed": self.speed or 0.0,
+            "trips_completed": self.trips_completed,
+            "trips_allowed": self.trips_allowed,
+            "driver_name": self.driver_name,
+            "route_name": self.route_name or "Unassigned",
+            "vendor_id": self.vendor_id,
+            "zone_id": self.zone_id,
+            "ward_id": self.ward_id,
+            "is_spare": self.is_spare,
+            "last_update": self.last_update,
+        }
+
+
+class LiveFleetState:
+    """Authoritative in-process copy of every truck's live position and status.
+
+    Position writers update it in memory and mark trucks dirty; flush() writes
+    the dirty rows back to the trucks table in one bulk UPDATE (write-behind).
+    Readers such as the WebSocket broadcaster and /trucks/live never touch
+    the database. Active trucks with a position are also kept in a grid for
+    nearest-truck queries; position writers only note which trucks moved and
+    the next query re-buckets just those.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._trucks: Dict[str, LiveTruck] = {}
+        self._dirty: set = set()
+        self.loaded = False
+        # Bumped whenever trucks or their master data change (not on position updates)
+        self.version = 0
+        self.projection: Optional[LocalProjection] = None
+        self.grid: PointGrid[LiveTruck] = PointGrid(TRUCK_GRID_CELL_M)
+        self._moved: set = set()
+
+    def _sync_grid(self):
+        """Re-bucket trucks that moved since the last query; call with the lock held"""
+        if not self._moved:
+            return
+        moved, self._moved = self._moved, set()
+        entries = []
+        for truck_id in moved:
+            truck = self._trucks.get(truck_id)
+            if truck is None or truck.status != "active" or not truck.latitude or not truck.longitude:
+                self.grid.remove(truck_id)
+                continue
+            if self.projection is None:
+                self.projection = LocalProjection(truck.latitude)
+            entries.append((truck_id, truck.longitude * self.projection.mx, truck.latitude * self.projection.my, truck))
+        self.grid.insert_many(entries)
+
+    def _query(self, db: Session):
+        return db.query(Truck, Driver.name, Route.name).outerjoin(
+            Driver, Truck.driver_id == Driver.id
+        ).outerjoin(Route, Truck.assigned_route_id == Route.id)
+
+    def load(self, db: Session):
+        """(Re)hydrate the store from the database, keeping unflushed live values"""
+        rows = self._query(db).all()
+        with self.lock:
+            trucks = {}
+            for truck, driver_name, route_name in rows:
+                existing = self._trucks.get(truck.id)
+                if existing is not None and truck.id in self._dirty:
+                    existing.set_static(truck, driver_name, route_name)
+                    trucks[truck.id] = existing
+                else:
+                    trucks[truck.id] = LiveTruck(truck, driver_name, route_name)
+            self._trucks = trucks
+            self._dirty = {truck_id for truck_id in self._dirty if truck_id in trucks}
+            self.loaded = True
+            self.version += 1
+
+            placed = [truck.latitude for truck in trucks.values() if truck.latitude and truck.longitude]
+            if placed:
+                self.projection = LocalProjection(sum(placed) / len(placed))
+            self.grid = PointGrid(TRUCK_GRID_CELL_M)
+            self._moved = set(trucks)
+
+    def ensure_loaded(self, db: Session):
+        if not self.loaded:
+            self.load(db)
+
+    def refresh_truck(self, db: Session, truck_id: str):
+        """Pick up master-data edits (route, driver, status...) for one truck"""
+        if not self.loaded:
+            return
+        row = self._query(db).filter(Truck.id == truck_id).first()
+        with self.lock:
+            self.version += 1
+            if row is None:
+                self._trucks.pop(truck_id, None)
+                self._dirty.discard(truck_id)
+                self._moved.add(truck_id)
+                return
+            truck, driver_name, route_name = row
+            existing = self._trucks.get(truck_id)
+            if existing is None:
+                existing = self._trucks[truck_id] = LiveTruck(truck, driver_name, route_name)
+            else:
+                existing.set_static(truck, driver_name, route_name)
+            self._moved.add(truck_id)
+
+    def get(self, truck_id: str) -> Optional[LiveTruck]:
+        return self._trucks.get(truck_id)
+
+    def trucks(self, active_only: bool = True) -> List[LiveTruck]:
+        with self.lock:
+            if active_only:
+                return [truck for truck in self._trucks.values() if truck.status == "active"]
+            return list(self._trucks.values())
+
+    def mark_dirty(self, truck_id: str):
+        """Record that a truck's live fields were changed in place"""
+        with self.lock:
+            self._dirty.add(truck_id)
+            self._moved.add(truck_id)
+
+    def increment_trips(self, truck_id: str) -> Optional[int]:
+        """Count one completed trip (read-modify-write under the lock); returns the new total"""
+        with self.lock:
+            truck = self._trucks.get(truck_id)
+            if truck is None:
+                return None
+            truck.trips_completed = (truck.trips_completed or 0) + 1
+            self._dirty.add(truck_id)
+            return truck.trips_completed
+
+    def update_position(self, truck_id: str, latitude: float, longitude: float, speed: float,
+                        last_update: datetime, current_status: Optional[TruckStatus] = None) -> bool:
+        """Apply a position fix; stale fixes (older than the current one) are ignored"""
+        with self.lock:
+            truck = self._trucks.get(truck_id)
+            if truck is None:
+                return False
+            if truck.last_update is not None and last_update < truck.last_update:
+                return False
+            truck.latitude = latitude
+            truck.longitude = longitude
+            truck.speed = speed
+            truck.last_update = last_update
+            if current_status is not None:
+                truck.current_status = current_status
+            self._dirty.add(truck_id)
+            self._moved.add(truck_id)
+            return True
+
+    def update_many(self, truck_ids: Sequence[str], latitudes: Sequence[float], longitudes: Sequence[float],
+                    speeds: Sequence[float], statuses: Sequence[TruckStatus], last_update: datetime) -> int:
+        """Bulk path for simulated ticks: apply a whole fleet's state under one lock.
+
+        trips_completed is left alone; only the trip detector counts trips.
+        """
+        applied = 0
+        with self.lock:
+            trucks = self._trucks
+            for truck_id, latitude, longitude, speed, status in zip(
+                truck_ids, latitudes, longitudes, speeds, statuses
+            ):
+                truck = trucks.get(truck_id)
+                if truck is None:
+                    continue
+                truck.latitude = latitude
+                truck.longitude = longitude
+                truck.speed = speed
+                truck.current_status = status
+                truck.last_update = last_update
+                applied += 1
+            self._dirty.update(truck_ids)
+            self._moved.update(truck_ids)
+        return applied
+
+    def apply_positions(self, positions: List[dict]):
+        """Mirror another process's broadcast payload (follower workers).
+
+        Not marked dirty: the process that produced the positions persists them.
+        """
+        with self.lock:
+            for position in positions:
+                truck = self._trucks.get(position["id"])
+                if truck is None:
+                    continue
+                truck.latitude = position["latitude"]
+                truck.longitude = position["longitude"]
+                truck.current_status = TruckStatus(position["status"])
+                truck.speed = position["speed"]
+                truck.trips_completed = position["trips_completed"]
+                last_update = position["last_update"]
+                truck.last_update = datetime.fromisoformat(last_update) if last_update else None
+                self._moved.add(truck.id)
+
+    def apply_fixes(self, fixes: List[dict]) -> int:
+        """Follower: mirror device fixes it forwarded to the leader; stale ones are ignored.
+
+        Not marked dirty: the leader records and persists them.
+        """
+        applied = 0
+        with self.lock:
+            for fix in fixes:
+                truck = self._trucks.get(fix["id"])
+                if truck is None:
+                    continue
+                last_update = fix["last_update"]
+                if truck.last_update is not None and last_update < truck.last_update:
+                    continue
+                truck.latitude = fix["latitude"]
+                truck.longitude = fix["longitude"]
+                truck.speed = fix["speed"]
+                truck.last_update = last_update
+                if fix["status"]:
+                    truck.current_status = TruckStatus(fix["status"])
+                self._moved.add(truck.id)
+                applied += 1
+        return applied
+
+    def nearest(self, latitude: float, longitude: float, k: int,
+                accept: Optional[Callable[[LiveTruck], bool]] = None,
+                max_distance: Optional[float] = None) -> List[Tuple[float, LiveTruck]]:
+        """Up to ``k`` (distance in meters, truck) pairs closest to a point, nearest first"""
+        with self.lock:
+            self._sync_grid()
+            if self.projection is None:
+                return []
+            x, y = self.projection.to_xy(latitude, longitude)
+            hits = self.grid.nearest(x, y, k, accept=accept, max_distance=max_distance)
+            return sorted(
+                ((haversine_m(latitude, longitude, truck.latitude, truck.longitude), truck) for _, _, truck in hits),
+                key=lambda hit: hit[0],
+            )
+
+    def positions(self) -> List[dict]:
+        """Broadcast payload: active trucks that have a position"""
+        with self.lock:
+            return [
+                truck.position()
+                for truck in self._trucks.values()
+                if truck.status == "active" and truck.latitude and truck.longitude
+            ]
+
+    def live_records(self) -> List[dict]:
+        """/trucks/live payload for every active truck"""
+        with self.lock:
+            return [truck.live() for truck in self._trucks.values() if truck.status == "active"]
+
+    def flush(self, db: Session) -> int:
+        """Write dirty trucks back to the database in one bulk UPDATE"""
+        with self.lock:
+            if not self._dirty:
+                return 0
+            rows = []
+            for truck_id in self._dirty:
+                truck = self._trucks.get(truck_id)
+                if truck is None:
+                    continue
+                row = {"id": truck_id}
+                for column in LIVE_COLUMNS:
+                    row[column] = getattr(truck, column)
+                rows.append(row)
+            self._dirty = set()
+
+        if rows:
+            try:
+                db.execute(update(Truck), rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self.lock:
+                    self._dirty.update(row["id"] for row in rows)
+                raise
+        return len(rows)
+
+
+# Global live state instance
+live_state = LiveFleetState()
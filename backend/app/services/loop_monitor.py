@@ -0,0 +1,44 @@
+import asyncio
+from collections import deque
+from typing import Deque
+
+
+class LoopLagMonitor:
+    """Measures event loop lag: how late a short sleep wakes up.
+
+    Anything blocking the loop (synchronous DB calls, CPU-heavy work) shows
+    up directly as lag, and every request and WebSocket frame waiting on the
+    loop is delayed by the same amount.
+    """
+
+    def __init__(self, interval: float = 0.25, window: int = 240, warn_after: float = 0.25):
+        self.interval = interval
+        self.warn_after = warn_after
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples.append(lag)
+            if lag > self.warn_after:
+                print(f"Event loop blocked for {lag * 1000:.0f} ms")
+
+    def stats(self) -> dict:
+        """Lag over the recent window, in milliseconds"""
+        if not self.samples:
+            return {"samples": 0, "current_ms": 0.0, "mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(self.samples)
+        return {
+            "samples": len(ordered),
+            "current_ms": round(self.samples[-1] * 1000, 2),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000, 2),
+            "max_ms": round(ordered[-1] * 1000, 2),
+        }
+
+
+# Global loop lag monitor instance
+loop_monitor = LoopLagMonitor()
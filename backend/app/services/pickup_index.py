@@ -0,0 +1,65 @@
+import threading
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.models import PickupPoint
+from .geo import LocalProjection
+from .spatial_index import PointGrid
+
+# Grid cell size; a city viewport spans a few hundred cells at most
+PICKUP_GRID_CELL_M = 250.0
+
+
+class PickupPointIndex:
+    """In-memory grid of every pickup point's position for bbox and radius queries.
+
+    Holds ids only; callers load the matching rows. The grid is rebuilt on
+    the next query after a write through the API (invalidate()) or when the
+    table's row count changes (points added by scripts or other workers).
+    """
+
+    def __init__(self):
+        self.grid: PointGrid[str] = PointGrid(PICKUP_GRID_CELL_M)
+        self.projection: Optional[LocalProjection] = None
+        self._row_count: Optional[int] = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._stale = True
+
+    def ensure_current(self, db: Session):
+        row_count = db.query(func.count(PickupPoint.id)).scalar()
+        if not self._stale and row_count == self._row_count:
+            return
+        rows = db.query(PickupPoint.id, PickupPoint.latitude, PickupPoint.longitude).all()
+        projection = LocalProjection(sum(row.latitude for row in rows) / len(rows) if rows else 0.0)
+        grid: PointGrid[str] = PointGrid(PICKUP_GRID_CELL_M)
+        for point_id, latitude, longitude in rows:
+            x, y = projection.to_xy(latitude, longitude)
+            grid.insert(point_id, x, y, point_id)
+        with self._lock:
+            self.grid = grid
+            self.projection = projection
+            self._row_count = row_count
+            self._stale = False
+
+    def in_bbox(self, db: Session, min_lng: float, min_lat: float, max_lng: float, max_lat: float) -> List[str]:
+        self.ensure_current(db)
+        with self._lock:
+            min_x, min_y = self.projection.to_xy(min_lat, min_lng)
+            max_x, max_y = self.projection.to_xy(max_lat, max_lng)
+            return [point_id for point_id, _ in self.grid.in_box(min_x, min_y, max_x, max_y)]
+
+    def near(self, db: Session, latitude: float, longitude: float, radius: float) -> List[Tuple[float, str]]:
+        """(distance in meters, id) within ``radius``, nearest first"""
+        self.ensure_current(db)
+        with self._lock:
+            x, y = self.projection.to_xy(latitude, longitude)
+            return [(distance, point_id) for distance, point_id, _ in self.grid.within(x, y, radius)]
+
+
+# Global pickup point index instance
+pickup_point_index = PickupPointIndex()
@@ -0,0 +1,202 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import String, inspect, select, type_coerce
+from sqlalchemy.schema import CreateTable, DropTable
+from sqlalchemy.orm import Session
+
+from ..models.models import TruckPosition
+
+PARTITION_PREFIX = "truck_positions_"
+
+# Called with (db, rows) for every flushed batch, inside the flush transaction.
+# Processors may annotate rows for later ones; only COLUMNS are written.
+Processor = Callable[[Session, List[dict]], None]
+COLUMNS = ("truck_id", "ts", "latitude", "longitude", "speed", "status")
+
+
+def parse_ts(value) -> datetime:
+    """Timestamp from an iter_range() row; SQLite hands back ISO strings, other drivers datetimes"""
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+class PositionHistory:
+    """Buffered writer and range reader for day-partitioned truck position history.
+
+    Each UTC day gets its own table, created on first write. Inserts only ever
+    append to today's partition, a truck-day range scan touches one small
+    table, and retention is a DROP TABLE instead of a huge DELETE.
+    """
+
+    def __init__(self, retention_days: Optional[int] = None):
+        self.retention_days = retention_days
+        self._buffer: List[dict] = []
+        self._buffer_lock = threading.Lock()
+        self._models: Dict[date, type] = {}
+        self._models_lock = threading.Lock()
+        self._existing_days: Optional[set] = None
+        # Request threads and the fleet thread flush concurrently
+        self._days_lock = threading.Lock()
+        # Days that received rows since the last take_written_days() (coverage job)
+        self._written_days: set = set()
+        self._processors: List[Processor] = []
+
+    def add_processor(self, processor: Processor):
+        """Run ``processor`` over every batch of fixes before it is written"""
+        self._processors.append(processor)
+
+    def partition_model(self, day: date) -> type:
+        """ORM model bound to the partition table for ``day``"""
+        with self._models_lock:
+            model = self._models.get(day)
+            if model is None:
+                suffix = day.strftime("%Y%m%d")
+                model = type(
+                    f"TruckPosition{suffix}",
+                    (TruckPosition,),
+                    {
+                        "__tablename__": f"{PARTITION_PREFIX}{suffix}",
+                        # Cluster rows on (truck_id, ts) so a truck's track is contiguous on disk
+                        "__table_args__": {"sqlite_with_rowid": False},
+                    },
+                )
+                self._models[day] = model
+            return model
+
+    def existing_days(self, db: Session) -> set:
+        """Days that have a partition table, discovered once and then tracked in-process (a snapshot)"""
+        with self._days_lock:
+            return set(self._days(db))
+
+    def _days(self, db: Session) -> set:
+        # Callers hold _days_lock
+        if self._existing_days is None:
+            days = set()
+            for name in inspect(db.connection()).get_table_names():
+                if not name.startswith(PARTITION_PREFIX):
+                    continue
+                try:
+                    days.add(datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date())
+                except ValueError:
+                    continue
+            self._existing_days = days
+        return self._existing_days
+
+    def _ensure_partition(self, db: Session, day: date) -> type:
+        model = self.partition_model(day)
+        with self._days_lock:
+            if day in self._days(db):
+                return model
+        # IF NOT EXISTS: another thread or worker may create the same day concurrently.
+        # DDL runs on the session's connection so it cannot block on our own open transaction.
+        db.connection().execute(CreateTable(model.__table__, if_not_exists=True))
+        with self._days_lock:
+            self._days(db).add(day)
+
+        today = datetime.utcnow().date()
+        if self.retention_days and day <= today:
+            # Retention counts back from today, never from the day written: a
+            # fix stamped in the future must not age out real history
+            self.drop_partitions_before(db, min(day, today - timedelta(days=self.retention_days)))
+        return model
+
+    def record(self, truck_id: str, ts: datetime, latitude: float, longitude: float,
+               speed: float = 0.0, status: Optional[str] = None):
+        """Queue one fix; it is written on the next flush()"""
+        row = {
+            "truck_id": truck_id,
+            "ts": ts,
+            "latitude": latitude,
+            "longitude": longitude,
+            "speed": speed or 0.0,
+            "status": status,
+        }
+        with self._buffer_lock:
+            self._buffer.append(row)
+
+    def record_many(self, rows: Iterable[dict]):
+        """Queue prepared rows (truck_id, ts, latitude, longitude, speed, status) in one go"""
+        rows = list(rows)
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+
+    def flush(self, db: Session) -> int:
+        """Write all queued fixes with one multi-row INSERT per day partition"""
+        with self._buffer_lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+
+        for processor in self._processors:
+            try:
+                processor(db, rows)
+            except Exception as e:
+                print(f"Error processing position batch: {e}")
+
+        by_day: Dict[date, Dict[tuple, dict]] = {}
+        for row in rows:
+            # Duplicate (truck_id, ts) pairs would violate the primary key; keep the last one
+            by_day.setdefault(row["ts"].date(), {})[(row["truck_id"], row["ts"])] = {
+                column: row[column] for column in COLUMNS
+            }
+
+        for day, day_rows in by_day.items():
+            model = self._ensure_partition(db, day)
+            stmt = model.__table__.insert().prefix_with("OR IGNORE", dialect="sqlite")
+            db.execute(stmt, list(day_rows.values()))
+        db.commit()
+        self.mark_written(by_day)
+        return len(rows)
+
+    def mark_written(self, days: Iterable[date]):
+        with self._days_lock:
+            self._written_days.update(days)
+
+    def take_written_days(self) -> set:
+        """Days this process has written rows to since the last call"""
+        with self._days_lock:
+            days, self._written_days = self._written_days, set()
+        return days
+
+    def iter_range(self, db: Session, truck_id: str, start: datetime, end: datetime) -> Iterator:
+        """Yield (ts, latitude, longitude, speed, status) rows for a truck, oldest first.
+
+        ``ts`` is returned unconverted (see parse_ts): parsing every timestamp
+        of a truck-day costs more than the query, and callers usually only
+        need a handful of them.
+        """
+        existing = self.existing_days(db)
+        day = start.date()
+        while day <= end.date():
+            if day in existing:
+                # Core rows, not ORM entities: a truck-day is ~17k fixes
+                table = self.partition_model(day).__table__
+                stmt = select(
+                    type_coerce(table.c.ts, String).label("ts"), table.c.latitude, table.c.longitude, table.c.speed, table.c.status
+                ).where(
+                    table.c.truck_id == truck_id,
+                    table.c.ts >= start,
+                    table.c.ts <= end,
+                ).order_by(table.c.ts)
+                yield from db.execute(stmt).all()
+            day += timedelta(days=1)
+
+    def drop_partitions_before(self, db: Session, cutoff: date) -> int:
+        """Drop whole day partitions older than ``cutoff``"""
+        with self._days_lock:
+            existing = self._days(db)
+            days = sorted(d for d in existing if d < cutoff)
+            existing.difference_update(days)
+        for day in days:
+            db.connection().execute(DropTable(self.partition_model(day).__table__, if_exists=True))
+        return len(days)
+
+
+_retention = os.getenv("POSITION_HISTORY_RETENTION_DAYS")
+
+# Global history instance
+position_history = PositionHistory(retention_days=int(_retention) if _retention else None)
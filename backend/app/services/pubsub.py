@@ -0,0 +1,278 @@
+import asyncio
+import json
+import os
+import tempfile
+from collections import Counter, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, see requirements.txt
+    orjson = None
+
+from .live_feed import encode_frame
+
+# Topics
+POSITIONS_TOPIC = "positions"
+ALERTS_TOPIC = "alerts"
+# Pickup point enter/dwell/exit events (see geofence.py)
+GEOFENCE_TOPIC = "geofence"
+# Dump-site arrival/unloading/trip events (see trip_detector.py)
+TRIPS_TOPIC = "trips"
+# Fixes ingested by follower workers, applied by the leader (see telemetry.py)
+TELEMETRY_TOPIC = "telemetry"
+
+# "memory": subscribers in this process only (single worker)
+# "socket": every process connects to a broker that relays to all of them
+PUBSUB_BACKEND = os.getenv("PUBSUB_BACKEND", "memory")
+# Broker address: a Unix socket path, or host:port for TCP
+PUBSUB_ADDRESS = os.getenv(
+    "PUBSUB_ADDRESS",
+    os.path.join(tempfile.gettempdir(), "garbage_tracking_pubsub.sock") if hasattr(asyncio, "start_unix_server")
+    else "127.0.0.1:8765",
+)
+# With the socket backend, the elected leader worker hosts the broker itself
+# unless the broker runs standalone (python -m app.services.pubsub)
+PUBSUB_EMBEDDED_BROKER = os.getenv("PUBSUB_EMBEDDED_BROKER", "true").lower() in ("1", "true", "yes")
+
+# A peer with this much unsent data is dropped; it reconnects and catches up
+MAX_PEER_BUFFER = 4 * 1024 * 1024
+# Largest single message (a 10k truck snapshot is ~2 MB)
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+Handler = Callable[[dict], Awaitable[None]]
+
+
+def _tcp_address(address: str):
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit() and os.sep not in address:
+        return host, int(port)
+    return None
+
+
+def _decode(line: bytes) -> dict:
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+class PubSub:
+    """Topic-based publish/subscribe between producers and consumers of live data.
+
+    Handlers are coroutines run on the event loop, one message at a time in
+    publish order. publish() may be called from any thread (request handlers,
+    worker threads); messages published before start() are dropped. At most
+    ``max_pending`` undelivered messages are kept per topic, so a burst on
+    one topic (positions) never pushes out another's (alerts).
+    """
+
+    def __init__(self, max_pending: int = 64):
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inbox: Optional[Deque[Tuple[str, dict]]] = None
+        self._pending: Counter = Counter()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.max_pending = max_pending
+
+    def subscribe(self, topic: str, handler: Handler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._inbox = deque()
+        self._pending = Counter()
+        self._wakeup = asyncio.Event()
+        self._tasks.append(asyncio.create_task(self._dispatcher()))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._loop = None
+
+    def publish(self, topic: str, message: dict):
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._send(topic, message)
+        else:
+            loop.call_soon_threadsafe(self._send, topic, message)
+
+    def _send(self, topic: str, message: dict):
+        """Deliver a published message; runs on the event loop"""
+        self._receive(topic, message)
+
+    def _receive(self, topic: str, message: dict):
+        inbox = self._inbox
+        if inbox is None:
+            return
+        if self._pending[topic] >= self.max_pending:
+            # Consumers are behind; drop this topic's oldest message (live data is
+            # superseded by newer messages anyway), never another topic's
+            for index, (queued_topic, _) in enumerate(inbox):
+                if queued_topic == topic:
+                    del inbox[index]
+                    break
+            self._pending[topic] -= 1
+            print(f"Pub/sub consumers falling behind, dropping oldest {topic} message")
+        inbox.append((topic, message))
+        self._pending[topic] += 1
+        self._wakeup.set()
+
+    async def _dispatcher(self):
+        inbox = self._inbox
+        while True:
+            while not inbox:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            topic, message = inbox.popleft()
+            self._pending[topic] -= 1
+            for handler in self._handlers.get(topic, ()):
+                try:
+                    await handler(message)
+                except Exception as e:
+                    print(f"Error handling {topic} message: {e}")
+
+
+class InProcessPubSub(PubSub):
+    """Default backend: messages reach subscribers in the publishing process only"""
+
+
+class SocketBroker:
+    """Relays every message it receives to all connected processes (including the sender).
+
+    A stand-in for an external broker such as Redis: newline-delimited JSON
+    over a Unix socket or TCP, each message relayed as the same bytes.
+    """
+
+    def __init__(self, address: str = PUBSUB_ADDRESS):
+        self.address = address
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+
+    async def start(self):
+        tcp = _tcp_address(self.address)
+        if tcp is not None:
+            self._server = await asyncio.start_server(self._accept, *tcp, limit=MAX_MESSAGE_BYTES)
+        else:
+            if os.path.exists(self.address):
+                # Left behind by a previous broker that did not shut down cleanly
+                os.unlink(self.address)
+            self._server = await asyncio.start_unix_server(self._accept, self.address, limit=MAX_MESSAGE_BYTES)
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self._relay(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    def _relay(self, line: bytes):
+        for writer in list(self._peers):
+            if writer.transport.get_write_buffer_size() > MAX_PEER_BUFFER:
+                print("Dropping pub/sub peer that stopped reading")
+                self._peers.discard(writer)
+                writer.close()
+                continue
+            writer.write(line)
+
+    async def close(self):
+        for writer in list(self._peers):
+            writer.close()
+        self._peers.clear()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Pub/sub broker listening on {self.address}")
+        await self._server.serve_forever()
+
+
+class SocketPubSub(PubSub):
+    """Backend for several workers or hosts: publishes go through a SocketBroker.
+
+    Subscribers only see messages relayed back by the broker, so every
+    process (the publisher included) handles them in the same order. While
+    disconnected, published messages are dropped and the client reconnects.
+    """
+
+    def __init__(self, address: str = PUBSUB_ADDRESS, retry_interval: float = 1.0, max_pending: int = 64):
+        super().__init__(max_pending=max_pending)
+        self.address = address
+        self.retry_interval = retry_interval
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def start(self):
+        await super().start()
+        self._tasks.append(asyncio.create_task(self._connection()))
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        await super().close()
+
+    def _send(self, topic: str, message: dict):
+        writer = self._writer
+        if writer is None or writer.is_closing():
+            return
+        writer.write(encode_frame({"topic": topic, "message": message}).encode() + b"\n")
+
+    async def _connect(self):
+        tcp = _tcp_address(self.address)
+        if tcp is not None:
+            return await asyncio.open_connection(*tcp, limit=MAX_MESSAGE_BYTES)
+        return await asyncio.open_unix_connection(self.address, limit=MAX_MESSAGE_BYTES)
+
+    async def _connection(self):
+        while True:
+            try:
+                reader, writer = await self._connect()
+            except OSError:
+                # Broker not up yet (or its host worker is changing); try again shortly
+                await asyncio.sleep(self.retry_interval)
+                continue
+            self._writer = writer
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    envelope = _decode(line)
+                    self._receive(envelope["topic"], envelope["message"])
+            except (OSError, ValueError, KeyError):
+                # ValueError: a bad line or one longer than the stream limit
+                pass
+            finally:
+                self._writer = None
+                writer.close()
+            await asyncio.sleep(self.retry_interval)
+
+
+def create_pubsub(backend: str = PUBSUB_BACKEND) -> PubSub:
+    if backend == "socket":
+        return SocketPubSub()
+    return InProcessPubSub()
+
+
+# Global pub/sub instance
+pubsub = create_pubsub()
+
+
+if __name__ == "__main__":
+    # Standalone broker (PUBSUB_EMBEDDED_BROKER=false on the workers)
+    asyncio.run(SocketBroker().serve_forever())
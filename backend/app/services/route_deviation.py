@@ -0,0 +1,166 @@
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.models import PickupPoint
+from .alert_writer import make_alert, write_alerts
+from .geo import LocalProjection
+from .live_state import LiveFleetState, live_state
+from .spatial_index import SegmentGrid
+
+# A truck farther than this from its route polyline is off route...
+DEVIATION_DISTANCE_M = float(os.getenv("DEVIATION_DISTANCE_M", "150"))
+# ...and is reported once it has stayed off route this long
+DEVIATION_SECONDS = float(os.getenv("DEVIATION_SECONDS", "120"))
+
+
+class RoutePolyline:
+    """A route's reference path: its pickup points in visiting order, looping back to the start"""
+
+    def __init__(self, route_id: str, points: List[PickupPoint], projection: LocalProjection, margin: float):
+        self.route_id = route_id
+        self.point_count = len(points)
+        self.grid: SegmentGrid[int] = SegmentGrid(margin, margin)
+        xy = [projection.to_xy(point.latitude, point.longitude) for point in points]
+        # Trucks run the stop sequence in a loop, so the last leg returns to the first stop
+        legs = list(zip(xy, xy[1:] + xy[:1])) if len(xy) > 2 else list(zip(xy, xy[1:] or xy))
+        for index, ((x1, y1), (x2, y2)) in enumerate(legs):
+            self.grid.insert(x1, y1, x2, y2, index)
+
+
+class Deviation:
+    """A truck's current off-route episode"""
+
+    __slots__ = ("since", "reported")
+
+    def __init__(self, since: datetime):
+        self.since = since
+        self.reported = False
+
+
+class RouteDeviationDetector:
+    """Raises route_deviation alerts from truck fixes.
+
+    Each route's polyline is built from its ordered pickup points and its
+    segments indexed in a grid whose cells are as large as the deviation
+    distance, so checking a fix is one cell lookup plus a cross-track
+    distance to the handful of segments in that cell. A truck that stays
+    farther than DEVIATION_DISTANCE_M from its assigned route for
+    DEVIATION_SECONDS gets one alert per off-route episode.
+    """
+
+    def __init__(self, distance: float = DEVIATION_DISTANCE_M, seconds: float = DEVIATION_SECONDS,
+                 fleet: LiveFleetState = live_state):
+        self.distance = distance
+        self.seconds = seconds
+        self.fleet = fleet
+        self.projection: Optional[LocalProjection] = None
+        self.routes: Dict[str, RoutePolyline] = {}
+        self._episodes: Dict[str, Deviation] = {}
+        self._last_fix: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self.alerts_raised = 0
+
+    def _query(self, db: Session):
+        return db.query(PickupPoint).filter(
+            PickupPoint.route_id.isnot(None),
+            PickupPoint.status == "active",
+        ).order_by(PickupPoint.route_id, PickupPoint.expected_pickup_time, PickupPoint.point_code)
+
+    def load(self, db: Session):
+        points = self._query(db).all()
+        by_route: Dict[str, List[PickupPoint]] = {}
+        for point in points:
+            by_route.setdefault(point.route_id, []).append(point)
+        projection = LocalProjection(sum(point.latitude for point in points) / len(points) if points else 0.0)
+        routes = {
+            route_id: RoutePolyline(route_id, route_points, projection, self.distance)
+            for route_id, route_points in by_route.items()
+        }
+        with self._lock:
+            self.projection = projection
+            self.routes = routes
+            self._episodes.clear()
+        print(f"Loaded {len(routes)} route polylines for deviation checks")
+
+    def reload_route(self, db: Session, route_id: str):
+        """Rebuild one route's polyline after its pickup points change"""
+        if self.projection is None:
+            return
+        points = self._query(db).filter(PickupPoint.route_id == route_id).all()
+        with self._lock:
+            if points:
+                self.routes[route_id] = RoutePolyline(route_id, points, self.projection, self.distance)
+            else:
+                self.routes.pop(route_id, None)
+
+    def process(self, db: Session, rows: List[dict]) -> int:
+        """Check a batch of fixes (position history rows); writes any new alerts in the batch transaction"""
+        with self._lock:
+            if self.projection is None or not self.routes:
+                return 0
+            alerts = self._process(sorted(rows, key=lambda row: (row["truck_id"], row["ts"])))
+        self.alerts_raised += len(write_alerts(db, alerts))
+        return len(alerts)
+
+    def _process(self, rows: List[dict]) -> list:
+        to_xy = self.projection.to_xy
+        routes = self.routes
+        episodes = self._episodes
+        last_fix = self._last_fix
+        fleet = self.fleet
+        alerts = []
+
+        for row in rows:
+            truck_id = row["truck_id"]
+            ts = row["ts"]
+            previous = last_fix.get(truck_id)
+            if previous is not None and ts <= previous:
+                continue
+            last_fix[truck_id] = ts
+
+            truck = fleet.get(truck_id)
+            route = routes.get(truck.assigned_route_id) if truck is not None else None
+            if route is None:
+                episodes.pop(truck_id, None)
+                continue
+
+            if route.grid.nearest(*to_xy(row["latitude"], row["longitude"])) is not None:
+                # Within DEVIATION_DISTANCE_M of a segment: on route
+                episodes.pop(truck_id, None)
+                continue
+
+            episode = episodes.get(truck_id)
+            if episode is None:
+                episode = episodes[truck_id] = Deviation(ts)
+            if episode.reported or (ts - episode.since).total_seconds() < self.seconds:
+                continue
+            episode.reported = True
+            minutes = (ts - episode.since).total_seconds() / 60
+            alerts.append(make_alert(
+                truck_id,
+                "route_deviation",
+                "high",
+                f"Deviated more than {self.distance:.0f} m from route {route.route_id} for {minutes:.0f} min",
+                ts,
+                row["latitude"],
+                row["longitude"],
+                route_id=route.route_id,
+                zone_id=truck.zone_id,
+                ward_id=truck.ward_id,
+            ))
+        return alerts
+
+    def stats(self) -> dict:
+        return {
+            "routes": len(self.routes),
+            "trucks_off_route": len(self._episodes),
+            "alerts_raised": self.alerts_raised,
+        }
+
+
+# Global route deviation detector instance
+route_deviation_detector = RouteDeviationDetector()
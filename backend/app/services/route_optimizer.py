@@ -0,0 +1,317 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.models import PickupPoint, Route
+from .geo import LocalProjection, haversine_m
+from .route_simulator import DUMP_DWELL_S, DUMP_TYPES, MAX_SPEED_KMH, MIN_SPEED_KMH, PICKUP_DWELL_S
+
+# Streets are not straight lines; scales great-circle distances to road distances
+ROUTE_DETOUR_FACTOR = float(os.getenv("ROUTE_DETOUR_FACTOR", "1.3"))
+# Candidate moves per stop in the local search (its nearest neighbours)
+NEIGHBOURS = 10
+OR_OPT_SEGMENTS = (1, 2, 3)
+MATRIX_CACHE_SIZE = 32
+# Ignore improvements smaller than this (meters) so float noise cannot loop forever
+EPSILON_M = 1e-6
+
+AVERAGE_SPEED_MS = (MIN_SPEED_KMH + MAX_SPEED_KMH) / 2 / 3.6
+PICKUP_DWELL_MEAN_S = sum(PICKUP_DWELL_S) / 2
+DUMP_DWELL_MEAN_S = sum(DUMP_DWELL_S) / 2
+
+Coordinates = Tuple[Tuple[float, float], ...]
+
+
+class DistanceMatrix:
+    """Pairwise distances in meters and each node's nearest neighbours.
+
+    Distances are planar in a local projection: within a route's few
+    kilometres they match great-circle distances to well under a percent,
+    at a fraction of the cost of haversine for every pair.
+    """
+
+    __slots__ = ("rows", "neighbours")
+
+    def __init__(self, coordinates: Coordinates):
+        n = len(coordinates)
+        projection = LocalProjection(sum(lat for lat, _ in coordinates) / n if n else 0.0)
+        xy = [projection.to_xy(lat, lng) for lat, lng in coordinates]
+        rows = [[math.dist(point, other) for other in xy] for point in xy]
+        self.rows = rows
+        self.neighbours = [
+            sorted((j for j in range(n) if j != i), key=rows[i].__getitem__)[:NEIGHBOURS]
+            for i in range(n)
+        ]
+
+
+class DistanceMatrixCache:
+    """LRU of distance matrices keyed by the exact stop coordinates"""
+
+    def __init__(self, size: int = MATRIX_CACHE_SIZE):
+        self.size = size
+        self._matrices: "OrderedDict[Coordinates, DistanceMatrix]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, coordinates: Coordinates) -> DistanceMatrix:
+        with self._lock:
+            matrix = self._matrices.get(coordinates)
+            if matrix is not None:
+                self._matrices.move_to_end(coordinates)
+                self.hits += 1
+                return matrix
+        matrix = DistanceMatrix(coordinates)
+        with self._lock:
+            self.misses += 1
+            self._matrices[coordinates] = matrix
+            while len(self._matrices) > self.size:
+                self._matrices.popitem(last=False)
+        return matrix
+
+
+def path_length(path: Sequence[int], rows: List[List[float]]) -> float:
+    return sum(rows[a][b] for a, b in zip(path, path[1:]))
+
+
+def nearest_neighbour_path(start: int, end: int, nodes: Sequence[int], rows: List[List[float]]) -> List[int]:
+    """Greedy path from ``start`` through ``nodes`` to ``end``"""
+    path = [start]
+    remaining = set(nodes)
+    current = start
+    while remaining:
+        row = rows[current]
+        current = min(remaining, key=row.__getitem__)
+        remaining.remove(current)
+        path.append(current)
+    path.append(end)
+    return path
+
+
+def two_opt(path: List[int], rows: List[List[float]], neighbours: List[List[int]]) -> bool:
+    """One neighbour-list 2-opt pass over a path with fixed endpoints; True if it improved"""
+    last = len(path) - 1
+    pos = [0] * len(rows)
+    for index, node in enumerate(path):
+        pos[node] = index
+    improved = False
+    for a in list(path):
+        for c in neighbours[a]:
+            i = pos[a]
+            j = pos[c]
+            if abs(i - j) < 2:
+                continue
+            d_ac = rows[a][c]
+            gain = 0.0
+            # Successor orientation: replace (a, a+1), (c, c+1) with (a, c), (a+1, c+1)
+            if i < last and j < last:
+                a_next = path[i + 1]
+                c_next = path[j + 1]
+                gain = rows[a][a_next] + rows[c][c_next] - d_ac - rows[a_next][c_next]
+                low, high = (i, j) if i < j else (j, i)
+            # Predecessor orientation: replace (a-1, a), (c-1, c) with (a, c), (a-1, c-1)
+            if gain <= EPSILON_M and i > 0 and j > 0:
+                a_prev = path[i - 1]
+                c_prev = path[j - 1]
+                gain = rows[a_prev][a] + rows[c_prev][c] - d_ac - rows[a_prev][c_prev]
+                low, high = (i - 1, j - 1) if i < j else (j - 1, i - 1)
+            if gain <= EPSILON_M:
+                continue
+            path[low + 1:high + 1] = path[high:low:-1]
+            for index in range(low + 1, high + 1):
+                pos[path[index]] = index
+            improved = True
+    return improved
+
+
+def or_opt(path: List[int], rows: List[List[float]], neighbours: List[List[int]]) -> bool:
+    """Move runs of 1-3 consecutive stops next to one of their neighbours (either direction)"""
+    pos = [0] * len(rows)
+    for index, node in enumerate(path):
+        pos[node] = index
+    improved = False
+    for length in OR_OPT_SEGMENTS:
+        start = 1
+        while start + length < len(path):
+            end = start + length - 1
+            first, tail = path[start], path[end]
+            before, after = path[start - 1], path[end + 1]
+            removed = rows[before][first] + rows[tail][after] - rows[before][after]
+            if removed <= EPSILON_M:
+                start += 1
+                continue
+
+            segment = set(path[start:end + 1])
+            best = None
+            for endpoint in (first, tail):
+                for c in neighbours[endpoint]:
+                    if c in segment:
+                        continue
+                    k = pos[c]
+                    # Insert between (c, c+1) or (c-1, c)
+                    for u_index in (k, k - 1):
+                        if u_index < 0 or u_index + 1 >= len(path):
+                            continue
+                        u, v = path[u_index], path[u_index + 1]
+                        if u in segment or v in segment:
+                            continue
+                        base = rows[u][v]
+                        forward = rows[u][first] + rows[tail][v] - base
+                        backward = rows[u][tail] + rows[first][v] - base
+                        added, reverse = (forward, False) if forward <= backward else (backward, True)
+                        if added < removed - EPSILON_M and (best is None or added < best[0]):
+                            best = (added, u, reverse)
+            if best is None:
+                start += 1
+                continue
+
+            _, u, reverse = best
+            moved = path[start:end + 1]
+            if reverse:
+                moved.reverse()
+            del path[start:end + 1]
+            insert_at = path.index(u) + 1
+            path[insert_at:insert_at] = moved
+            for index, node in enumerate(path):
+                pos[node] = index
+            improved = True
+    return improved
+
+
+def optimize_path(start: int, end: int, nodes: Sequence[int], matrix: DistanceMatrix,
+                  max_rounds: int = 50) -> List[int]:
+    """Nearest-neighbour path improved by 2-opt and Or-opt until neither finds a move"""
+    path = nearest_neighbour_path(start, end, nodes, matrix.rows)
+    for _ in range(max_rounds):
+        improved = two_opt(path, matrix.rows, matrix.neighbours)
+        improved = or_opt(path, matrix.rows, matrix.neighbours) or improved
+        if not improved:
+            break
+    return path
+
+
+class RoutePlan:
+    """Optimized stop order of a route with its trip distance and time"""
+
+    def __init__(self, route_id: str, stops: List[PickupPoint], distance_m: float, time_s: float,
+                 previous_distance_m: float, elapsed_s: float):
+        self.route_id = route_id
+        self.stops = stops
+        self.distance_m = distance_m
+        self.time_s = time_s
+        self.previous_distance_m = previous_distance_m
+        self.elapsed_s = elapsed_s
+
+    def to_dict(self) -> dict:
+        return {
+            "route_id": self.route_id,
+            "stops": [stop.id for stop in self.stops],
+            "estimated_distance": round(self.distance_m / 1000, 2),
+            "estimated_time": round(self.time_s / 60),
+            "previous_distance": round(self.previous_distance_m / 1000, 2),
+            "elapsed_ms": round(self.elapsed_s * 1000, 1),
+        }
+
+
+class RouteOptimizer:
+    """Solves the visiting order of a route's pickup points.
+
+    A trip is a loop: leave the dump stops (GTP, then dumping yard), visit
+    every pickup, unload again. The pickups are ordered as an open path with
+    fixed endpoints (from the last dump stop back to the first) by nearest
+    neighbour, then improved with neighbour-list 2-opt and Or-opt moves over
+    a cached distance matrix. Routes without dump stops loop back to their
+    first stop. Distances are straight-line meters times ROUTE_DETOUR_FACTOR;
+    times use the route simulator's average speed and dwell times.
+    """
+
+    def __init__(self):
+        self.matrices = DistanceMatrixCache()
+
+    def _stops(self, db: Session, route_id: str) -> List[PickupPoint]:
+        return db.query(PickupPoint).filter(
+            PickupPoint.route_id == route_id,
+            PickupPoint.status == "active",
+        ).order_by(PickupPoint.expected_pickup_time, PickupPoint.point_code).all()
+
+    def plan(self, db: Session, route_id: str) -> RoutePlan:
+        return self.solve(route_id, self._stops(db, route_id))
+
+    def solve(self, route_id: str, current: List[PickupPoint]) -> RoutePlan:
+        """Plan for ``current``, the route's stops in their present order"""
+        started = time.perf_counter()
+        pickups = [stop for stop in current if stop.type not in DUMP_TYPES]
+        # GTP before the dumping yard, as the trucks unload
+        dumps = sorted((stop for stop in current if stop.type in DUMP_TYPES), key=lambda stop: DUMP_TYPES.index(stop.type))
+        if not dumps and pickups:
+            dumps = [pickups.pop(0)]
+            anchor_first = True
+        else:
+            anchor_first = False
+
+        # Nodes: pickups, then the path's start (last dump) and end (first dump, a copy if the same stop)
+        nodes = pickups + [dumps[-1], dumps[0]] if dumps else []
+        n = len(pickups)
+
+        if nodes:
+            matrix = self.matrices.get(tuple((stop.latitude, stop.longitude) for stop in nodes))
+            rows = matrix.rows
+            path = optimize_path(n, n + 1, range(n), matrix)
+            order = [nodes[index] for index in path[1:-1]]
+            # Legs between consecutive dump stops are fixed
+            tail = sum(haversine_m(a.latitude, a.longitude, b.latitude, b.longitude) for a, b in zip(dumps, dumps[1:]))
+            distance = path_length(path, rows) + tail
+            # The current order's loop, for comparison
+            previous = path_length([n, *range(n), n + 1], rows) + tail
+            stops = dumps + order if anchor_first else order + dumps
+        else:
+            stops, distance, previous = [], 0.0, 0.0
+
+        distance *= ROUTE_DETOUR_FACTOR
+        previous *= ROUTE_DETOUR_FACTOR
+        dwell = sum(DUMP_DWELL_MEAN_S if stop.type in DUMP_TYPES else PICKUP_DWELL_MEAN_S for stop in stops)
+        return RoutePlan(route_id, stops, distance, distance / AVERAGE_SPEED_MS + dwell, previous,
+                         time.perf_counter() - started)
+
+    def apply(self, db: Session, route: Route, plan: RoutePlan):
+        """Store the order as expected pickup times (what every consumer sorts by) and the route's estimates"""
+        clock = 7 * 3600.0
+        times = sorted(stop.expected_pickup_time for stop in plan.stops if stop.expected_pickup_time)
+        if times:
+            hours, _, minutes = times[0].partition(":")
+            if hours.isdigit() and minutes.isdigit():
+                clock = int(hours) * 3600.0 + int(minutes) * 60.0
+
+        previous = None
+        for stop in plan.stops:
+            if previous is not None:
+                leg = haversine_m(previous.latitude, previous.longitude, stop.latitude, stop.longitude)
+                clock += leg * ROUTE_DETOUR_FACTOR / AVERAGE_SPEED_MS
+            # Long routes run past midnight as "24:10" etc. so the strings keep sorting in visiting order
+            minute = int(clock // 60)
+            stop.expected_pickup_time = f"{minute // 60:02d}:{minute % 60:02d}"
+            clock += DUMP_DWELL_MEAN_S if stop.type in DUMP_TYPES else PICKUP_DWELL_MEAN_S
+            previous = stop
+
+        route.estimated_distance = round(plan.distance_m / 1000, 2)
+        route.estimated_time = round(plan.time_s / 60)
+        route.total_pickup_points = len(plan.stops)
+        db.commit()
+
+    def optimize(self, db: Session, route_id: str, apply: bool = True) -> Optional[RoutePlan]:
+        route = db.query(Route).filter(Route.id == route_id).first()
+        if route is None:
+            return None
+        plan = self.plan(db, route_id)
+        if apply:
+            self.apply(db, route, plan)
+        return plan
+
+
+# Global route optimizer instance
+route_optimizer = RouteOptimizer()
@@ -0,0 +1,177 @@
+import random
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.models import PickupPoint, TruckStatus
+from .geo import haversine_m
+
+# Pickup point types where trucks unload instead of collecting
+DUMP_TYPES = ("gtp", "dumping")
+
+MIN_SPEED_KMH = 15.0
+MAX_SPEED_KMH = 35.0
+PICKUP_DWELL_S = (60.0, 240.0)
+DUMP_DWELL_S = (600.0, 1200.0)
+# Simulated seconds between recorded fixes, whatever the acceleration (a device's reporting interval)
+FIX_SECONDS = 5.0
+
+
+class RouteStop:
+    __slots__ = ("point_id", "latitude", "longitude", "is_dump")
+
+    def __init__(self, point: PickupPoint):
+        self.point_id = point.id
+        self.latitude = point.latitude
+        self.longitude = point.longitude
+        self.is_dump = point.type in DUMP_TYPES
+
+
+class TruckRun:
+    """Progress of one truck along its route's stop sequence"""
+
+    def __init__(self, truck_id: str, route_id: str, stops: List[RouteStop], trips_allowed: int, seed):
+        self.truck_id = truck_id
+        self.route_id = route_id
+        self.stops = stops
+        self.has_dump = any(stop.is_dump for stop in stops)
+        self.trips_allowed = trips_allowed
+        # Per-truck generator: adding or removing a truck does not change the others' runs
+        self.rng = random.Random(f"{seed}:{truck_id}")
+        self.latitude = stops[0].latitude
+        self.longitude = stops[0].longitude
+        self.target = 0
+        self.leg_speed_kmh = 0.0
+        self.dwell = 0.0
+        self.status = TruckStatus.IDLE
+        self.speed = 0.0
+        self.trips_completed = 0
+        self.finished = trips_allowed <= 0
+
+    def _start_leg(self):
+        self.leg_speed_kmh = self.rng.uniform(MIN_SPEED_KMH, MAX_SPEED_KMH)
+
+    def _arrive(self, stop: RouteStop):
+        self.latitude, self.longitude = stop.latitude, stop.longitude
+        low, high = DUMP_DWELL_S if stop.is_dump else PICKUP_DWELL_S
+        self.dwell = self.rng.uniform(low, high)
+        self.status = TruckStatus.DUMPING if stop.is_dump else TruckStatus.IDLE
+
+    def _depart(self):
+        stop = self.stops[self.target]
+        last = self.target == len(self.stops) - 1
+        # A trip ends at the dump (or at the end of a route without one)
+        if stop.is_dump or (last and not self.has_dump):
+            self.trips_completed += 1
+            if self.trips_completed >= self.trips_allowed:
+                self.finished = True
+                self.status = TruckStatus.IDLE
+                return
+        self.target = 0 if last else self.target + 1
+        self._start_leg()
+        self.status = TruckStatus.MOVING
+
+    def advance(self, seconds: float):
+        """Drive for ``seconds`` of simulated time, possibly passing several stops"""
+        while seconds > 0 and not self.finished:
+            if self.dwell > 0:
+                spent = min(self.dwell, seconds)
+                self.dwell -= spent
+                seconds -= spent
+                if self.dwell <= 0:
+                    self._depart()
+                continue
+
+            if self.status != TruckStatus.MOVING:
+                self._start_leg()
+                self.status = TruckStatus.MOVING
+            stop = self.stops[self.target]
+            distance = haversine_m(self.latitude, self.longitude, stop.latitude, stop.longitude)
+            speed_ms = self.leg_speed_kmh / 3.6
+            needed = distance / speed_ms
+            if needed <= seconds:
+                seconds -= needed
+                self._arrive(stop)
+            else:
+                fraction = seconds * speed_ms / distance
+                self.latitude += (stop.latitude - self.latitude) * fraction
+                self.longitude += (stop.longitude - self.longitude) * fraction
+                seconds = 0
+
+        self.speed = self.leg_speed_kmh if self.status == TruckStatus.MOVING else 0.0
+
+
+class RouteSimulator:
+    """Drives trucks along their assigned route's pickup point sequence.
+
+    Stops are visited in expected pickup time order; trucks dwell at each
+    pickup, unload at GTP/dumping points (one trip) and loop until their trip
+    allowance is used up. Simulated time runs ``acceleration`` times faster
+    than wall time and every random choice comes from per-truck generators
+    seeded from ``seed``, so the same seed replays the same day. Time moves
+    in slices of ``fix_seconds`` simulated seconds, one fix per truck each,
+    so detectors see the same track at any acceleration.
+    """
+
+    def __init__(self, seed: int = 0, acceleration: float = 1.0, start: Optional[datetime] = None,
+                 fix_seconds: float = FIX_SECONDS):
+        self.seed = seed
+        self.acceleration = acceleration
+        self.fix_seconds = fix_seconds
+        self.clock = start or datetime.utcnow()
+        self.runs: Dict[str, TruckRun] = {}
+        self.fleet_version: Optional[int] = None
+
+    def load_plans(self, db: Session, route_ids: Iterable[str]) -> Dict[str, List[RouteStop]]:
+        """Ordered stops per route"""
+        route_ids = {route_id for route_id in route_ids if route_id}
+        if not route_ids:
+            return {}
+        points = db.query(PickupPoint).filter(
+            PickupPoint.route_id.in_(route_ids),
+            PickupPoint.status == "active",
+        ).order_by(PickupPoint.route_id, PickupPoint.expected_pickup_time, PickupPoint.point_code).all()
+        plans: Dict[str, List[RouteStop]] = {}
+        for point in points:
+            plans.setdefault(point.route_id, []).append(RouteStop(point))
+        return plans
+
+    def invalidate(self):
+        """Reload stop plans on the next step (route stops were edited or reordered)"""
+        self.fleet_version = None
+
+    def load(self, db: Session, trucks: List):
+        """Create runs for trucks with a routed assignment; existing runs on the same route keep their progress"""
+        plans = self.load_plans(db, (truck.assigned_route_id for truck in trucks))
+        runs = {}
+        for truck in sorted(trucks, key=lambda t: t.id):
+            stops = plans.get(truck.assigned_route_id)
+            if not stops:
+                continue
+            run = self.runs.get(truck.id)
+            if run is None or run.route_id != truck.assigned_route_id:
+                run = TruckRun(truck.id, truck.assigned_route_id, stops, truck.trips_allowed, self.seed)
+            else:
+                run.stops = stops
+                run.has_dump = any(stop.is_dump for stop in stops)
+                run.target = min(run.target, len(stops) - 1)
+            runs[truck.id] = run
+        self.runs = runs
+
+    def step(self, interval: float, record: Optional[Callable[[datetime, TruckRun], None]] = None) -> datetime:
+        """Advance every run by ``interval`` wall seconds; returns the new simulated time.
+
+        ``record(ts, run)`` is called for every run after each slice, with
+        ``ts`` on the simulated clock (which only moves forward).
+        """
+        remaining = interval * self.acceleration
+        while remaining > 0:
+            seconds = min(self.fix_seconds, remaining)
+            remaining -= seconds
+            self.clock += timedelta(seconds=seconds)
+            for run in self.runs.values():
+                run.advance(seconds)
+                if record is not None:
+                    record(self.clock, run)
+        return self.clock
@@ -0,0 +1,318 @@
+import heapq
+import math
+from typing import Callable, Dict, Generic, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# (min_x, min_y, max_x, max_y); x is longitude, y latitude
+BBox = Tuple[float, float, float, float]
+
+
+class _Node:
+    __slots__ = ("bbox", "children", "items")
+
+    def __init__(self, bbox: BBox, children=None, items=None):
+        self.bbox = bbox
+        self.children = children
+        self.items = items
+
+
+def _union(boxes: Sequence[BBox]) -> BBox:
+    return (
+        min(box[0] for box in boxes),
+        min(box[1] for box in boxes),
+        max(box[2] for box in boxes),
+        max(box[3] for box in boxes),
+    )
+
+
+class STRtree(Generic[T]):
+    """Static R-tree bulk-loaded with Sort-Tile-Recursive packing.
+
+    Built once from (bbox, item) pairs; queries return the items whose
+    bounding box contains a point or intersects a box, visiting only the
+    branches that can match. Exact geometry tests are up to the caller.
+    """
+
+    def __init__(self, entries: Sequence[Tuple[BBox, T]], node_capacity: int = 8):
+        self.node_capacity = node_capacity
+        self.size = len(entries)
+        level = [_Node(bbox, items=[item]) for bbox, item in entries]
+        if not level:
+            self.root = None
+            return
+        while len(level) > 1:
+            level = self._pack(level)
+        self.root = level[0]
+
+    def _pack(self, nodes: List[_Node]) -> List[_Node]:
+        capacity = self.node_capacity
+        parent_count = math.ceil(len(nodes) / capacity)
+        slice_count = math.ceil(math.sqrt(parent_count))
+        slice_size = slice_count * capacity
+
+        by_x = sorted(nodes, key=lambda node: node.bbox[0] + node.bbox[2])
+        parents = []
+        for start in range(0, len(by_x), slice_size):
+            vertical_slice = sorted(by_x[start:start + slice_size], key=lambda node: node.bbox[1] + node.bbox[3])
+            for group_start in range(0, len(vertical_slice), capacity):
+                group = vertical_slice[group_start:group_start + capacity]
+                parents.append(_Node(_union([node.bbox for node in group]), children=group))
+        return parents
+
+    def query_point(self, x: float, y: float) -> List[T]:
+        """Items whose bounding box contains (x, y)"""
+        found: List[T] = []
+        if self.root is None:
+            return found
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            min_x, min_y, max_x, max_y = node.bbox
+            if x < min_x or x > max_x or y < min_y or y > max_y:
+                continue
+            if node.items is not None:
+                found.extend(node.items)
+            else:
+                stack.extend(node.children)
+        return found
+
+    def query_bbox(self, bbox: BBox) -> List[T]:
+        """Items whose bounding box intersects ``bbox``"""
+        found: List[T] = []
+        if self.root is None:
+            return found
+        q_min_x, q_min_y, q_max_x, q_max_y = bbox
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            min_x, min_y, max_x, max_y = node.bbox
+            if q_max_x < min_x or q_min_x > max_x or q_max_y < min_y or q_min_y > max_y:
+                continue
+            if node.items is not None:
+                found.extend(node.items)
+            else:
+                stack.extend(node.children)
+        return found
+
+
+class PointGrid(Generic[T]):
+    """Uniform grid over points in a planar (projected) coordinate system.
+
+    Points live in square cells of ``cell_size``; a radius query only visits
+    the cells overlapping the query circle. Points can be moved or removed,
+    so the grid works for both static (pickup points) and moving (trucks)
+    data.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Dict[Hashable, Tuple[float, float, T]]] = {}
+        self._where: Dict[Hashable, Tuple[int, int]] = {}
+        # (min_i, min_j, max_i, max_j) of every cell ever used; bounds nearest() searches
+        self._extent: Optional[Tuple[int, int, int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        size = self.cell_size
+        return math.floor(x / size), math.floor(y / size)
+
+    def insert(self, key: Hashable, x: float, y: float, item: T):
+        """Add or move ``key`` to (x, y)"""
+        cell = self.cell_of(x, y)
+        old = self._where.get(key)
+        if old == cell:
+            self.cells[cell][key] = (x, y, item)
+            return
+        if old is not None:
+            self._discard(key, old)
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            bucket = self.cells[cell] = {}
+            extent = self._extent
+            i, j = cell
+            if extent is None:
+                self._extent = (i, j, i, j)
+            elif not (extent[0] <= i <= extent[2] and extent[1] <= j <= extent[3]):
+                self._extent = (min(extent[0], i), min(extent[1], j), max(extent[2], i), max(extent[3], j))
+        bucket[key] = (x, y, item)
+        self._where[key] = cell
+
+    def insert_many(self, entries: Iterable[Tuple[Hashable, float, float, T]]):
+        """insert() for many (key, x, y, item) entries; mostly-unmoved keys take a fast path"""
+        size = self.cell_size
+        cells = self.cells
+        where = self._where
+        for key, x, y, item in entries:
+            cell = (math.floor(x / size), math.floor(y / size))
+            if where.get(key) == cell:
+                cells[cell][key] = (x, y, item)
+            else:
+                self.insert(key, x, y, item)
+
+    def remove(self, key: Hashable):
+        cell = self._where.pop(key, None)
+        if cell is not None:
+            self._discard(key, cell)
+
+    def _discard(self, key: Hashable, cell: Tuple[int, int]):
+        bucket = self.cells.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self.cells[cell]
+
+    def candidates(self, x: float, y: float, radius: float) -> Iterator[Tuple[Hashable, float, float, T]]:
+        """Points in the cells overlapping the circle (a superset of the points within ``radius``)"""
+        min_i, min_j = self.cell_of(x - radius, y - radius)
+        max_i, max_j = self.cell_of(x + radius, y + radius)
+        cells = self.cells
+        for i in range(min_i, max_i + 1):
+            for j in range(min_j, max_j + 1):
+                bucket = cells.get((i, j))
+                if bucket:
+                    for key, (px, py, item) in bucket.items():
+                        yield key, px, py, item
+
+    def within(self, x: float, y: float, radius: float) -> List[Tuple[float, Hashable, T]]:
+        """(distance, key, item) for points within ``radius``, nearest first"""
+        limit = radius * radius
+        found = []
+        for key, px, py, item in self.candidates(x, y, radius):
+            d2 = (px - x) ** 2 + (py - y) ** 2
+            if d2 <= limit:
+                found.append((math.sqrt(d2), key, item))
+        found.sort(key=lambda hit: hit[0])
+        return found
+
+    def in_box(self, min_x: float, min_y: float, max_x: float, max_y: float) -> Iterator[Tuple[Hashable, T]]:
+        """(key, item) for points inside an axis-aligned box"""
+        min_i, min_j = self.cell_of(min_x, min_y)
+        max_i, max_j = self.cell_of(max_x, max_y)
+        cells = self.cells
+        if (max_i - min_i + 1) * (max_j - min_j + 1) > len(cells):
+            # A box wider than the data (zoomed far out): walk the occupied cells instead
+            for (i, j), bucket in cells.items():
+                if min_i <= i <= max_i and min_j <= j <= max_j:
+                    for key, (px, py, item) in bucket.items():
+                        if min_x <= px <= max_x and min_y <= py <= max_y:
+                            yield key, item
+            return
+        for i in range(min_i, max_i + 1):
+            for j in range(min_j, max_j + 1):
+                bucket = cells.get((i, j))
+                if bucket:
+                    for key, (px, py, item) in bucket.items():
+                        if min_x <= px <= max_x and min_y <= py <= max_y:
+                            yield key, item
+
+    def nearest(self, x: float, y: float, k: int, accept: Optional[Callable[[T], bool]] = None,
+                max_distance: Optional[float] = None) -> List[Tuple[float, Hashable, T]]:
+        """Up to ``k`` (distance, key, item) nearest to (x, y), nearest first.
+
+        Searches square rings of cells outward from the query cell and stops
+        once the k-th best distance is closer than anything in the next ring.
+        """
+        if k <= 0 or self._extent is None:
+            return []
+        size = self.cell_size
+        ci, cj = self.cell_of(x, y)
+        min_i, min_j, max_i, max_j = self._extent
+        last_ring = max(ci - min_i, max_i - ci, cj - min_j, max_j - cj)
+        if max_distance is not None:
+            last_ring = min(last_ring, int(max_distance // size) + 1)
+        limit = max_distance * max_distance if max_distance is not None else math.inf
+        cells = self.cells
+        best: List[Tuple[float, int, Hashable, T]] = []  # max-heap on distance via negation
+        counter = 0
+
+        for ring in range(last_ring + 1):
+            if ring == 0:
+                ring_cells = [(ci, cj)]
+            else:
+                ring_cells = [(ci + d, cj - ring) for d in range(-ring, ring + 1)]
+                ring_cells += [(ci + d, cj + ring) for d in range(-ring, ring + 1)]
+                ring_cells += [(ci - ring, cj + d) for d in range(-ring + 1, ring)]
+                ring_cells += [(ci + ring, cj + d) for d in range(-ring + 1, ring)]
+            for cell in ring_cells:
+                bucket = cells.get(cell)
+                if not bucket:
+                    continue
+                for key, (px, py, item) in bucket.items():
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 > limit or (len(best) == k and d2 >= -best[0][0]):
+                        continue
+                    if accept is not None and not accept(item):
+                        continue
+                    counter += 1
+                    if len(best) == k:
+                        heapq.heapreplace(best, (-d2, counter, key, item))
+                    else:
+                        heapq.heappush(best, (-d2, counter, key, item))
+            # Every point outside this ring is at least ring * size away
+            if len(best) == k and -best[0][0] <= (ring * size) ** 2:
+                break
+
+        return [(math.sqrt(-d2), key, item) for d2, _, key, item in sorted(best, reverse=True)]
+
+
+class SegmentGrid(Generic[T]):
+    """Uniform grid over line segments in a planar (projected) coordinate system.
+
+    Each segment is registered in every cell its bounding box, grown by
+    ``margin``, overlaps. The segments within ``margin`` of a point are then
+    all in the point's own cell: one dict lookup per query, and a point
+    whose cell is empty is known to be farther than ``margin`` from all of
+    them.
+    """
+
+    def __init__(self, cell_size: float, margin: float):
+        self.cell_size = cell_size
+        self.margin = margin
+        self.cells: Dict[Tuple[int, int], List[Tuple[float, float, float, float, T]]] = {}
+        self.size = 0
+
+    def insert(self, x1: float, y1: float, x2: float, y2: float, item: T):
+        size = self.cell_size
+        margin = self.margin
+        segment = (x1, y1, x2, y2, item)
+        for i in range(math.floor((min(x1, x2) - margin) / size), math.floor((max(x1, x2) + margin) / size) + 1):
+            for j in range(math.floor((min(y1, y2) - margin) / size), math.floor((max(y1, y2) + margin) / size) + 1):
+                self.cells.setdefault((i, j), []).append(segment)
+        self.size += 1
+
+    def nearest(self, x: float, y: float) -> Optional[Tuple[float, T]]:
+        """(distance, item) of the closest segment, or None if none is within ``margin``"""
+        size = self.cell_size
+        candidates = self.cells.get((math.floor(x / size), math.floor(y / size)))
+        if not candidates:
+            return None
+        best_d2 = math.inf
+        best_item = None
+        for x1, y1, x2, y2, item in candidates:
+            dx = x2 - x1
+            dy = y2 - y1
+            px = x - x1
+            py = y - y1
+            length_sq = dx * dx + dy * dy
+            if length_sq > 0.0:
+                t = (px * dx + py * dy) / length_sq
+                if t < 0.0:
+                    t = 0.0
+                elif t > 1.0:
+                    t = 1.0
+                px -= t * dx
+                py -= t * dy
+            d2 = px * px + py * py
+            if d2 < best_d2:
+                best_d2 = d2
+                best_item = item
+        distance = math.sqrt(best_d2)
+        if distance > self.margin:
+            return None
+        return distance, best_item
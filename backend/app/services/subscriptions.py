@@ -0,0 +1,181 @@
+import math
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .live_feed import PositionFeed
+
+# Viewport subscriptions are bucketed on a ~2 km grid; very large viewports
+# (zoomed out to the whole city) are few and simply checked for every truck.
+BBOX_CELL_DEG = 0.02
+MAX_BBOX_CELLS = 400
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return math.floor(lat / BBOX_CELL_DEG), math.floor(lng / BBOX_CELL_DEG)
+
+
+class SubscriptionFilter:
+    """What a viewer wants to see: any combination of zone, ward, route and map viewport"""
+
+    __slots__ = ("zone_id", "ward_id", "route_id", "bbox")
+
+    def __init__(self, zone_id: Optional[str] = None, ward_id: Optional[str] = None,
+                 route_id: Optional[str] = None, bbox: Optional[Tuple[float, float, float, float]] = None):
+        self.zone_id = zone_id
+        self.ward_id = ward_id
+        self.route_id = route_id
+        self.bbox = bbox
+
+    @classmethod
+    def from_message(cls, message: dict) -> "SubscriptionFilter":
+        """Build from a subscribe message; bbox is [west, south, east, north] (GeoJSON order)"""
+        bbox = message.get("bbox")
+        if bbox is not None:
+            if not isinstance(bbox, (list, tuple)) or len(bbox) != 4:
+                raise ValueError("bbox must be [west, south, east, north]")
+            west, south, east, north = (float(value) for value in bbox)
+            if west > east or south > north:
+                raise ValueError("bbox must be [west, south, east, north]")
+            bbox = (west, south, east, north)
+        return cls(
+            zone_id=message.get("zone_id") or None,
+            ward_id=message.get("ward_id") or None,
+            route_id=message.get("route_id") or None,
+            bbox=bbox,
+        )
+
+    def key(self) -> tuple:
+        return (self.zone_id, self.ward_id, self.route_id, self.bbox)
+
+    def is_empty(self) -> bool:
+        return self.key() == (None, None, None, None)
+
+    def matches(self, truck, position: dict) -> bool:
+        if truck is None and (self.zone_id or self.ward_id or self.route_id):
+            return False
+        if self.zone_id and truck.zone_id != self.zone_id:
+            return False
+        if self.ward_id and truck.ward_id != self.ward_id:
+            return False
+        if self.route_id and truck.assigned_route_id != self.route_id:
+            return False
+        if self.bbox:
+            west, south, east, north = self.bbox
+            if not (south <= position["latitude"] <= north and west <= position["longitude"] <= east):
+                return False
+        return True
+
+
+class LiveView:
+    """Viewers sharing one filter; they share a sequenced feed and its encoded frames."""
+
+    def __init__(self, subscription_filter: SubscriptionFilter):
+        self.filter = subscription_filter
+        self.feed = PositionFeed()
+        self.clients: Set = set()
+
+
+class SubscriptionIndex:
+    """Maps truck updates to the views that want them.
+
+    Each filtered view is indexed under its most selective attribute (route,
+    then ward, then zone, then viewport grid cells), so a truck is only tested
+    against views that can plausibly match it instead of every subscriber.
+    """
+
+    def __init__(self):
+        self.default_view = LiveView(SubscriptionFilter())
+        self.views: Dict[tuple, LiveView] = {}
+        self._by_route: Dict[str, Set[LiveView]] = {}
+        self._by_ward: Dict[str, Set[LiveView]] = {}
+        self._by_zone: Dict[str, Set[LiveView]] = {}
+        self._by_cell: Dict[Tuple[int, int], Set[LiveView]] = {}
+        self._large_bbox: Set[LiveView] = set()
+
+    def _bbox_cells(self, bbox) -> Optional[List[Tuple[int, int]]]:
+        west, south, east, north = bbox
+        (min_i, min_j), (max_i, max_j) = _cell(south, west), _cell(north, east)
+        if (max_i - min_i + 1) * (max_j - min_j + 1) > MAX_BBOX_CELLS:
+            return None
+        return [(i, j) for i in range(min_i, max_i + 1) for j in range(min_j, max_j + 1)]
+
+    def _index(self, view: LiveView, add: bool):
+        f = view.filter
+        if f.route_id:
+            buckets = [self._by_route.setdefault(f.route_id, set())]
+        elif f.ward_id:
+            buckets = [self._by_ward.setdefault(f.ward_id, set())]
+        elif f.zone_id:
+            buckets = [self._by_zone.setdefault(f.zone_id, set())]
+        else:
+            cells = self._bbox_cells(f.bbox)
+            if cells is None:
+                buckets = [self._large_bbox]
+            else:
+                buckets = [self._by_cell.setdefault(cell, set()) for cell in cells]
+        for bucket in buckets:
+            if add:
+                bucket.add(view)
+            else:
+                bucket.discard(view)
+        if not add:
+            for index in (self._by_route, self._by_ward, self._by_zone, self._by_cell):
+                for key in [key for key, bucket in index.items() if not bucket]:
+                    del index[key]
+
+    def view_for(self, subscription_filter: SubscriptionFilter) -> LiveView:
+        if subscription_filter.is_empty():
+            return self.default_view
+        key = subscription_filter.key()
+        view = self.views.get(key)
+        if view is None:
+            view = LiveView(subscription_filter)
+            self.views[key] = view
+            self._index(view, add=True)
+        return view
+
+    def release(self, view: LiveView):
+        """Forget a filtered view once its last viewer has left"""
+        if view is self.default_view or view.clients:
+            return
+        if self.views.pop(view.filter.key(), None) is not None:
+            self._index(view, add=False)
+
+    def all_views(self) -> Iterable[LiveView]:
+        yield self.default_view
+        yield from self.views.values()
+
+    def route(self, positions: List[dict], lookup: Callable) -> Dict[LiveView, List[dict]]:
+        """Split one tick of positions into per-view lists"""
+        buckets: Dict[LiveView, List[dict]] = {view: [] for view in self.views.values()}
+        if self.default_view.clients:
+            buckets[self.default_view] = positions
+        if not self.views:
+            return buckets
+
+        by_route, by_ward, by_zone = self._by_route, self._by_ward, self._by_zone
+        by_cell, large_bbox = self._by_cell, self._large_bbox
+        for position in positions:
+            truck = lookup(position["id"])
+            candidates = []
+            if truck is not None:
+                if truck.assigned_route_id in by_route:
+                    candidates.extend(by_route[truck.assigned_route_id])
+                if truck.ward_id in by_ward:
+                    candidates.extend(by_ward[truck.ward_id])
+                if truck.zone_id in by_zone:
+                    candidates.extend(by_zone[truck.zone_id])
+            cell = _cell(position["latitude"], position["longitude"])
+            if cell in by_cell:
+                candidates.extend(by_cell[cell])
+            candidates.extend(large_bbox)
+
+            for view in candidates:
+                if view.filter.matches(truck, position):
+                    buckets[view].append(position)
+        return buckets
+
+    def positions_for(self, view: LiveView, positions: List[dict], lookup: Callable) -> List[dict]:
+        """Positions matching a single view (used when a view gets its first viewer)"""
+        if view is self.default_view:
+            return positions
+        return [p for p in positions if view.filter.matches(lookup(p["id"]), p)]
@@ -0,0 +1,184 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.models import Truck, TruckStatus
+from .leadership import leader_election
+from .live_state import live_state
+from .position_history import position_history
+from .pubsub import TELEMETRY_TOPIC, pubsub
+
+# Fixes stamped further ahead of the server clock than this are rejected
+TELEMETRY_MAX_CLOCK_SKEW_SECONDS = float(os.getenv("TELEMETRY_MAX_CLOCK_SKEW_SECONDS", "300"))
+
+
+def to_utc_naive(value: Optional[datetime]) -> datetime:
+    """Timestamps are stored as naive UTC, matching datetime.utcnow() elsewhere."""
+    if value is None:
+        return datetime.utcnow()
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class ImeiIndex:
+    """In-memory IMEI -> truck id lookup, reloaded lazily from the trucks table."""
+
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self._index: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Force a reload on the next lookup (call after trucks are created or edited)"""
+        self._loaded_at = None
+
+    def _reload(self, db: Session):
+        rows = db.query(Truck.imei_number, Truck.id).filter(Truck.imei_number.isnot(None)).all()
+        self._index = {imei.strip(): truck_id for imei, truck_id in rows if imei and imei.strip()}
+        self._loaded_at = time.monotonic()
+
+    def resolve(self, db: Session, imeis: Iterable[str]) -> Dict[str, str]:
+        """Map each known IMEI to its truck id; unknown IMEIs are left out"""
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+                self._reload(db)
+            index = self._index
+        return {imei: index[imei] for imei in imeis if imei in index}
+
+
+class TelemetryIngestor:
+    """Applies batches of device GPS fixes to the live fleet state and position history.
+
+    Only the leader records history and runs the position processors, so
+    each truck's geofence, deviation, trip and halt state sees one
+    continuous track. A follower validates the fixes and forwards them to
+    the leader on the telemetry topic.
+    """
+
+    def __init__(self):
+        self.imei_index = ImeiIndex()
+
+    def ingest(self, db: Session, fixes: List) -> dict:
+        """Resolve IMEIs, validate the fixes and hand them to the leader (or apply them here).
+
+        The trucks table is not written here: the live store flushes dirty
+        trucks in one bulk UPDATE on its write-behind cycle.
+        """
+        resolved = self.imei_index.resolve(db, {fix.imei.strip() for fix in fixes})
+        # A fix from a device with a bad clock would make every later real fix
+        # look stale; ones older than the retention window have no partition
+        now = datetime.utcnow()
+        newest = now + timedelta(seconds=TELEMETRY_MAX_CLOCK_SKEW_SECONDS)
+        oldest = now - timedelta(days=position_history.retention_days) if position_history.retention_days else None
+
+        rows: List[dict] = []
+        unknown_imeis = set()
+        unknown = 0
+        rejected = 0
+
+        for fix in fixes:
+            imei = fix.imei.strip()
+            truck_id = resolved.get(imei)
+            if truck_id is None:
+                unknown_imeis.add(imei)
+                unknown += 1
+                continue
+
+            last_update = to_utc_naive(fix.timestamp)
+            if last_update > newest or (oldest is not None and last_update < oldest):
+                rejected += 1
+                continue
+            if fix.status:
+                try:
+                    TruckStatus(fix.status)
+                except ValueError:
+                    # Not a TruckStatus; the fix is not trusted for position either
+                    rejected += 1
+                    continue
+
+            rows.append({
+                "id": truck_id,
+                "latitude": fix.latitude,
+                "longitude": fix.longitude,
+                "speed": fix.speed or 0.0,
+                "status": fix.status or None,
+                "last_update": last_update,
+            })
+
+        updated = 0
+        if rows:
+            live_state.ensure_loaded(db)
+            if leader_election.is_leader:
+                updated = self.apply(rows)
+                position_history.flush(db)
+            else:
+                pubsub.publish(TELEMETRY_TOPIC, {"fixes": [
+                    dict(row, last_update=row["last_update"].isoformat()) for row in rows
+                ]})
+                # Keeps this worker's /trucks/live current until the leader's next broadcast
+                updated = live_state.apply_fixes(latest_per_truck(rows))
+
+        return {
+            "received": len(fixes),
+            "accepted": len(rows),
+            "unknown": unknown,
+            "rejected": rejected,
+            "trucks_updated": updated,
+            "unknown_imeis": sorted(unknown_imeis),
+        }
+
+    def apply(self, rows: List[dict]) -> int:
+        """Leader: queue validated fixes for position history and apply the latest one per truck.
+
+        History is written by the caller's flush (or the next write-behind
+        cycle); returns the number of trucks whose position changed.
+        """
+        position_history.record_many(
+            {
+                "truck_id": row["id"],
+                "ts": row["last_update"],
+                "latitude": row["latitude"],
+                "longitude": row["longitude"],
+                "speed": row["speed"],
+                "status": row["status"],
+            }
+            for row in rows
+        )
+        updated = 0
+        for row in latest_per_truck(rows):
+            if live_state.update_position(
+                row["id"],
+                row["latitude"],
+                row["longitude"],
+                row["speed"],
+                row["last_update"],
+                TruckStatus(row["status"]) if row["status"] else None,
+            ):
+                updated += 1
+        return updated
+
+    def apply_forwarded(self, fixes: List[dict]) -> int:
+        """Leader: apply fixes a follower validated and published on the telemetry topic"""
+        return self.apply([
+            dict(fix, last_update=datetime.fromisoformat(fix["last_update"])) for fix in fixes
+        ])
+
+
+def latest_per_truck(rows: List[dict]) -> List[dict]:
+    """Devices may deliver buffered fixes out of order; only the newest one per truck counts"""
+    latest: Dict[str, dict] = {}
+    for row in rows:
+        current = latest.get(row["id"])
+        if current is None or row["last_update"] >= current["last_update"]:
+            latest[row["id"]] = row
+    return list(latest.values())
+
+
+# Global ingestor instance
+telemetry_ingestor = TelemetryIngestor()
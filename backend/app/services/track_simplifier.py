@@ -0,0 +1,111 @@
+import heapq
+import math
+from typing import List, Sequence, Tuple
+
+from .geo import meters_per_degree
+
+
+def _project(coords: Sequence[Tuple[float, float]]) -> Tuple[List[float], List[float]]:
+    """Equirectangular projection to meters around the first point; accurate enough at city scale"""
+    mx, my = meters_per_degree(coords[0][0])
+    lat0, lng0 = coords[0]
+    xs = [(lng - lng0) * mx for _, lng in coords]
+    ys = [(lat - lat0) * my for lat, _ in coords]
+    return xs, ys
+
+
+def _radial_filter(xs: List[float], ys: List[float], tolerance: float) -> List[int]:
+    """Indexes of points at least ``tolerance`` from the previously kept one.
+
+    Parked trucks report the same spot thousands of times a day; dropping
+    those first keeps the Douglas-Peucker pass small.
+    """
+    n = len(xs)
+    tol_sq = tolerance * tolerance
+    kept = [0]
+    last_x, last_y = xs[0], ys[0]
+    for i in range(1, n - 1):
+        dx = xs[i] - last_x
+        dy = ys[i] - last_y
+        if dx * dx + dy * dy >= tol_sq:
+            kept.append(i)
+            last_x, last_y = xs[i], ys[i]
+    if n > 1:
+        kept.append(n - 1)
+    return kept
+
+
+def _douglas_peucker_significance(xs: List[float], ys: List[float], tolerance: float) -> List[float]:
+    """Douglas-Peucker significance per point (meters); points below ``tolerance`` get 0.
+
+    Each split point is tagged with its deviation, capped by its parent's, so
+    keeping the N most significant points yields the same shape Douglas-Peucker
+    would produce for the matching tolerance. Iterative to avoid deep recursion.
+    """
+    n = len(xs)
+    significance = [0.0] * n
+    if n == 0:
+        return significance
+    significance[0] = significance[n - 1] = math.inf
+    stack = [(0, n - 1, math.inf)]
+    tol_sq = tolerance * tolerance
+
+    while stack:
+        first, last, parent = stack.pop()
+        if last - first < 2:
+            continue
+
+        ax, ay = xs[first], ys[first]
+        dx = xs[last] - ax
+        dy = ys[last] - ay
+        seg_len_sq = dx * dx + dy * dy
+
+        best_index = -1
+        best_dist_sq = -1.0
+        for i in range(first + 1, last):
+            px = xs[i] - ax
+            py = ys[i] - ay
+            if seg_len_sq > 0.0:
+                t = (px * dx + py * dy) / seg_len_sq
+                if t < 0.0:
+                    t = 0.0
+                elif t > 1.0:
+                    t = 1.0
+                px -= t * dx
+                py -= t * dy
+            dist_sq = px * px + py * py
+            if dist_sq > best_dist_sq:
+                best_dist_sq = dist_sq
+                best_index = i
+
+        if best_dist_sq < tol_sq:
+            continue
+
+        value = min(math.sqrt(best_dist_sq), parent)
+        significance[best_index] = value
+        stack.append((first, best_index, value))
+        stack.append((best_index, last, value))
+
+    return significance
+
+
+def simplify_indexes(coords: Sequence[Tuple[float, float]], tolerance: float, max_points: int) -> List[int]:
+    """Indexes (ascending) of the points to keep from a (lat, lng) polyline.
+
+    Points closer than ``tolerance`` meters to the simplified line are dropped;
+    if more than ``max_points`` survive, only the most significant are kept.
+    """
+    n = len(coords)
+    if n <= 2:
+        return list(range(n))
+
+    xs, ys = _project(coords)
+    candidates = _radial_filter(xs, ys, tolerance) if tolerance > 0 else list(range(n))
+    cxs = [xs[i] for i in candidates]
+    cys = [ys[i] for i in candidates]
+    significance = _douglas_peucker_significance(cxs, cys, tolerance)
+
+    kept = [i for i, value in enumerate(significance) if value > 0.0]
+    if len(kept) > max_points:
+        kept = sorted(heapq.nlargest(max_points, kept, key=significance.__getitem__))
+    return [candidates[i] for i in kept]
@@ -0,0 +1,209 @@
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.models import GtcCheckpointEntry, PickupPoint
+from .geo import LocalProjection
+from .live_state import LiveFleetState, live_state
+from .pubsub import TRIPS_TOPIC, pubsub
+from .route_simulator import DUMP_TYPES
+from .spatial_index import PointGrid
+
+# Sites are circles at least this large: trucks queue and unload around the gate, not on it
+DUMP_SITE_RADIUS_M = float(os.getenv("DUMP_SITE_RADIUS_M", "75"))
+# A truck must stay this long inside a site for the visit to count as unloading
+DUMP_DWELL_SECONDS = float(os.getenv("DUMP_DWELL_SECONDS", "180"))
+# Hysteresis: a truck has left once it is this far outside the site radius
+DUMP_EXIT_MARGIN_M = 25.0
+
+
+class DumpSite:
+    """A GTP or dumping yard; route stops at the same place share one site"""
+
+    __slots__ = ("key", "name", "type", "latitude", "longitude", "point_ids", "radius", "exit_radius")
+
+    def __init__(self, key: str, point: PickupPoint):
+        self.key = key
+        self.name = point.name
+        self.type = point.type
+        self.latitude = point.latitude
+        self.longitude = point.longitude
+        self.point_ids = [point.id]
+        self.radius = max(float(point.geofence_radius or 0), DUMP_SITE_RADIUS_M)
+        self.exit_radius = self.radius + DUMP_EXIT_MARGIN_M
+
+    @property
+    def is_gtc(self) -> bool:
+        return self.type == "gtp"
+
+
+# Per-truck trip states
+ARRIVED = "arrived"
+UNLOADING = "unloading"
+
+
+class SiteVisit:
+    """A truck inside a dump site: ARRIVED until it has dwelt, then UNLOADING until it leaves"""
+
+    __slots__ = ("site", "arrived_at", "state")
+
+    def __init__(self, site: DumpSite, arrived_at: datetime):
+        self.site = site
+        self.arrived_at = arrived_at
+        self.state = ARRIVED
+
+
+class TripDetector:
+    """Counts dump trips from truck fixes.
+
+    GTP and dumping-yard stops are indexed as circles; each truck has a
+    small state machine (outside -> arrived -> unloading -> outside)
+    advanced by every fix. Dwelling DUMP_DWELL_SECONDS inside a site records
+    a GTC checkpoint arrival (GTP sites); leaving after that completes a
+    trip, which increments the truck's trips_completed in the live store.
+    A drive-by that never dwells counts for nothing.
+    """
+
+    def __init__(self, dwell_seconds: float = DUMP_DWELL_SECONDS, fleet: LiveFleetState = live_state):
+        self.dwell_seconds = dwell_seconds
+        self.fleet = fleet
+        self.projection: Optional[LocalProjection] = None
+        self.sites: Dict[str, DumpSite] = {}
+        self.grid: PointGrid[DumpSite] = PointGrid(DUMP_SITE_RADIUS_M)
+        self.reach = DUMP_SITE_RADIUS_M + DUMP_EXIT_MARGIN_M
+        self._visits: Dict[str, SiteVisit] = {}
+        self._last_fix: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self.trips_detected = 0
+        self.arrivals_recorded = 0
+
+    def load(self, db: Session):
+        points = db.query(PickupPoint).filter(
+            PickupPoint.type.in_(DUMP_TYPES),
+            PickupPoint.status == "active",
+        ).order_by(PickupPoint.id).all()
+        sites: Dict[str, DumpSite] = {}
+        for point in points:
+            # Stops within a meter or so of each other are the same site
+            key = f"{point.type}:{point.latitude:.5f},{point.longitude:.5f}"
+            site = sites.get(key)
+            if site is None:
+                sites[key] = DumpSite(key, point)
+            else:
+                site.point_ids.append(point.id)
+                site.radius = max(site.radius, float(point.geofence_radius or 0))
+                site.exit_radius = site.radius + DUMP_EXIT_MARGIN_M
+
+        projection = LocalProjection(sum(point.latitude for point in points) / len(points) if points else 0.0)
+        reach = max((site.exit_radius for site in sites.values()), default=DUMP_SITE_RADIUS_M + DUMP_EXIT_MARGIN_M)
+        grid: PointGrid[DumpSite] = PointGrid(reach)
+        for key, site in sites.items():
+            grid.insert(key, *projection.to_xy(site.latitude, site.longitude), site)
+        with self._lock:
+            self.projection = projection
+            self.sites = sites
+            self.grid = grid
+            self.reach = reach
+            # Trucks inside a site that still exists keep their visit
+            for truck_id, visit in list(self._visits.items()):
+                site = sites.get(visit.site.key)
+                if site is None:
+                    del self._visits[truck_id]
+                else:
+                    visit.site = site
+        print(f"Loaded {len(sites)} dump sites for trip detection")
+
+    def process(self, db: Session, rows: List[dict]) -> List[dict]:
+        """Advance the trip state machines over a batch of fixes (position history rows).
+
+        Each processed row is marked ``at_dump_site`` for later processors.
+        """
+        with self._lock:
+            if self.projection is None or not self.sites:
+                return []
+            events, arrivals = self._process(sorted(rows, key=lambda row: (row["truck_id"], row["ts"])))
+        if arrivals:
+            # Written in the batch transaction; an attendant completes the record at the GTC
+            db.add_all(arrivals)
+            self.arrivals_recorded += len(arrivals)
+        if events:
+            pubsub.publish(TRIPS_TOPIC, {"type": "trips", "events": events})
+        return events
+
+    def _process(self, rows: List[dict]):
+        to_xy = self.projection.to_xy
+        within = self.grid.within
+        reach = self.reach
+        visits = self._visits
+        last_fix = self._last_fix
+        events: List[dict] = []
+        arrivals: List[GtcCheckpointEntry] = []
+
+        for row in rows:
+            truck_id = row["truck_id"]
+            ts = row["ts"]
+            previous = last_fix.get(truck_id)
+            if previous is not None and ts <= previous:
+                continue
+            last_fix[truck_id] = ts
+            x, y = to_xy(row["latitude"], row["longitude"])
+            hits = within(x, y, reach)
+            visit = visits.get(truck_id)
+
+            if visit is not None:
+                distance = next((d for d, _, site in hits if site is visit.site), None)
+                if distance is not None and distance <= visit.site.exit_radius:
+                    if visit.state == ARRIVED and (ts - visit.arrived_at).total_seconds() >= self.dwell_seconds:
+                        visit.state = UNLOADING
+                        if visit.site.is_gtc:
+                            arrivals.append(GtcCheckpointEntry(
+                                truck_id=truck_id,
+                                arrived_at=visit.arrived_at,
+                                remarks=f"Arrival detected from GPS at {visit.site.name}",
+                            ))
+                        events.append(self._event("unloading", truck_id, visit.site, visit.arrived_at))
+                    row["at_dump_site"] = True
+                    continue
+
+                # Left the site; only a visit that dwelt is a trip
+                del visits[truck_id]
+                if visit.state == UNLOADING:
+                    trips = self.fleet.increment_trips(truck_id)
+                    self.trips_detected += 1
+                    event = self._event("trip_completed", truck_id, visit.site, ts)
+                    event["trips_completed"] = trips
+                    events.append(event)
+
+            for distance, _, site in hits:
+                if distance <= site.radius:
+                    visits[truck_id] = SiteVisit(site, ts)
+                    events.append(self._event("arrived", truck_id, site, ts))
+                    break
+            row["at_dump_site"] = truck_id in visits
+
+        return events, arrivals
+
+    @staticmethod
+    def _event(kind: str, truck_id: str, site: DumpSite, ts: datetime) -> dict:
+        return {
+            "event": kind,
+            "truck_id": truck_id,
+            "site": site.name,
+            "site_type": site.type,
+            "timestamp": ts.isoformat(),
+        }
+
+    def stats(self) -> dict:
+        return {
+            "sites": len(self.sites),
+            "trucks_at_sites": len(self._visits),
+            "trips_detected": self.trips_detected,
+            "gtc_arrivals_recorded": self.arrivals_recorded,
+        }
+
+
+# Global trip detector instance
+trip_detector = TripDetector()
@@ -1,16 +1,33 @@
-import asyncio
+import os
 import random
 import math
 from datetime import datetime
-from typing import Dict, List
-from sqlalchemy.orm import Session
-from ..models.models import Truck, TruckStatus
+from typing import Dict, Optional
+from ..models.models import TruckStatus
 from ..database.database import SessionLocal
+from .live_state import LiveTruck, live_state
+from .position_history import position_history
+from .fleet_simulator import FleetSimulator, np
+from .route_simulator import RouteSimulator
+
+# "vectorized" (NumPy, whole fleet per step), "scalar" (one truck at a time),
+# "route" (follow assigned routes' pickup sequences), or "auto": vectorized
+# when numpy is installed
+SIMULATOR_MODE = os.getenv("SIMULATOR_MODE", "auto")
+# Route mode: simulated seconds per wall-clock second, and the random seed
+SIMULATOR_ACCELERATION = float(os.getenv("SIMULATOR_ACCELERATION", "1"))
+SIMULATOR_SEED = int(os.getenv("SIMULATOR_SEED", "0"))
 
 class VehicleSimulator:
-    def __init__(self):
+    def __init__(self, mode: str = SIMULATOR_MODE):
         self.simulation_running = False
         self.trucks_data: Dict[str, dict] = {}
+        self.fleet: Optional[FleetSimulator] = None
+        self.routes: Optional[RouteSimulator] = None
+        if mode == "route":
+            self.routes = RouteSimulator(seed=SIMULATOR_SEED, acceleration=SIMULATOR_ACCELERATION)
+        elif mode == "vectorized" or (mode == "auto" and np is not None):
+            self.fleet = FleetSimulator()
         
     def calculate_new_position(self, lat: float, lng: float, speed_kmh: float, heading: float) -> tuple:
         """Calculate new GPS position based on speed and heading"""
@@ -34,7 +51,7 @@ class VehicleSimulator:
         }
         return bounds.get(zone_id, bounds["ZN003"])
     
-    def simulate_truck_movement(self, truck: Truck, bounds: dict):
+    def simulate_truck_movement(self, truck: LiveTruck, bounds: dict):
         """Simulate realistic truck movement patterns"""
         if not truck.latitude or not truck.longitude:
             # Initialize position within zone bounds
@@ -78,9 +95,9 @@ class VehicleSimulator:
         elif truck.current_status == TruckStatus.DUMPING:
             truck.speed = 0.0
             # Random chance to finish dumping
+            # Finishing does not count a trip: the trip detector counts dwells at dump sites
             if random.random() < 0.4:
                 truck.current_status = TruckStatus.MOVING
-                truck.trips_completed += 1
         
         elif truck.current_status == TruckStatus.OFFLINE:
             truck.speed = 0.0
@@ -90,31 +107,103 @@ class VehicleSimulator:
         
         truck.last_update = datetime.utcnow()
     
-    async def run_simulation(self):
-        """Main simulation loop"""
+    def simulate_fleet(self):
+        """One tick for every active truck in the live store"""
+        if self.routes is not None:
+            self.simulate_routes()
+            return
+
+        with live_state.lock:
+            if self.fleet is not None:
+                if self.fleet.fleet_version != live_state.version:
+                    # Trucks added or edited: rebuild the arrays from the live store
+                    self.fleet.load(live_state.trucks(), self.get_route_bounds)
+                    self.fleet.fleet_version = live_state.version
+                else:
+                    # Start from the live store: telemetry may have moved trucks or reported a breakdown
+                    self.fleet.refresh([live_state.get(truck_id) for truck_id in self.fleet.ids])
+                updated = self.fleet.step(5.0)
+                self.fleet.write_back(updated, live_state, position_history)
+                return
+
+            for truck in live_state.trucks():
+                if truck.current_status != TruckStatus.BREAKDOWN:
+                    bounds = self.get_route_bounds(truck.zone_id)
+                    self.simulate_truck_movement(truck, bounds)
+                    live_state.mark_dirty(truck.id)
+                    position_history.record(
+                        truck.id,
+                        truck.last_update or datetime.utcnow(),
+                        truck.latitude,
+                        truck.longitude,
+                        truck.speed,
+                        truck.current_status.value if truck.current_status else None,
+                    )
+
+    def simulate_routes(self):
+        """Route mode: trucks follow their route's stops; unrouted trucks stay where they are"""
+        if self.routes.fleet_version != live_state.version:
+            db = SessionLocal()
+            try:
+                self.routes.load(db, live_state.trucks())
+            finally:
+                db.close()
+            self.routes.fleet_version = live_state.version
+
+        # History fixes carry the simulated clock, one per FIX_SECONDS of simulated
+        # time, so pickup and dump dwells last as long for the geofence and trip
+        # detectors as they would on a real device at any acceleration
+        fixes = []
+        with live_state.lock:
+            self.routes.step(5.0, lambda ts, run: fixes.append(
+                (ts, run.truck_id, run.latitude, run.longitude, run.speed, run.status)
+            ))
+            # last_update stays wall-clock: a live clock ahead of now would make real telemetry look stale
+            now = datetime.utcnow()
+            moved = set()
+            for run in self.routes.runs.values():
+                truck = live_state.get(run.truck_id)
+                if truck is None or truck.current_status == TruckStatus.BREAKDOWN:
+                    continue
+                truck.latitude = run.latitude
+                truck.longitude = run.longitude
+                truck.current_status = run.status
+                truck.speed = run.speed
+                truck.last_update = now
+                live_state.mark_dirty(truck.id)
+                moved.add(truck.id)
+        position_history.record_many(
+            {
+                "truck_id": truck_id,
+                "ts": ts,
+                "latitude": latitude,
+                "longitude": longitude,
+                "speed": speed,
+                "status": status.value,
+            }
+            for ts, truck_id, latitude, longitude, speed, status in fixes
+            if truck_id in moved
+        )
+
+    def start_simulation(self):
+        """Enable simulation; ticks are driven by the fleet worker thread (see main.py)"""
         self.simulation_running = True
         print("🚛 Vehicle simulation started")
-        
-        while self.simulation_running:
+
+    def step(self):
+        """One 5 second simulation tick. Blocking: call it off the event loop"""
+        if not self.simulation_running:
+            return
+        if not live_state.loaded:
+            db = SessionLocal()
             try:
-                db = SessionLocal()
-                trucks = db.query(Truck).filter(Truck.status == "active").all()
-                
-                for truck in trucks:
-                    if truck.current_status != TruckStatus.BREAKDOWN:
-                        bounds = self.get_route_bounds(truck.zone_id)
-                        self.simulate_truck_movement(truck, bounds)
-                
-                db.commit()
+                live_state.load(db)
+            finally:
                 db.close()
-                
-                # Update every 5 seconds
-                await asyncio.sleep(5)
-                
-            except Exception as e:
-                print(f"Error in simulation: {e}")
-                await asyncio.sleep(5)
-    
+
+        # Trucks are moved in the live store; persistence is write-behind
+        self.simulate_fleet()
+
     def stop_simulation(self):
         """Stop the simulation"""
         self.simulation_running = False
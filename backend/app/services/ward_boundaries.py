@@ -0,0 +1,161 @@
+import gzip
+import hashlib
+import json
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, see requirements.txt
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements.txt; gzip is always available
+    brotli = None
+
+from .track_simplifier import simplify_indexes
+from .ward_index import WardIndex
+
+# Precomputed variants; a request gets the coarsest one that is still exact to a pixel at its zoom
+ZOOM_LEVELS = (10, 12, 14, 16)
+# Web Mercator meters per pixel at zoom 0 on the equator (256 px tiles)
+METERS_PER_PIXEL_Z0 = 156543.03392
+METERS_PER_DEG = 111320.0
+
+
+def meters_per_pixel(zoom: int, lat: float) -> float:
+    return METERS_PER_PIXEL_Z0 * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+class BoundaryVariant:
+    """One zoom level's GeoJSON document, encoded once in every supported Content-Encoding"""
+
+    __slots__ = ("zoom", "etag", "bodies", "vertices")
+
+    def __init__(self, zoom: int, raw: bytes, vertices: int):
+        self.zoom = zoom
+        self.vertices = vertices
+        self.etag = f'W/"{hashlib.sha1(raw).hexdigest()[:16]}-z{zoom}"'
+        self.bodies: Dict[str, bytes] = {"identity": raw, "gzip": gzip.compress(raw, 9, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(raw, quality=11)
+
+
+def _simplify_ring(points: Sequence[Tuple[float, float]], tolerance: float, decimals: int) -> Optional[List[List[float]]]:
+    """Simplified, quantized closed ring of [lng, lat] pairs, or None if it collapses"""
+    coords = [(lat, lng) for lng, lat in points]
+    kept = simplify_indexes(coords, tolerance, len(coords))
+    ring = []
+    for index in kept:
+        lat, lng = coords[index]
+        point = [round(lng, decimals), round(lat, decimals)]
+        if not ring or ring[-1] != point:
+            ring.append(point)
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    # A polygon ring needs three distinct corners
+    return ring if len(ring) >= 4 else None
+
+
+class WardBoundaries:
+    """Ward boundary polygons as GeoJSON, simplified and quantized per zoom level.
+
+    Built once from the ward index: for each level in ZOOM_LEVELS, rings are
+    Douglas-Peucker simplified to one pixel at that zoom, coordinates are
+    rounded to the decimals a pixel needs, and the document is serialized,
+    gzip (and brotli) compressed and given an ETag up front. Requests only
+    pick a precomputed body.
+    """
+
+    def __init__(self):
+        self.variants: Dict[int, BoundaryVariant] = {}
+        self._lock = threading.Lock()
+
+    def build(self, index: WardIndex):
+        polygons = index.polygons
+        lats = [lat for polygon in polygons for _, lat in polygon.coordinates[0]]
+        lat0 = sum(lats) / len(lats) if lats else 0.0
+
+        variants = {}
+        for zoom in ZOOM_LEVELS:
+            tolerance = meters_per_pixel(zoom, lat0)
+            decimals = max(0, math.ceil(math.log10(METERS_PER_DEG / (tolerance / 2))))
+            features: Dict[int, dict] = {}
+            vertices = 0
+            for polygon in polygons:
+                outer = _simplify_ring(polygon.coordinates[0], tolerance, decimals)
+                if outer is None:
+                    continue
+                rings = [outer]
+                for hole in polygon.coordinates[1:]:
+                    ring = _simplify_ring(hole, tolerance, decimals)
+                    if ring is not None:
+                        rings.append(ring)
+                vertices += sum(len(ring) for ring in rings)
+
+                # One feature per ward boundary; Placemarks with several polygons become MultiPolygons
+                feature = features.get(id(polygon.region))
+                if feature is None:
+                    features[id(polygon.region)] = {
+                        "type": "Feature",
+                        "properties": polygon.region.to_dict(),
+                        "geometry": {"type": "Polygon", "coordinates": rings},
+                    }
+                else:
+                    geometry = feature["geometry"]
+                    if geometry["type"] == "Polygon":
+                        geometry["type"] = "MultiPolygon"
+                        geometry["coordinates"] = [geometry["coordinates"]]
+                    geometry["coordinates"].append(rings)
+
+            document = {"type": "FeatureCollection", "features": list(features.values())}
+            if orjson is not None:
+                raw = orjson.dumps(document)
+            else:
+                raw = json.dumps(document, separators=(",", ":")).encode()
+            variants[zoom] = BoundaryVariant(zoom, raw, vertices)
+
+        with self._lock:
+            self.variants = variants
+        sizes = ", ".join(
+            f"z{zoom} {len(variant.bodies['identity']) // 1024} KB/{len(variant.bodies['gzip']) // 1024} KB gz"
+            for zoom, variant in variants.items()
+        )
+        print(f"Ward boundary GeoJSON ready ({sizes})")
+
+    def ensure_built(self, index: WardIndex):
+        if not self.variants:
+            self.build(index)
+
+    def variant(self, zoom: int) -> BoundaryVariant:
+        """The coarsest precomputed level at or above ``zoom`` (the finest for higher zooms)"""
+        for level in ZOOM_LEVELS:
+            if level >= zoom:
+                return self.variants[level]
+        return self.variants[ZOOM_LEVELS[-1]]
+
+
+def pick_encoding(accept_encoding: str, available) -> str:
+    """Best Content-Encoding the client accepts: br, then gzip, else identity"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+# Global ward boundaries instance
+ward_boundaries = WardBoundaries()
@@ -0,0 +1,218 @@
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.models import Ward
+from .spatial_index import STRtree
+
+KML_NS = "{http://www.opengis.net/kml/2.2}"
+
+# The same file the frontend draws; override for other cities
+WARD_BOUNDARIES_KML = os.getenv(
+    "WARD_BOUNDARIES_KML",
+    str(Path(__file__).resolve().parents[3] / "public" / "ward-boundaries.kml"),
+)
+
+
+def parse_coordinates(text: str) -> List[Tuple[float, float]]:
+    """KML "lng,lat[,alt] lng,lat[,alt] ..." to [(lng, lat), ...]"""
+    points = []
+    for token in text.split():
+        parts = token.split(",")
+        if len(parts) >= 2:
+            points.append((float(parts[0]), float(parts[1])))
+    return points
+
+
+class Ring:
+    """Closed ring with edges bucketed into horizontal bands.
+
+    A point-in-ring test only looks at the edges of the band containing the
+    point, typically a handful instead of every vertex of the boundary.
+    """
+
+    __slots__ = ("bbox", "_min_y", "_band_height", "_bands")
+
+    def __init__(self, points: Sequence[Tuple[float, float]]):
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        band_count = max(1, min(256, len(points) // 4))
+        self._min_y = self.bbox[1]
+        self._band_height = (self.bbox[3] - self.bbox[1]) / band_count or 1.0
+        self._bands: List[List[Tuple[float, float, float, float]]] = [[] for _ in range(band_count)]
+
+        for i in range(len(points)):
+            x1, y1 = points[i - 1]
+            x2, y2 = points[i]
+            if y1 == y2:
+                # Horizontal edges never cross a horizontal ray
+                continue
+            first = self._band(min(y1, y2))
+            last = self._band(max(y1, y2))
+            edge = (x1, y1, x2, y2)
+            for band in range(first, last + 1):
+                self._bands[band].append(edge)
+
+    def _band(self, y: float) -> int:
+        return min(len(self._bands) - 1, max(0, int((y - self._min_y) / self._band_height)))
+
+    def contains(self, x: float, y: float) -> bool:
+        min_x, min_y, max_x, max_y = self.bbox
+        if x < min_x or x > max_x or y < min_y or y > max_y:
+            return False
+        inside = False
+        for x1, y1, x2, y2 in self._bands[self._band(y)]:
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+
+class WardRegion:
+    """One ward boundary (a KML Placemark), with the matching wards-table id if any"""
+
+    __slots__ = ("name", "kml_ward_id", "prabhag", "prabhag_id", "kml_zone_id", "ward_id")
+
+    def __init__(self, data: Dict[str, str], name: Optional[str]):
+        self.name = data.get("ward") or name
+        self.kml_ward_id = data.get("ward_id")
+        self.prabhag = data.get("prabhag")
+        self.prabhag_id = data.get("prabhag_id")
+        self.kml_zone_id = data.get("zone_id")
+        self.ward_id: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "ward_id": self.ward_id,
+            "ward_name": self.name,
+            "prabhag": self.prabhag,
+            "prabhag_id": self.prabhag_id,
+            "kml_ward_id": self.kml_ward_id,
+            "kml_zone_id": self.kml_zone_id,
+        }
+
+
+class WardPolygon:
+    __slots__ = ("region", "outer", "holes", "bbox", "coordinates")
+
+    def __init__(self, region: WardRegion, coordinates: List[List[Tuple[float, float]]]):
+        # coordinates: outer ring then holes, each [(lng, lat), ...] as read from the KML
+        self.region = region
+        self.coordinates = coordinates
+        self.outer = Ring(coordinates[0])
+        self.holes = [Ring(points) for points in coordinates[1:]]
+        self.bbox = self.outer.bbox
+
+    def contains(self, x: float, y: float) -> bool:
+        return self.outer.contains(x, y) and not any(hole.contains(x, y) for hole in self.holes)
+
+
+def read_kml_polygons(path: str) -> Iterable[WardPolygon]:
+    """Stream Placemarks from a KML file, yielding one WardPolygon per Polygon"""
+    for _, element in ET.iterparse(path, events=("end",)):
+        if element.tag != f"{KML_NS}Placemark":
+            continue
+        data = {
+            item.get("name"): (item.text or "").strip()
+            for item in element.iter(f"{KML_NS}SimpleData")
+        }
+        name = element.findtext(f"{KML_NS}name")
+        region = WardRegion(data, name)
+        for polygon in element.iter(f"{KML_NS}Polygon"):
+            outer_text = polygon.findtext(f"{KML_NS}outerBoundaryIs/{KML_NS}LinearRing/{KML_NS}coordinates")
+            outer = parse_coordinates(outer_text or "")
+            if len(outer) < 3:
+                continue
+            holes = [
+                points
+                for points in (
+                    parse_coordinates(ring.text or "")
+                    for ring in polygon.iterfind(f"{KML_NS}innerBoundaryIs/{KML_NS}LinearRing/{KML_NS}coordinates")
+                )
+                if len(points) >= 3
+            ]
+            yield WardPolygon(region, [outer, *holes])
+        element.clear()
+
+
+class WardIndex:
+    """Point-in-ward lookup over the ward boundary polygons.
+
+    Polygons are loaded once into an STR-tree; a lookup checks the bounding
+    boxes on the path to the point and runs an exact point-in-polygon test
+    on the one or two candidates left.
+    """
+
+    def __init__(self):
+        self.tree: STRtree[WardPolygon] = STRtree([])
+        self.polygons: List[WardPolygon] = []
+        self.regions: List[WardRegion] = []
+        self.loaded = False
+
+    def load(self, path: str = WARD_BOUNDARIES_KML, db: Optional[Session] = None):
+        if not os.path.exists(path):
+            print(f"Ward boundaries not found at {path}; ward lookup disabled")
+            polygons = []
+        else:
+            polygons = list(read_kml_polygons(path))
+        regions = list({id(polygon.region): polygon.region for polygon in polygons}.values())
+        if db is not None:
+            self._match_wards(db, regions)
+        self.tree = STRtree([(polygon.bbox, polygon) for polygon in polygons])
+        self.polygons = polygons
+        self.regions = regions
+        self.loaded = True
+        print(f"Loaded {len(polygons)} ward boundary polygons")
+
+    def ensure_loaded(self, db: Optional[Session] = None):
+        if not self.loaded:
+            self.load(db=db)
+
+    def _match_wards(self, db: Session, regions: List[WardRegion]):
+        """Link boundaries to wards-table rows whose name appears in the ward or prabhag name"""
+        wards = db.query(Ward.id, Ward.name).all()
+        for region in regions:
+            labels = f"{region.name or ''} {region.prabhag or ''}".lower()
+            for ward_id, ward_name in wards:
+                if ward_name and ward_name.lower() in labels:
+                    region.ward_id = ward_id
+                    break
+
+    def locate(self, lat: float, lng: float) -> Optional[WardRegion]:
+        for polygon in self.tree.query_point(lng, lat):
+            if polygon.contains(lng, lat):
+                return polygon.region
+        return None
+
+    def locate_polygon(self, lat: float, lng: float, hint: Optional[WardPolygon] = None) -> Optional[WardPolygon]:
+        """Polygon containing the point; ``hint`` (usually the previous answer for the same truck) is tried first"""
+        if hint is not None and hint.contains(lng, lat):
+            return hint
+        for polygon in self.tree.query_point(lng, lat):
+            if polygon.contains(lng, lat):
+                return polygon
+        return None
+
+    def locate_many(self, points: Iterable[Tuple[float, float]]) -> List[Optional[WardRegion]]:
+        """Batch lookup of (lat, lng) pairs; consecutive points usually share a polygon"""
+        results = []
+        last: Optional[WardPolygon] = None
+        tree = self.tree
+        for lat, lng in points:
+            if last is not None and last.contains(lng, lat):
+                results.append(last.region)
+                continue
+            last = None
+            for polygon in tree.query_point(lng, lat):
+                if polygon.contains(lng, lat):
+                    last = polygon
+                    break
+            results.append(last.region if last is not None else None)
+        return results
+
+
+# Global ward index instance
+ward_index = WardIndex()
@@ -0,0 +1,91 @@
+"""
+Geofence engine benchmark (no database needed).
+
+Scatters synthetic pickup points over a city-sized area, drives trucks along
+random walks that regularly stop at points, and reports how many fixes per
+second the engine checks, with the enter/exit/dwell event counts.
+
+    python benchmark_geofence.py --points 100000 --trucks 2000 --ticks 50
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.models.models import PickupPoint
+from app.services.geo import LocalProjection
+from app.services.geofence import FencePoint, GeofenceEngine
+from app.services.spatial_index import PointGrid
+
+CENTER = (18.5204, 73.8567)
+SPAN_DEG = 0.25
+
+
+def build_engine(count: int, rng: random.Random):
+    """Engine over ``count`` random points, and the points' (lat, lng)"""
+    coordinates = []
+    engine = GeofenceEngine(dwell_seconds=30)
+    engine.projection = LocalProjection(CENTER[0])
+    engine.grid = PointGrid(50.0)
+    engine.max_radius = 50.0
+    for i in range(count):
+        point = PickupPoint(
+            id=f"BP{i:06d}",
+            point_code=f"BP{i:06d}",
+            latitude=CENTER[0] + rng.uniform(-SPAN_DEG, SPAN_DEG),
+            longitude=CENTER[1] + rng.uniform(-SPAN_DEG, SPAN_DEG),
+            geofence_radius=rng.choice((30, 50)),
+            status="active",
+        )
+        x, y = engine.projection.to_xy(point.latitude, point.longitude)
+        engine.grid.insert(point.id, x, y, FencePoint(point))
+        coordinates.append((point.latitude, point.longitude))
+    return engine, coordinates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--trucks", type=int, default=2000)
+    parser.add_argument("--ticks", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    started = time.perf_counter()
+    engine, coordinates = build_engine(args.points, rng)
+    print(f"{args.points} pickup points indexed in {time.perf_counter() - started:.2f}s")
+
+    # Half the trucks start parked on a pickup point, the rest anywhere
+    trucks = {}
+    for i in range(args.trucks):
+        if i % 2 == 0:
+            trucks[f"T{i:05d}"] = list(rng.choice(coordinates))
+        else:
+            trucks[f"T{i:05d}"] = [CENTER[0] + rng.uniform(-SPAN_DEG, SPAN_DEG), CENTER[1] + rng.uniform(-SPAN_DEG, SPAN_DEG)]
+
+    clock = datetime(2024, 1, 1, 6, 0)
+    total = 0
+    events = {"enter": 0, "exit": 0, "dwell": 0}
+    elapsed = 0.0
+    for _ in range(args.ticks):
+        clock += timedelta(seconds=10)
+        rows = []
+        for truck_id, position in trucks.items():
+            # ~15 m steps: trucks linger inside a geofence for several fixes
+            position[0] += rng.uniform(-0.00015, 0.00015)
+            position[1] += rng.uniform(-0.00015, 0.00015)
+            rows.append({"truck_id": truck_id, "ts": clock, "latitude": position[0], "longitude": position[1]})
+        started = time.perf_counter()
+        with engine._lock:
+            batch_events, _ = engine._process(rows)
+        elapsed += time.perf_counter() - started
+        total += len(rows)
+        for event in batch_events:
+            events[event["event"]] += 1
+
+    print(f"{total} fixes in {elapsed:.3f}s: {total / elapsed:,.0f} fixes/s ({elapsed / total * 1e6:.2f} us/fix)")
+    print(f"events: {events}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Route optimizer benchmark (no database needed).
+
+Builds synthetic routes of random pickup points around a GTP inside a
+ward-sized area and reports the solve time (distance matrix included) and
+the trip distance before and after optimization.
+
+    python benchmark_route_optimizer.py --points 100 300 500 800
+"""
+import argparse
+import random
+
+from app.models.models import PickupPoint
+from app.services.route_optimizer import RouteOptimizer
+
+CENTER = (18.5580, 73.9420)
+SPAN_DEG = 0.03
+
+
+def build_route(count: int, rng: random.Random):
+    """``count`` pickup points in random order, then the GTP"""
+    stops = [
+        PickupPoint(
+            id=f"BP{i:04d}",
+            point_code=f"BP{i:04d}",
+            latitude=CENTER[0] + rng.uniform(-SPAN_DEG, SPAN_DEG),
+            longitude=CENTER[1] + rng.uniform(-SPAN_DEG, SPAN_DEG),
+            type="residential",
+        )
+        for i in range(count)
+    ]
+    stops.append(PickupPoint(id="BGTP", point_code="BGTP", latitude=CENTER[0], longitude=CENTER[1], type="gtp"))
+    return stops
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, nargs="+", default=[100, 300, 500, 800])
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for count in args.points:
+        stops = build_route(count, rng)
+        # A fresh optimizer each time so the distance matrix is not cached
+        plan = RouteOptimizer().solve("BENCH", stops)
+        print(
+            f"{count:5d} points: {plan.elapsed_s * 1000:7.1f} ms, "
+            f"{plan.previous_distance_m / 1000:7.1f} km -> {plan.distance_m / 1000:6.1f} km "
+            f"(~{plan.time_s / 60:.0f} min)"
+        )
+
+
+if __name__ == "__main__":
+    main()
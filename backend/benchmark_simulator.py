@@ -0,0 +1,158 @@
+"""
+Simulator benchmarks.
+
+By default (no database needed) builds a synthetic fleet in an in-memory live store and reports ticks per
+second for the vectorized FleetSimulator (step only, and a full server tick:
+re-read from the live store, step, and bulk write into the live store and
+position history buffer), next to the scalar per-truck simulator.
+
+    python benchmark_simulator.py --trucks 10000 --ticks 100
+
+With --replay-day, instead replays one operating day of the route-following
+simulator for the trucks and routes in the database. Every tick's fixes go
+through the position history processors (geofence, route deviation, trip
+detection, alert rules) in a transaction that is rolled back at the end.
+It prints the wall time, the events and alerts raised and a checksum of
+every simulated position; the same seed always gives the same checksum.
+
+    python benchmark_simulator.py --replay-day --acceleration 60 --seed 7
+"""
+import argparse
+import hashlib
+import time
+from datetime import datetime
+
+from app.database.database import SessionLocal
+from app.models.models import Truck, TruckStatus
+from app.services.alert_rules import AlertRuleEngine
+from app.services.fleet_simulator import FleetSimulator
+from app.services.geofence import GeofenceEngine
+from app.services.live_state import LiveFleetState, LiveTruck
+from app.services.position_history import PositionHistory
+from app.services.route_deviation import RouteDeviationDetector
+from app.services.route_simulator import RouteSimulator
+from app.services.trip_detector import TripDetector
+from app.services.vehicle_simulator import VehicleSimulator
+
+ZONES = ["ZN001", "ZN002", "ZN003", "ZN004", "ZN005"]
+
+
+def build_fleet(count: int) -> LiveFleetState:
+    fleet = LiveFleetState()
+    for i in range(count):
+        truck = Truck(
+            id=f"SIM{i:05d}",
+            registration_number=f"MH12SIM{i:05d}",
+            status="active",
+            zone_id=ZONES[i % len(ZONES)],
+            current_status=TruckStatus.IDLE,
+            trips_completed=0,
+            trips_allowed=5,
+        )
+        fleet._trucks[truck.id] = LiveTruck(truck, None, None)
+    fleet.loaded = True
+    return fleet
+
+
+def report(label: str, ticks: int, elapsed: float, trucks: int):
+    print(f"{label:<32} {ticks / elapsed:10.1f} ticks/s  {elapsed / ticks * 1000:8.2f} ms/tick  "
+          f"{trucks * ticks / elapsed / 1e6:6.2f} M truck-updates/s")
+
+
+def replay_day(seed: int, acceleration: float, interval: float = 5.0):
+    fleet = LiveFleetState()
+    db = SessionLocal()
+    try:
+        fleet.load(db)
+        simulator = RouteSimulator(seed=seed, acceleration=acceleration, start=datetime(2024, 1, 1, 6, 0))
+        simulator.load(db, fleet.trucks())
+        # Private engines on the replay's fleet, in the server's processor order
+        geofences = GeofenceEngine()
+        deviations = RouteDeviationDetector(fleet=fleet)
+        trips = TripDetector(fleet=fleet)
+        rules = AlertRuleEngine(fleet=fleet)
+        for engine in (geofences, deviations, trips):
+            engine.load(db)
+        processors = (geofences.process, deviations.process, trips.process, rules.process)
+
+        ticks = int(24 * 3600 / (interval * acceleration))
+        checksum = hashlib.sha256()
+        started = time.perf_counter()
+        for _ in range(ticks):
+            rows = []
+            simulator.step(interval, lambda ts, run: rows.append({
+                "truck_id": run.truck_id,
+                "ts": ts,
+                "latitude": run.latitude,
+                "longitude": run.longitude,
+                "speed": run.speed,
+                "status": run.status.value,
+            }))
+            for row in rows:
+                checksum.update(f"{row['truck_id']}:{row['latitude']:.7f}:{row['longitude']:.7f}:{row['status']}".encode())
+            for processor in processors:
+                processor(db, rows)
+        elapsed = time.perf_counter() - started
+    finally:
+        # Read only: collections, GTC arrivals and alerts are not kept
+        db.rollback()
+        db.close()
+
+    simulated_trips = {truck_id: run.trips_completed for truck_id, run in sorted(simulator.runs.items())}
+    print(f"{len(simulator.runs)} routed trucks, {ticks} ticks of {interval * acceleration:.0f}s "
+          f"simulated in {elapsed:.3f}s ({ticks * interval / 60:.0f} min in the live server loop)")
+    print(f"trips completed: {simulated_trips}")
+    print(f"geofence: {geofences.stats()}")
+    print(f"trips detected: {trips.stats()}")
+    print(f"route deviation alerts: {deviations.alerts_raised}, rule alerts: {rules.stats()['alerts_raised']}")
+    print(f"checksum: {checksum.hexdigest()[:16]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trucks", type=int, default=10000)
+    parser.add_argument("--ticks", type=int, default=100)
+    parser.add_argument("--scalar-ticks", type=int, default=10)
+    parser.add_argument("--replay-day", action="store_true")
+    parser.add_argument("--acceleration", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.replay_day:
+        replay_day(args.seed, args.acceleration)
+        return
+
+    fleet = build_fleet(args.trucks)
+    history = PositionHistory()
+    scalar = VehicleSimulator(mode="scalar")
+    simulator = FleetSimulator(seed=42)
+    simulator.load(fleet.trucks(), scalar.get_route_bounds)
+    print(f"{args.trucks} trucks")
+
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        simulator.step()
+    report("vectorized step", args.ticks, time.perf_counter() - started, args.trucks)
+
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        simulator.refresh([fleet.get(truck_id) for truck_id in simulator.ids])
+        updated = simulator.step()
+        simulator.write_back(updated, fleet, history)
+        history._buffer.clear()
+    report("vectorized refresh + step + write", args.ticks, time.perf_counter() - started, args.trucks)
+
+    started = time.perf_counter()
+    for _ in range(args.scalar_ticks):
+        for truck in fleet.trucks():
+            if truck.current_status != TruckStatus.BREAKDOWN:
+                scalar.simulate_truck_movement(truck, scalar.get_route_bounds(truck.zone_id))
+                fleet.mark_dirty(truck.id)
+                history.record(truck.id, truck.last_update, truck.latitude, truck.longitude,
+                               truck.speed, truck.current_status.value)
+        history._buffer.clear()
+    report("scalar (per truck)", args.scalar_ticks, time.perf_counter() - started, args.trucks)
+
+
+if __name__ == "__main__":
+    main()
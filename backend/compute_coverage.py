@@ -0,0 +1,44 @@
+"""
+Compute daily pickup coverage from recorded truck positions.
+
+Runs the same incremental job the server's leader worker runs every
+COVERAGE_INTERVAL_SECONDS: only days whose position history changed since
+the last run are recomputed. Past days already computed after they ended
+are not rescanned; name them with --day to recheck them, and add --force
+to recompute regardless of the watermarks.
+
+    python compute_coverage.py
+    python compute_coverage.py --day 2026-02-10 --force
+"""
+import argparse
+import time
+from datetime import date
+
+from app.database.database import SessionLocal, engine
+from app.models import models
+from app.services.coverage import coverage_job
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--day", action="append", type=date.fromisoformat, help="YYYY-MM-DD (repeatable)")
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        days = coverage_job.run(db, days=args.day, force=args.force)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    if days:
+        print(f"✅ Coverage computed for {len(days)} day(s) in {elapsed:.2f}s: {', '.join(d.isoformat() for d in days)}")
+    else:
+        print("No days with new telemetry")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Import routes and pickup points from a GeoJSON or KML file.
+
+LineStrings are sampled into pickup points every --spacing meters and
+grouped into routes of --points-per-route; Point features become pickup
+points on the nearest imported route. The file is streamed (twice), never
+loaded whole, and rows are inserted in batches. Same as POST /api/import/geo.
+
+    python import_geo.py export.geojson --prefix KHR --ward-id WD006 --optimize
+    python import_geo.py city-roads.kml --spacing 200 --points-per-route 40
+
+Restart the server afterwards so geofencing and trip detection pick up the
+new points.
+"""
+import argparse
+
+from app.database.database import SessionLocal, engine
+from app.models import models
+from app.services.geo_import import GEO_IMPORT_BATCH_SIZE, GeoImportError, GeoImporter, detect_format
+from app.services.route_optimizer import route_optimizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("geojson", "kml"), help="default: from the file")
+    parser.add_argument("--prefix", default="IMP", help="route and pickup point id prefix")
+    parser.add_argument("--spacing", type=float, default=150.0, help="meters between sampled pickup points")
+    parser.add_argument("--points-per-route", type=int, default=15)
+    parser.add_argument("--route-type", choices=("primary", "secondary"), default="primary")
+    parser.add_argument("--ward-id", help="ward for points outside every ward boundary")
+    parser.add_argument("--zone-id", help="zone for routes whose ward has none")
+    parser.add_argument("--batch-size", type=int, default=GEO_IMPORT_BATCH_SIZE)
+    parser.add_argument("--optimize", action="store_true", help="optimize each imported route's pickup order")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        with open(args.path, "rb") as stream:
+            importer = GeoImporter(
+                prefix=args.prefix,
+                spacing_m=args.spacing,
+                points_per_route=args.points_per_route,
+                route_type=args.route_type,
+                ward_id=args.ward_id,
+                zone_id=args.zone_id,
+                batch_size=args.batch_size,
+            )
+            try:
+                result = importer.run(db, stream, args.format or detect_format(stream, args.path))
+            except GeoImportError as e:
+                db.rollback()
+                raise SystemExit(
+                    f"❌ {e}: stopped after {e.routes} routes and {e.pickup_points} pickup points "
+                    f"(run again on the fixed file to import the rest)"
+                )
+        if args.optimize:
+            for route_id in result["route_ids"]:
+                route_optimizer.optimize(db, route_id)
+    finally:
+        db.close()
+
+    print(
+        f"✅ {result['features']} features -> {result['routes']} routes, {result['pickup_points']} pickup points "
+        f"({result['assigned_points']} point features on routes, {result['unassigned_points']} unassigned, "
+        f"{result['skipped']} existing ids skipped) in {result['elapsed_ms'] / 1000:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Optimize the pickup order of routes and write back distance and time.
+
+Solves each route's visiting order (nearest neighbour, then 2-opt and
+Or-opt), stores it as the stops' expected pickup times and updates the
+route's estimated_distance/estimated_time. Same as
+POST /api/routes/{route_id}/optimize.
+
+    python optimize_routes.py                  # every active route
+    python optimize_routes.py --route KHR-1 --dry-run
+"""
+import argparse
+
+from app.database.database import SessionLocal
+from app.models import models
+from app.services.route_optimizer import route_optimizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--route", action="append", help="route id (repeatable; default: all active routes)")
+    parser.add_argument("--dry-run", action="store_true", help="report without writing")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        route_ids = args.route or [
+            route_id for (route_id,) in db.query(models.Route.id).filter(models.Route.status == "active")
+        ]
+        for route_id in route_ids:
+            plan = route_optimizer.optimize(db, route_id, apply=not args.dry_run)
+            if plan is None:
+                print(f"❌ Route {route_id} not found")
+                continue
+            result = plan.to_dict()
+            print(
+                f"{'🔎' if args.dry_run else '✅'} {route_id}: {len(result['stops'])} stops, "
+                f"{result['previous_distance']} km -> {result['estimated_distance']} km, "
+                f"~{result['estimated_time']} min ({result['elapsed_ms']} ms)"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ import {
 import { toast } from "sonner";
 import { GOOGLE_MAPS_API_KEY, KHARADI_CENTER, gtpLocations, finalDumpingSites, RoutePoint, RouteData, TruckType } from "@/data/fleetData";
 import { useZones, useZoneWards } from "@/hooks/useDataQueries";
+import { findWardBoundary } from "@/lib/wardBoundaries";
 
 interface RouteMapBuilderProps {
   route?: RouteData | null;
@@ -75,60 +76,16 @@ export default function RouteMapBuilder({ route, routeType, onSave, onCancel }:
       return;
     }
 
-    const normalizeText = (value: string) => value.toLowerCase().replace(/[^a-z0-9]/g, "");
-    const parseCoordinates = (value: string) => value
-      .trim()
-      .split(/\s+/)
-      .map((pair) => {
-        const [lng, lat] = pair.split(",").map(Number);
-        if (!Number.isFinite(lat) || !Number.isFinite(lng)) return null;
-        return { lat, lng };
-      })
-      .filter((point): point is { lat: number; lng: number } => point !== null);
-
     const loadWardBoundary = async () => {
       try {
-        const response = await fetch("/ward-boundaries.kml");
-        if (!response.ok) {
-          setWardPolygons([]);
-          setWardMatchLabel(null);
-          return;
-        }
-        const kmlText = await response.text();
-        const parser = new DOMParser();
-        const xml = parser.parseFromString(kmlText, "application/xml");
-        const placemarks = Array.from(xml.getElementsByTagName("Placemark"));
-        const target = normalizeText(selectedWard.name);
-
-        const extractSimpleData = (placemark: Element, name: string) => {
-          const entries = Array.from(placemark.getElementsByTagName("SimpleData"));
-          const match = entries.find((entry) => entry.getAttribute("name") === name);
-          return match?.textContent?.trim() || "";
-        };
-
-        const matchPlacemark = placemarks.find((placemark) => {
-          const wardName = normalizeText(extractSimpleData(placemark, "ward"));
-          const prabhagName = normalizeText(extractSimpleData(placemark, "prabhag"));
-          return wardName.includes(target) || prabhagName.includes(target) || target.includes(wardName) || target.includes(prabhagName);
-        });
-
-        if (!matchPlacemark) {
+        const match = await findWardBoundary(selectedWard.name);
+        if (!match) {
           setWardPolygons([]);
           setWardMatchLabel(null);
           return;
         }
-
-        const wardName = extractSimpleData(matchPlacemark, "ward");
-        const prabhagName = extractSimpleData(matchPlacemark, "prabhag");
-        setWardMatchLabel(prabhagName ? `${wardName} (${prabhagName})` : wardName || selectedWard.name);
-
-        const boundaries = Array.from(matchPlacemark.getElementsByTagName("outerBoundaryIs"));
-        const polygons = boundaries
-          .map((boundary) => boundary.getElementsByTagName("coordinates")[0]?.textContent || "")
-          .map((coords) => parseCoordinates(coords))
-          .filter((path) => path.length > 0);
-
-        setWardPolygons(polygons);
+        setWardMatchLabel(match.label);
+        setWardPolygons(match.polygons);
       } catch {
         setWardPolygons([]);
         setWardMatchLabel(null);
@@ -184,14 +184,18 @@ export function useRoutePickupPoints(routeId: string | null | undefined): UseQue
   });
 }
 
-// Hook for fetching pickup points
+// Hook for fetching pickup points (pass enabled: false until a map viewport bbox is known)
 export function usePickupPoints(filters?: {
   route_id?: string;
   ward_id?: string;
-}): UseQueryResult<any[], Error> {
+  bbox?: string;
+  near?: string;
+  radius?: string;
+}, enabled: boolean = true): UseQueryResult<any[], Error> {
   return useQuery({
     queryKey: ['pickup-points', filters],
     queryFn: () => apiService.getPickupPoints(filters),
+    enabled,
     staleTime: 60 * 1000, // 1 minute
     gcTime: 5 * 60 * 1000, // 5 minutes
   });
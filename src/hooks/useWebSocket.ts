@@ -1,42 +1,89 @@
-import { useEffect, useState, useCallback } from 'react';
+import { useEffect, useState, useCallback, useRef } from 'react';
 import { WS_URL } from '../config/api';
+import { decodePositionFrame, LiveTruckPosition, TruckIndexEntry } from '../lib/liveFrames';
 
-interface TruckPosition {
-  id: string;
-  registration_number: string;
-  latitude: number;
-  longitude: number;
-  status: string;
-  speed: number;
-  trips_completed: number;
-  last_update: string | null;
-}
+type TruckPosition = LiveTruckPosition;
 
 interface WebSocketMessage {
   type: string;
+  seq?: number;
   data: TruckPosition[];
+  removed?: string[];
+  trucks?: TruckIndexEntry[];
   timestamp: string;
 }
 
-export const useWebSocket = () => {
+// Server-side filters: only trucks matching all given fields are sent.
+// bbox is the map viewport as [west, south, east, north].
+export interface LiveSubscriptionFilter {
+  zone_id?: string;
+  ward_id?: string;
+  route_id?: string;
+  bbox?: [number, number, number, number];
+}
+
+export const useWebSocket = (filter?: LiveSubscriptionFilter) => {
   const [truckPositions, setTruckPositions] = useState<TruckPosition[]>([]);
   const [isConnected, setIsConnected] = useState(false);
   const [ws, setWs] = useState<WebSocket | null>(null);
+  // Delta mode: the server sends one snapshot, then only trucks that changed
+  const positionsRef = useRef<Map<string, TruckPosition>>(new Map());
+  const seqRef = useRef<number | null>(null);
+  // Binary frames refer to trucks by index into this table
+  const truckIndexRef = useRef<TruckIndexEntry[]>([]);
+  const filterRef = useRef<LiveSubscriptionFilter | undefined>(filter);
+  const filterKey = JSON.stringify(filter ?? {});
+
+  const subscribe = useCallback((websocket: WebSocket) => {
+    seqRef.current = null;
+    websocket.send(
+      JSON.stringify({ type: 'subscribe', mode: 'delta', encoding: 'binary', ...filterRef.current }),
+    );
+  }, []);
 
   const connect = useCallback(() => {
     try {
       const websocket = new WebSocket(WS_URL);
+      websocket.binaryType = 'arraybuffer';
 
       websocket.onopen = () => {
         console.log('WebSocket connected');
         setIsConnected(true);
+        subscribe(websocket);
       };
 
       websocket.onmessage = (event) => {
         try {
-          const message: WebSocketMessage = JSON.parse(event.data);
+          let message: WebSocketMessage;
+          if (typeof event.data === 'string') {
+            message = JSON.parse(event.data);
+            if (message.type === 'truck_index' && message.trucks) {
+              truckIndexRef.current = message.trucks;
+              return;
+            }
+          } else {
+            message = decodePositionFrame(event.data, truckIndexRef.current);
+          }
           if (message.type === 'truck_positions' && message.data) {
+            positionsRef.current = new Map(message.data.map((truck) => [truck.id, truck]));
+            seqRef.current = message.seq ?? null;
             setTruckPositions(message.data);
+          } else if (message.type === 'truck_positions_delta') {
+            if (seqRef.current === null) {
+              // Still waiting for the snapshot requested on subscribe/resync
+              return;
+            }
+            if (message.seq !== seqRef.current + 1) {
+              // Missed a frame: ask for a fresh snapshot instead of applying on top of a gap
+              seqRef.current = null;
+              websocket.send(JSON.stringify({ type: 'resync' }));
+              return;
+            }
+            const positions = positionsRef.current;
+            message.data.forEach((truck) => positions.set(truck.id, truck));
+            message.removed?.forEach((id) => positions.delete(id));
+            seqRef.current = message.seq;
+            setTruckPositions(Array.from(positions.values()));
           }
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
@@ -66,7 +113,7 @@ export const useWebSocket = () => {
       console.error('Error creating WebSocket:', error);
       return null;
     }
-  }, []);
+  }, [subscribe]);
 
   useEffect(() => {
     const websocket = connect();
@@ -79,6 +126,15 @@ export const useWebSocket = () => {
     };
   }, [connect]);
 
+  // Re-subscribe when the filter changes; the server answers with a new snapshot
+  useEffect(() => {
+    filterRef.current = filter;
+    if (ws && ws.readyState === WebSocket.OPEN) {
+      subscribe(ws);
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [filterKey]);
+
   // Keep connection alive with ping
   useEffect(() => {
     if (!ws || !isConnected) return;
@@ -0,0 +1,78 @@
+// Decoder for the binary live position frames (backend/app/services/binary_frames.py)
+
+export interface LiveTruckPosition {
+  id: string;
+  registration_number: string;
+  latitude: number;
+  longitude: number;
+  status: string;
+  speed: number;
+  trips_completed: number;
+  last_update: string | null;
+}
+
+export interface BinaryPositionFrame {
+  type: 'truck_positions' | 'truck_positions_delta';
+  seq: number;
+  timestamp: string;
+  data: LiveTruckPosition[];
+  removed: string[];
+}
+
+// [truck id, registration number] in index order, from the JSON truck_index frame
+export type TruckIndexEntry = [string, string | null];
+
+const FRAME_VERSION = 1;
+const FRAME_SNAPSHOT = 1;
+const HEADER_SIZE = 14;
+const RECORD_SIZE = 16;
+const UNKNOWN_AGE = 0xffff;
+const STATUSES = ['idle', 'moving', 'dumping', 'offline', 'breakdown'];
+
+export const decodePositionFrame = (
+  buffer: ArrayBuffer,
+  trucks: TruckIndexEntry[],
+): BinaryPositionFrame => {
+  const view = new DataView(buffer);
+  const version = view.getUint8(0);
+  if (version !== FRAME_VERSION) {
+    throw new Error(`Unsupported position frame version ${version}`);
+  }
+  const kind = view.getUint8(1);
+  const seq = view.getUint32(2, true);
+  const frameTime = view.getUint32(6, true);
+  const count = view.getUint16(10, true);
+  const removedCount = view.getUint16(12, true);
+
+  const data: LiveTruckPosition[] = new Array(count);
+  let offset = HEADER_SIZE;
+  for (let i = 0; i < count; i++) {
+    const [id, registration] = trucks[view.getUint16(offset, true)] ?? ['', null];
+    const age = view.getUint16(offset + 14, true);
+    data[i] = {
+      id,
+      registration_number: registration ?? '',
+      latitude: view.getInt32(offset + 2, true) / 1e7,
+      longitude: view.getInt32(offset + 6, true) / 1e7,
+      speed: view.getUint16(offset + 10, true) / 10,
+      status: STATUSES[view.getUint8(offset + 12)] ?? 'idle',
+      trips_completed: view.getUint8(offset + 13),
+      last_update: age === UNKNOWN_AGE ? null : new Date((frameTime - age) * 1000).toISOString(),
+    };
+    offset += RECORD_SIZE;
+  }
+
+  const removed: string[] = new Array(removedCount);
+  for (let i = 0; i < removedCount; i++) {
+    removed[i] = trucks[view.getUint16(offset, true)]?.[0] ?? '';
+    offset += 2;
+  }
+
+  return {
+    type: kind === FRAME_SNAPSHOT ? 'truck_positions' : 'truck_positions_delta',
+    seq,
+    timestamp: new Date(frameTime * 1000).toISOString(),
+    data,
+    removed,
+  };
+};
@@ -0,0 +1,64 @@
+// Ward boundary polygons from the backend's simplified GeoJSON (GET /api/wards/boundaries)
+import { API_BASE_URL } from '@/config/api';
+
+export interface LatLng {
+  lat: number;
+  lng: number;
+}
+
+export interface WardBoundaryMatch {
+  label: string;
+  // Outer rings of the ward's polygons
+  polygons: LatLng[][];
+}
+
+interface WardFeature {
+  properties: { ward_name: string | null; prabhag: string | null };
+  geometry: { type: 'Polygon' | 'MultiPolygon'; coordinates: any };
+}
+
+interface WardFeatureCollection {
+  features: WardFeature[];
+}
+
+// One request per zoom level per page load; the browser revalidates with the ETag
+const collections = new Map<number, Promise<WardFeatureCollection>>();
+
+export function loadWardBoundaries(zoom = 14): Promise<WardFeatureCollection> {
+  let pending = collections.get(zoom);
+  if (!pending) {
+    pending = fetch(`${API_BASE_URL}/wards/boundaries?zoom=${zoom}`).then((response) => {
+      if (!response.ok) throw new Error(`Ward boundaries unavailable: ${response.status}`);
+      return response.json();
+    });
+    pending.catch(() => collections.delete(zoom));
+    collections.set(zoom, pending);
+  }
+  return pending;
+}
+
+const normalizeText = (value: string) => value.toLowerCase().replace(/[^a-z0-9]/g, '');
+
+const toPath = (ring: [number, number][]): LatLng[] => ring.map(([lng, lat]) => ({ lat, lng }));
+
+// Boundary whose ward or prabhag name matches ``wardName`` (either containing the other)
+export async function findWardBoundary(wardName: string, zoom = 14): Promise<WardBoundaryMatch | null> {
+  const collection = await loadWardBoundaries(zoom);
+  const target = normalizeText(wardName);
+  const feature = collection.features.find(({ properties }) => {
+    const ward = normalizeText(properties.ward_name || '');
+    const prabhag = normalizeText(properties.prabhag || '');
+    return (!!ward && (ward.includes(target) || target.includes(ward)))
+      || (!!prabhag && (prabhag.includes(target) || target.includes(prabhag)));
+  });
+  if (!feature) return null;
+
+  const { ward_name, prabhag } = feature.properties;
+  const polygons = feature.geometry.type === 'Polygon'
+    ? [toPath(feature.geometry.coordinates[0])]
+    : feature.geometry.coordinates.map((rings: [number, number][][]) => toPath(rings[0]));
+  return {
+    label: prabhag ? `${ward_name} (${prabhag})` : ward_name || wardName,
+    polygons,
+  };
+}
@@ -1,4 +1,4 @@
-import { useState, useCallback, useEffect, useMemo } from "react";
+import { useState, useCallback, useEffect, useMemo, useRef } from "react";
 import { GoogleMap, Marker, Polyline, InfoWindow, Polygon } from "@react-google-maps/api";
 import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Badge } from "@/components/ui/badge";
@@ -22,6 +22,7 @@ import { useTrucks, useZones, useRoutes, useDrivers, usePickupPoints, useRoutePi
 import { useRouteBasedSimulation } from "@/hooks/useRouteBasedSimulation";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { apiService } from "@/services/api";
+import { findWardBoundary } from "@/lib/wardBoundaries";
 
 const containerStyle = { width: '100%', height: '100%' };
 
@@ -39,7 +40,13 @@ export default function Fleet() {
   const { data: routesData = [] } = useRoutes();
   const { data: driversData = [] } = useDrivers();
   const { data: zonesData = [] } = useZones();
-  const { data: pickupPointsData = [] } = usePickupPoints();
+  const mapRef = useRef<google.maps.Map | null>(null);
+  // Visible map area as "min_lng,min_lat,max_lng,max_lat"; only those pickup points are loaded
+  const [viewportBbox, setViewportBbox] = useState<string | null>(null);
+  const { data: pickupPointsData = [] } = usePickupPoints(
+    viewportBbox ? { bbox: viewportBbox } : undefined,
+    !!viewportBbox
+  );
   
   // State
   const [selectedTruck, setSelectedTruck] = useState<TruckData | null>(null);
@@ -86,7 +93,7 @@ export default function Fleet() {
     loadWards();
   }, [filterZone]);
 
-  // Load KML ward boundaries when zone/ward filter changes
+  // Load ward boundaries when zone/ward filter changes
   useEffect(() => {
     if (filterZone === "all" || filterWard === "all") {
       setWardPolygons([]);
@@ -101,62 +108,17 @@ export default function Fleet() {
       return;
     }
 
-    const normalizeText = (value: string) => value.toLowerCase().replace(/[^a-z0-9]/g, "");
-    const parseCoordinates = (value: string) => value
-      .trim()
-      .split(/\s+/)
-      .map((pair) => {
-        const [lng, lat] = pair.split(",").map(Number);
-        if (!Number.isFinite(lat) || !Number.isFinite(lng)) return null;
-        return { lat, lng };
-      })
-      .filter((point): point is { lat: number; lng: number } => point !== null);
-
     const loadWardBoundary = async () => {
       try {
-        const response = await fetch("/ward-boundaries.kml");
-        if (!response.ok) {
+        const match = await findWardBoundary(selectedWard.name);
+        if (!match) {
+          console.warn('No ward boundary found for ward:', selectedWard.name);
           setWardPolygons([]);
           setWardMatchLabel(null);
           return;
         }
-        const kmlText = await response.text();
-        const parser = new DOMParser();
-        const xml = parser.parseFromString(kmlText, "application/xml");
-        const placemarks = Array.from(xml.getElementsByTagName("Placemark"));
-        const target = normalizeText(selectedWard.name);
-
-        const extractSimpleData = (placemark: Element, name: string) => {
-          const entries = Array.from(placemark.getElementsByTagName("SimpleData"));
-          const match = entries.find((entry) => entry.getAttribute("name") === name);
-          return match?.textContent?.trim() || "";
-        };
-
-        const matchPlacemark = placemarks.find((placemark) => {
-          const wardName = normalizeText(extractSimpleData(placemark, "ward"));
-          const prabhagName = normalizeText(extractSimpleData(placemark, "prabhag"));
-          return wardName.includes(target) || prabhagName.includes(target) || target.includes(wardName) || target.includes(prabhagName);
-        });
-
-        if (!matchPlacemark) {
-          console.warn('No KML placemark found for ward:', selectedWard.name);
-          setWardPolygons([]);
-          setWardMatchLabel(null);
-          return;
-        }
-
-        const wardName = extractSimpleData(matchPlacemark, "ward");
-        const prabhagName = extractSimpleData(matchPlacemark, "prabhag");
-        setWardMatchLabel(prabhagName ? `${wardName} (${prabhagName})` : wardName || selectedWard.name);
-
-        const boundaries = Array.from(matchPlacemark.getElementsByTagName("outerBoundaryIs"));
-        const polygons = boundaries
-          .map((boundary) => boundary.getElementsByTagName("coordinates")[0]?.textContent || "")
-          .map((coords) => parseCoordinates(coords))
-          .filter((path) => path.length > 0);
-
-        console.log('Ward boundary loaded:', wardName, 'polygons:', polygons.length);
-        setWardPolygons(polygons);
+        setWardMatchLabel(match.label);
+        setWardPolygons(match.polygons);
       } catch (error) {
         console.error('Error loading ward boundary:', error);
         setWardPolygons([]);
@@ -220,10 +182,24 @@ export default function Fleet() {
   const selectedTruckRoute = selectedTruck && routePickupPointsCache.get(selectedTruck.routeId);
   const selectedTruckPickupPoints = selectedTruckRoute || [];
 
-  const onMapLoad = useCallback(() => {
+  const onMapLoad = useCallback((map: google.maps.Map) => {
+    mapRef.current = map;
     setIsMapLoaded(true);
   }, []);
 
+  // Reload pickup points once panning/zooming settles
+  const onMapIdle = useCallback(() => {
+    const bounds = mapRef.current?.getBounds();
+    if (!bounds) return;
+    const southWest = bounds.getSouthWest();
+    const northEast = bounds.getNorthEast();
+    setViewportBbox(
+      [southWest.lng(), southWest.lat(), northEast.lng(), northEast.lat()]
+        .map((value) => value.toFixed(5))
+        .join(",")
+    );
+  }, []);
+
   // Filter trucks based on all filter criteria
   const filteredTrucks = useMemo(() => {
     return simulatedTrucks.filter(truck => {
@@ -521,6 +497,7 @@ export default function Fleet() {
                   center={KHARADI_CENTER}
                   zoom={14}
                   onLoad={onMapLoad}
+                  onIdle={onMapIdle}
                   options={{
                     styles: [{ featureType: "poi", elementType: "labels", stylers: [{ visibility: "off" }] }],
                     streetViewControl: false,
@@ -624,6 +601,23 @@ export default function Fleet() {
                       </Marker>
                     ))}
 
+                    {/* Pickup Points in the viewport */}
+                    {isMapLoaded && window.google && !selectedTruck && (pickupPointsData as any[]).map((point) => (
+                      <Marker
+                        key={`pickup-${point.id}`}
+                        position={{ lat: point.latitude, lng: point.longitude }}
+                        icon={{
+                          path: window.google.maps.SymbolPath.CIRCLE,
+                          scale: 4,
+                          fillColor: "#10b981",
+                          fillOpacity: 0.9,
+                          strokeColor: "white",
+                          strokeWeight: 1,
+                        }}
+                        title={point.name}
+                      />
+                    ))}
+
                     {/* Pickup Points for Selected Truck */}
                     {isMapLoaded && window.google && selectedTruck && selectedTruckPickupPoints.map((point: any, index: number) => (
                       <Marker
@@ -21,6 +21,7 @@ import { Badge } from "@/components/ui/badge";
 import { Input } from "@/components/ui/input";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { apiService } from "@/services/api";
+import { findWardBoundary } from "@/lib/wardBoundaries";
 
 const containerStyle = { width: '100%', height: '100%' };
 
@@ -88,55 +89,14 @@ const Index = () => {
       return;
     }
 
-    const normalizeText = (value: string) => value.toLowerCase().replace(/[^a-z0-9]/g, "");
-    const parseCoordinates = (value: string) => value
-      .trim()
-      .split(/\s+/)
-      .map((pair) => {
-        const [lng, lat] = pair.split(",").map(Number);
-        if (!Number.isFinite(lat) || !Number.isFinite(lng)) return null;
-        return { lat, lng };
-      })
-      .filter((point): point is { lat: number; lng: number } => point !== null);
-
     const loadWardBoundary = async () => {
       try {
-        const response = await fetch("/ward-boundaries.kml");
-        if (!response.ok) {
+        const match = await findWardBoundary(selectedWard.name);
+        if (!match) {
           setWardPolygons([]);
           return;
         }
-
-        const kmlText = await response.text();
-        const parser = new DOMParser();
-        const xml = parser.parseFromString(kmlText, "application/xml");
-        const placemarks = Array.from(xml.getElementsByTagName("Placemark"));
-        const target = normalizeText(selectedWard.name);
-
-        const extractSimpleData = (placemark: Element, name: string) => {
-          const entries = Array.from(placemark.getElementsByTagName("SimpleData"));
-          const match = entries.find((entry) => entry.getAttribute("name") === name);
-          return match?.textContent?.trim() || "";
-        };
-
-        const matchPlacemark = placemarks.find((placemark) => {
-          const wardName = normalizeText(extractSimpleData(placemark, "ward"));
-          const prabhagName = normalizeText(extractSimpleData(placemark, "prabhag"));
-          return wardName.includes(target) || prabhagName.includes(target) || target.includes(wardName) || target.includes(prabhagName);
-        });
-
-        if (!matchPlacemark) {
-          setWardPolygons([]);
-          return;
-        }
-
-        const boundaries = Array.from(matchPlacemark.getElementsByTagName("outerBoundaryIs"));
-        const polygons = boundaries
-          .map((boundary) => boundary.getElementsByTagName("coordinates")[0]?.textContent || "")
-          .map((coords) => parseCoordinates(coords))
-          .filter((path) => path.length > 0);
-
-        setWardPolygons(polygons);
+        setWardPolygons(match.polygons);
       } catch (error) {
         console.error("Ward boundaries not available", error);
         setWardPolygons([]);
@@ -20,6 +20,16 @@ export interface TruckLive {
   last_update: string | null;
 }
 
+export interface TruckTrack {
+  truck_id: string;
+  start: string;
+  end: string;
+  total_points: number;
+  tolerance: number;
+  // Each point is [unix_ts, latitude, longitude, speed]
+  points: [number, number, number, number][];
+}
+
 export interface Zone {
   id: string;
   name: string;
@@ -109,6 +119,18 @@ class ApiService {
     return this.fetchApi(`/trucks/${suffix}`);
   }
 
+  async getTruckTrack(
+    truckId: string,
+    params?: { from?: string; to?: string; tolerance?: number; max_points?: number }
+  ): Promise<TruckTrack> {
+    const query = new URLSearchParams(
+      Object.entries(params ?? {})
+        .filter(([, value]) => value !== undefined)
+        .map(([key, value]) => [key, String(value)])
+    ).toString();
+    return this.fetchApi<TruckTrack>(`/trucks/${truckId}/track${query ? `?${query}` : ''}`);
+  }
+
   async getSpareTrucks(): Promise<any[]> {
     return this.fetchApi('/trucks/spare');
   }
@@ -184,7 +206,8 @@ class ApiService {
   }
 
   // Pickup Points
-  async getPickupPoints(filters?: { ward_id?: string; route_id?: string }): Promise<any[]> {
+  // bbox: "min_lng,min_lat,max_lng,max_lat" (a map viewport); near: "lat,lng" with radius in meters
+  async getPickupPoints(filters?: { ward_id?: string; route_id?: string; bbox?: string; near?: string; radius?: string }): Promise<any[]> {
     const params = new URLSearchParams(filters as Record<string, string>);
     return this.fetchApi(`/pickup-points/?${params.toString()}`);
   }